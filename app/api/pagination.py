@@ -0,0 +1,95 @@
+import base64
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.serialization import item_adapter, json_list_response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_parsers = {
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    uuid.UUID: uuid.UUID,
+}
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: str | None
+    stream: bool
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description=f"Значение заголовка {NEXT_CURSOR_HEADER} предыдущей страницы"),
+    stream: bool = Query(False, description="Отдать все строки начиная с cursor потоком NDJSON"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, stream=stream)
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_parsers[column.type.python_type](value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _ndjson_rows(db: AsyncSession, stmt: Select, schema: type[BaseModel]):
+    adapter = item_adapter(schema)
+    result = await db.stream(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for partition in result.partitions():
+        yield b"".join(adapter.dump_json(adapter.validate_python(row, from_attributes=True)) + b"\n"
+                       for row in partition)
+
+
+async def keyset_page(db: AsyncSession, stmt: Select, columns, params: PageParams, schema: type[BaseModel],
+                      response: Response):
+    """Keyset-пагинация по уникальному набору столбцов (например, (created_at, id)).
+
+    stmt выбирает столбцы, а не сущности (см. response_columns), и должен
+    включать столбцы ключа. Курсор следующей страницы возвращается в заголовке X-Next-Cursor; при
+    stream=true строки уходят NDJSON-потоком без загрузки всей выборки в память.
+    """
+    if params.cursor:
+        stmt = stmt.where(tuple_(*columns) > tuple_(*decode_cursor(params.cursor, columns)))
+    stmt = stmt.order_by(*columns)
+
+    if params.stream:
+        return StreamingResponse(_ndjson_rows(db, stmt, schema), media_type=NDJSON_MEDIA_TYPE)
+
+    rows = (await db.execute(stmt.limit(params.limit + 1))).all()
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], c.key) for c in columns)
+    return rows
+
+
+async def keyset_response(db: AsyncSession, stmt: Select, columns, params: PageParams, schema: type[BaseModel],
+                          response: Response) -> Response:
+    """keyset_page, сразу упакованная в ответ: NDJSON-поток или JSON-массив с курсором в заголовке."""
+    page = await keyset_page(db, stmt, columns, params, schema, response)
+    if isinstance(page, Response):
+        return page
+    return json_list_response(schema, page, response.headers)
@@ -0,0 +1,24 @@
+"""Общие запросы роутеров.
+
+Проверка существования связанной строки встраивается в основной запрос
+(INSERT ... SELECT ... WHERE, JOIN), а вставленная строка возвращается
+через RETURNING — без отдельного SELECT до и refresh() после.
+"""
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def insert_returning(db: AsyncSession, model, values: dict, exists=None):
+    """Вставляет строку и возвращает её со всеми столбцами (включая default).
+
+    exists — условие вида User.id == user_id: строка вставляется, только если
+    оно выполняется, иначе возвращается None.
+    """
+    table = model.__table__
+    stmt = insert(model)
+    if exists is None:
+        stmt = stmt.values(**values)
+    else:
+        source = select(*(literal(value, table.c[name].type) for name, value in values.items())).where(exists)
+        stmt = stmt.from_select(list(values), source)
+    return (await db.execute(stmt.returning(*table.c))).first()
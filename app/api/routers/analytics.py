@@ -0,0 +1,92 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+
+from app.database import get_read_db
+from app.models.habit import Habit
+from app.models.team import Team
+from app.models.user import User
+from app.schemas.analytics import TeamAnalyticsResponse, UserAnalyticsResponse
+
+router = APIRouter(
+    tags=['Analytics'],
+)
+
+MAX_RANGE_DAYS = 3660
+
+
+@router.get("/users/{user_id}/analytics", response_model=UserAnalyticsResponse)
+async def get_user_analytics(user_id: uuid.UUID, days: int = Query(365, ge=7, le=MAX_RANGE_DAYS),
+                             db: AsyncSession = Depends(get_read_db)):
+    # NumPy грузится при первом запросе аналитики, а не при старте приложения
+    import numpy as np
+    from app.services import analytics
+
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    habits = (await db.execute(
+        select(Habit.id, Habit.name, Habit.created_at).where(Habit.user_id == user_id).order_by(Habit.created_at)
+    )).all()
+    start, end = analytics.date_range(days)
+    habit_pos, _, day_pos = await analytics.load_day_arrays(db, [h.id for h in habits], start, end)
+
+    done = analytics.completion_matrix(habit_pos, day_pos, len(habits), days)
+    possible = analytics.active_matrix(analytics.created_positions([h.created_at for h in habits], start), days)
+    possible = possible.astype(np.int32)
+    return UserAnalyticsResponse(
+        user_id=user_id,
+        start=start,
+        end=end,
+        habits=[{"habit_id": h.id, "name": h.name, "completed": int(done[i].sum())} for i, h in enumerate(habits)],
+        **analytics.correlation([h.id for h in habits], done),
+        **analytics.summarize(done, possible, start),
+    )
+
+
+@router.get("/teams/{team_id}/analytics", response_model=TeamAnalyticsResponse)
+async def get_team_analytics(team_id: uuid.UUID, days: int = Query(365, ge=7, le=MAX_RANGE_DAYS),
+                             db: AsyncSession = Depends(get_read_db)):
+    import numpy as np
+    from app.services import analytics
+
+    team = await db.scalar(select(Team).where(Team.id == team_id))
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+
+    members = (await db.execute(
+        select(User.id, User.name).where(User.team_id == team_id).order_by(User.created_at)
+    )).all()
+    member_ids = [m.id for m in members]
+    habits = (await db.execute(
+        select(Habit.id, Habit.name, Habit.user_id, Habit.team_id, Habit.created_at)
+        .where(or_(Habit.team_id == team_id, Habit.user_id.in_(member_ids)))
+        .order_by(Habit.created_at)
+    )).all()
+    start, end = analytics.date_range(days)
+    habit_pos, user_ids, day_pos = await analytics.load_day_arrays(db, [h.id for h in habits], start, end)
+
+    done = analytics.completion_matrix(habit_pos, day_pos, len(habits), days)
+    active = analytics.active_matrix(analytics.created_positions([h.created_at for h in habits], start), days)
+    # Общую привычку за день могут отметить все участники, личную — только владелец
+    capacity = np.array([len(members) if h.team_id == team_id else 1 for h in habits], dtype=np.int32)
+    possible = active * capacity[:, np.newaxis]
+
+    active_days = active.sum(axis=1)
+    possible_by_member = {
+        m.id: int(sum(active_days[i] for i, h in enumerate(habits) if h.user_id == m.id or h.team_id == team_id))
+        for m in members
+    }
+    rates = analytics.member_rates(user_ids, member_ids, possible_by_member)
+    return TeamAnalyticsResponse(
+        team_id=team_id,
+        start=start,
+        end=end,
+        habits=[{"habit_id": h.id, "name": h.name, "completed": int(done[i].sum())} for i, h in enumerate(habits)],
+        members=[{"user_id": m.id, "name": m.name, "completion_rate": rates[m.id]} for m in members],
+        **analytics.correlation([h.id for h in habits], done),
+        **analytics.summarize(done, possible, start),
+    )
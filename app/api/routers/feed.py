@@ -0,0 +1,32 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_read_db
+from app.models.team import Team
+from app.services.feed import hub, sse_events
+
+router = APIRouter(
+    tags=['Feed'],
+)
+
+
+@router.get("/teams/{team_id}/feed")
+async def team_feed(team_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)):
+    """Server-Sent Events: отметки участников команды в реальном времени."""
+    if not await db.scalar(select(Team.id).where(Team.id == team_id)):
+        raise HTTPException(status_code=404, detail="Team not found")
+    # Сессия не нужна на всё время стрима — соединение возвращается в пул сразу
+    await db.close()
+
+    await hub.start()
+    subscription = hub.subscribe(team_id)
+    return StreamingResponse(
+        sse_events(hub, subscription, settings.FEED_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
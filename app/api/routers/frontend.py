@@ -1,103 +1,197 @@
-from fastapi import APIRouter
-from fastapi.templating import Jinja2Templates
+import asyncio
+import uuid
+from datetime import date
+from functools import cache
+
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
+from markupsafe import Markup
+from sqlalchemy import func, or_, select
 from starlette.requests import Request
 
+from app.database import get_read_sessionmaker
+from app.models.habit import Habit
+from app.models.habit_stats import HabitStats
+from app.models.team import Team
+from app.models.team_stats import TeamStats
+from app.models.tracking import Tracking
+from app.models.user import User
+from app.services.cache import response_cache
+from app.services.stats import snapshot
+
 router = APIRouter(tags=["Фронт"])
-templates = Jinja2Templates(directory="app/templates")
+
+
+@cache
+def templates():
+    # Jinja2 и окружение шаблонов создаются при первом рендере страницы
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="app/templates")
+
+
+# Пользователь страниц: ?user_id=... при первом заходе, дальше — из cookie
+VIEWER_COOKIE = "hh_user"
+
+
+def viewer_id(request: Request, user_id: uuid.UUID | None = None) -> uuid.UUID:
+    if user_id is not None:
+        return user_id
+    try:
+        return uuid.UUID(request.cookies.get(VIEWER_COOKIE, ""))
+    except ValueError:
+        raise HTTPException(status_code=303, headers={"Location": "/login"})
+
+
+def _render(request: Request, name: str, context: dict, user_id: uuid.UUID | None = None):
+    response = templates().TemplateResponse(request, name, {"request": request, **context})
+    if user_id is not None:
+        response.set_cookie(VIEWER_COOKIE, str(user_id), httponly=True, samesite="lax")
+    return response
+
+
+async def _gather(session_factory, *queries):
+    """Запросы страницы параллельно: у каждого своя сессия и соединение."""
+    async def run(query):
+        async with session_factory() as db:
+            return (await db.execute(query)).all()
+
+    return await asyncio.gather(*(run(query) for query in queries))
+
+
+def _user_habits(user_id: uuid.UUID):
+    # Личные привычки и общие привычки команды пользователя
+    team_id = select(User.team_id).where(User.id == user_id).scalar_subquery()
+    return or_(Habit.user_id == user_id, Habit.team_id == team_id)
+
 
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates().TemplateResponse(request, "index.html", {"request": request})
 
 @router.get("/login", response_class=HTMLResponse)
 async def login(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates().TemplateResponse(request, "login.html", {"request": request})
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    # Здесь пока мок-данные
-    habits = [
-        {"id": 1, "name": "Утренняя зарядка", "completed": True},
-        {"id": 2, "name": "Пить воду", "completed": False},
-        {"id": 3, "name": "Читать 10 мин", "completed": True},
-    ]
-
-    completed = sum(1 for h in habits if h["completed"])
-    progress = int(completed / len(habits) * 100)
-
-    return templates.TemplateResponse("dashboard.html", {
-        "request": request,
-        "user_name": "Алексей",
-        "habits": habits,
-        "progress_percent": progress,
-        "streak": 7
-    })
+async def dashboard(request: Request, user_id: uuid.UUID = Depends(viewer_id),
+                    session_factory=Depends(get_read_sessionmaker)):
+    today = date.today()
+
+    async def render_habits():
+        habits, done = await _gather(
+            session_factory,
+            select(Habit.id, Habit.name, HabitStats).outerjoin(HabitStats)
+            .where(_user_habits(user_id)).order_by(Habit.created_at),
+            select(Tracking.habit_id).where(Tracking.user_id == user_id, Tracking.date == today),
+        )
+        done = {row.habit_id for row in done}
+        items = [{"id": h.id, "name": h.name, "completed": h.id in done} for h in habits]
+        completed = sum(item["completed"] for item in items)
+        return templates().get_template("dashboard_habits.html").render(
+            habits=items,
+            progress_percent=int(completed / len(items) * 100) if items else 0,
+            streak=max((snapshot(h.HabitStats, today)["current_streak"] for h in habits), default=0),
+        )
+
+    async with session_factory() as db:
+        user = (await db.execute(select(User.name, User.team_id).where(User.id == user_id))).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Стрики общих привычек меняются от отметок любого участника: отметка сбрасывает
+    # team_page команды, а с ним и блоки привычек на дашбордах всех её участников
+    habits_block = await response_cache.fragment(
+        f"user_page:{user_id}", render_habits, variant=today.isoformat(),
+        depends_on=(f"team_page:{user.team_id}",) if user.team_id else (),
+    )
+
+    return _render(request, "dashboard.html", {
+        "user_name": user.name,
+        "habits_block": Markup(habits_block),
+    }, user_id)
 
 @router.get("/team", response_class=HTMLResponse)
-async def team_page(request: Request):
-    # В реальности подставишь данные из БД
-    fake_team = {
-        "name": "ЗОЖ-группа",
-        "streak": 12,
-        "completion_percent": 83,
-        "members": [
-            {"name": "Оля", "avatar_url": "/static/avatars/1.png"},
-            {"name": "Игорь", "avatar_url": "/static/avatars/2.png"},
-        ],
-        "habits": [
-            {
-                "name": "Утренняя зарядка",
-                "completed_by": [
-                    {"name": "Оля", "avatar_url": "/static/avatars/1.png"},
-                ]
-            },
-            {
-                "name": "Без сахара",
-                "completed_by": [
-                    {"name": "Игорь", "avatar_url": "/static/avatars/2.png"},
-                ]
-            }
-        ]
-    }
+async def team_page(request: Request, user_id: uuid.UUID = Depends(viewer_id),
+                    session_factory=Depends(get_read_sessionmaker)):
+    today = date.today()
+    async with session_factory() as db:
+        team = (await db.execute(
+            select(Team.id, Team.name, TeamStats.streak, TeamStats.completion_percent)
+            .outerjoin(TeamStats, TeamStats.team_id == Team.id)
+            .join(User, User.team_id == Team.id).where(User.id == user_id)
+        )).first()
+    if team is None:
+        return _render(request, "team.html", {"team": None}, user_id)
 
-    return templates.TemplateResponse("team.html", {
-        "request": request,
-        "team": fake_team
-    })
+    async def render_grid():
+        members, habits, done = await _gather(
+            session_factory,
+            select(User.id, User.name).where(User.team_id == team.id).order_by(User.created_at),
+            select(Habit.id, Habit.name).where(Habit.team_id == team.id).order_by(Habit.created_at),
+            select(Tracking.habit_id, User.name).join(User, User.id == Tracking.user_id)
+            .join(Habit, Habit.id == Tracking.habit_id)
+            .where(Habit.team_id == team.id, User.team_id == team.id, Tracking.date == today),
+        )
+        completed_by = {}
+        for row in done:
+            completed_by.setdefault(row.habit_id, []).append({"name": row.name, "avatar_url": None})
+        return templates().get_template("team_members.html").render(
+            members=[{"name": m.name, "avatar_url": None} for m in members],
+            habits=[{"name": h.name, "completed_by": completed_by.get(h.id, [])} for h in habits],
+        )
+
+    # Сетка участников и отметок — самый дорогой блок, кэшируется на команду до новой отметки
+    team_grid = await response_cache.fragment(f"team_page:{team.id}", render_grid, variant=today.isoformat())
+    return _render(request, "team.html", {
+        "team": {"id": team.id, "name": team.name, "streak": team.streak or 0,
+                 "completion_percent": team.completion_percent or 0},
+        "team_grid": Markup(team_grid),
+    }, user_id)
 
 
 @router.get("/habits", response_class=HTMLResponse)
-async def user_habits(request: Request):
-    # Пример данных для привычек пользователя, в реальности подставишь данные из базы данных
-    user_habits = [
-        {"id": 1, "name": "Утренняя зарядка", "completed_percentage": 85},
-        {"id": 2, "name": "Чтение книги", "completed_percentage": 70},
-        {"id": 3, "name": "Медитация", "completed_percentage": 90},
-    ]
-
-    return templates.TemplateResponse("habits.html", {
-        "request": request,
-        "habits": user_habits
-    })
+async def user_habits(request: Request, user_id: uuid.UUID = Depends(viewer_id),
+                      session_factory=Depends(get_read_sessionmaker)):
+    async with session_factory() as db:
+        habits = (await db.execute(
+            select(Habit.id, Habit.name, HabitStats).outerjoin(HabitStats)
+            .where(_user_habits(user_id)).order_by(Habit.created_at)
+        )).all()
 
-@router.get("/habit/{habit_id}", response_class=HTMLResponse)
-async def habit_page(request: Request, habit_id: int):
-    # Пример данных для привычки, в реальности подставишь данные из базы данных
-    fake_habit = {
-        "id": habit_id,
-        "name": "Утренняя зарядка",
-        "completed_by": [
-            {"name": "Оля", "avatar_url": "/static/avatars/1.png"},
-            {"name": "Игорь", "avatar_url": "/static/avatars/2.png"}
+    return _render(request, "habits.html", {
+        "habits": [
+            {"id": h.id, "name": h.name, "completed_percentage": snapshot(h.HabitStats)["completion_rate_30d"]}
+            for h in habits
         ],
-        "streak": 5,
-        "last_completed": "2025-04-08"
+    }, user_id)
+
+@router.get("/habit/{habit_id}", response_class=HTMLResponse)
+async def habit_page(request: Request, habit_id: uuid.UUID, session_factory=Depends(get_read_sessionmaker)):
+    team_id = select(Habit.team_id).where(Habit.id == habit_id).scalar_subquery()
+    rows, completed_by, members = await _gather(
+        session_factory,
+        select(Habit.id, Habit.name, Habit.team_id, HabitStats).outerjoin(HabitStats).where(Habit.id == habit_id),
+        select(User.name).join(Tracking, Tracking.user_id == User.id)
+        .where(Tracking.habit_id == habit_id, Tracking.date == date.today()),
+        select(func.count()).select_from(User).where(User.team_id == team_id),
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    row = rows[0]
+    total_members = members[0][0] if row.team_id else 1
+
+    habit = {
+        "id": row.id,
+        "name": row.name,
+        "completed_by": [{"name": user.name, "avatar_url": None} for user in completed_by],
+        **snapshot(row.HabitStats),
     }
-    total_members = 10  # Примерное количество участников команды
+    # Стрик берётся из habit_stats, а не считается по всем отметкам
+    habit["streak"] = habit["current_streak"]
 
-    return templates.TemplateResponse("habit.html", {
+    return templates().TemplateResponse(request, "habit.html", {
         "request": request,
-        "habit": fake_habit,
+        "habit": habit,
         "total_members": total_members
-    })
\ No newline at end of file
+    })
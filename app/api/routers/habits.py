@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from sqlalchemy import select
-from app.database import get_db
+from sqlalchemy import delete, select
+from app.api.queries import insert_returning
+from app.api.serialization import dump_list, response_columns
+from app.database import get_db, get_read_db
 from app.models.habit import Habit
+from app.models.habit_stats import HabitStats
+from app.models.tracking import Tracking
 from app.models.user import User
 from app.schemas.habit import HabitCreate, HabitResponse
+from app.services.cache import response_cache
 
 router = APIRouter(
     prefix="/users",
@@ -15,43 +22,49 @@ router = APIRouter(
 
 
 @router.post("/{user_id}/habits", response_model=HabitResponse)
-async def create_habit(user_id: str, habit: HabitCreate, db: AsyncSession = Depends(get_db)):
-    user = await db.scalar(
-        select(User).where(User.id == user_id)
+async def create_habit(user_id: uuid.UUID, habit: HabitCreate, db: AsyncSession = Depends(get_db)):
+    new_habit = await insert_returning(
+        db, Habit, {"name": habit.name, "description": habit.description, "user_id": user_id},
+        exists=User.id == user_id,
     )
-    if not user:
+    if new_habit is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    new_habit = Habit(name=habit.name, description=habit.description, user_id=user_id)
-    db.add(new_habit)
     await db.commit()
-    await db.refresh(new_habit)
+    await response_cache.invalidate(f"user_habits:{user_id}", f"user_page:{user_id}")
 
     return new_habit
 
 
 @router.get("/{user_id}/habits", response_model=list[HabitResponse])
-async def get_habits(user_id: str, db: AsyncSession = Depends(get_db)):
-    user = await db.scalar(
-        select(User).where(User.id == user_id)
-    )
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_habits(user_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        # Пользователь без привычек даёт одну строку с id = None, несуществующий — ни одной
+        rows = (await db.execute(
+            select(*response_columns(Habit, HabitResponse))
+            .select_from(User).outerjoin(Habit, Habit.user_id == User.id).where(User.id == user_id)
+        )).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    habits = await db.scalars(
-        select(Habit).where(Habit.user_id == user_id)
-    )
-    return habits.all()
+        return dump_list(HabitResponse, [row for row in rows if row.id is not None]), {}
+
+    return await response_cache.respond(request, f"user_habits:{user_id}", build)
 
 
 @router.delete("/{user_id}/habits/{habit_id}", status_code=204)
-async def delete_habit(user_id: str, habit_id: str, db: AsyncSession = Depends(get_db)):
-    habit = await db.scalar(
-        select(Habit).where(Habit.id == habit_id, Habit.user_id == user_id)
+async def delete_habit(user_id: uuid.UUID, habit_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    # Зависимые строки удаляем запросами, не загружая их в сессию ради каскада ORM
+    owned = select(Habit.id).where(Habit.id == habit_id, Habit.user_id == user_id)
+    await db.execute(delete(HabitStats).where(HabitStats.habit_id.in_(owned)))
+    await db.execute(delete(Tracking).where(Tracking.habit_id.in_(owned)))
+    deleted = await db.scalar(
+        delete(Habit).where(Habit.id == habit_id, Habit.user_id == user_id).returning(Habit.id)
     )
-    if not habit:
+    if deleted is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Habit not found")
 
-    await db.delete(habit)
     await db.commit()
+    await response_cache.invalidate(f"user_habits:{user_id}", f"user_page:{user_id}")
     return
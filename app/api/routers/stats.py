@@ -0,0 +1,38 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.database import get_read_db
+from app.models.habit import Habit
+from app.models.habit_stats import HabitStats
+from app.models.user import User
+from app.schemas.habit import HabitStatsResponse
+from app.services.stats import snapshot
+
+router = APIRouter(
+    tags=['Stats'],
+)
+
+
+@router.get("/habits/{habit_id}/stats", response_model=HabitStatsResponse)
+async def get_habit_stats(habit_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)):
+    row = (await db.execute(
+        select(Habit.id, HabitStats).outerjoin(HabitStats).where(Habit.id == habit_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    return HabitStatsResponse(habit_id=row.id, **snapshot(row.HabitStats))
+
+
+@router.get("/users/{user_id}/stats", response_model=list[HabitStatsResponse])
+async def get_user_stats(user_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)):
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    rows = await db.execute(
+        select(Habit.id, HabitStats).outerjoin(HabitStats).where(Habit.user_id == user_id).order_by(Habit.created_at)
+    )
+    return [HabitStatsResponse(habit_id=row.id, **snapshot(row.HabitStats)) for row in rows]
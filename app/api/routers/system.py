@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import pool_status
+from app.metrics import registry
+
+router = APIRouter(
+    tags=['System'],
+)
+
+
+@router.get("/system/pool")
+async def get_pool_status():
+    # Для подбора pool_size / числа воркеров: рост wait_seconds и timeouts — пула не хватает
+    return pool_status()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
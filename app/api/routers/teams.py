@@ -1,71 +1,168 @@
 import uuid
+from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import or_, select, update
 
-
-from app.database import get_db
+from app.api.pagination import NEXT_CURSOR_HEADER, PageParams, keyset_page, keyset_response, page_params
+from app.api.queries import insert_returning
+from app.api.serialization import dump_list, item_adapter, response_columns
+from app.database import get_db, get_read_db
+from app.models.habit import Habit
 from app.models.team import Team
+from app.models.team_stats import TeamMemberStats, TeamStats
+from app.models.tracking import Tracking
 from app.models.user import User
-from app.schemas.team import TeamCreate, TeamResponse
+from app.schemas.habit import HabitResponse
+from app.schemas.team import (
+    TeamCreate, TeamLeaderboardMember, TeamLeaderboardResponse, TeamOverviewResponse, TeamResponse,
+)
+from app.schemas.tracking import TrackingResponse
+from app.services import leaderboard
+from app.services.cache import response_cache
 
 router = APIRouter(
     tags=['Teams'],
 )
 
+OVERVIEW_DEFAULT_DAYS = 7
+OVERVIEW_MAX_DAYS = 92
+
 
 @router.post("/users/{user_id}/teams", response_model=TeamResponse)
 async def create_team(user_id: uuid.UUID, team_data: TeamCreate, db: AsyncSession = Depends(get_db)):
-    user = await db.scalar(select(User).where(User.id == user_id))
-    if not user:
+    team = await insert_returning(db, Team, {"name": team_data.name, "owner_id": user_id}, exists=User.id == user_id)
+    if team is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    team = Team(
-        name=team_data.name,
-        owner_id=user_id,
-    )
-    db.add(team)
     await db.commit()
-    await db.refresh(team)
+    await response_cache.invalidate("teams")
     return team
 
 
 @router.get("/teams/{team_id}", response_model=TeamResponse)
-async def get_team(team_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    team = await db.scalar(select(Team).where(Team.id == team_id))
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-    return team
+async def get_team(team_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        team = (await db.execute(select(*response_columns(Team, TeamResponse)).where(Team.id == team_id))).first()
+        if not team:
+            raise HTTPException(status_code=404, detail="Team not found")
+        adapter = item_adapter(TeamResponse)
+        return adapter.dump_json(adapter.validate_python(team, from_attributes=True)), {}
+
+    return await response_cache.respond(request, f"team:{team_id}", build)
 
 
 @router.post("/users/{user_id}/join/{team_id}", response_model=TeamResponse)
 async def join_team(user_id: uuid.UUID, team_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    # Найдем команду по UUID
-    team = await db.scalar(select(Team).where(Team.id == team_id))
-
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-
-    user = await db.scalar(select(User).where(User.id == user_id))
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Проверка, что пользователь не состоит уже в команде
-    if user.team_id:
+    # Один UPDATE: существование команды — EXISTS в условии, её поля — подзапросами в RETURNING
+    team_row = select(Team.id).where(Team.id == team_id)
+    team = (await db.execute(
+        update(User)
+        .where(User.id == user_id, User.team_id.is_(None), team_row.exists())
+        .values(team_id=team_id)
+        .returning(*(
+            select(column).where(Team.id == team_id).scalar_subquery().label(column.key)
+            for column in response_columns(Team, TeamResponse)
+        ))
+    )).first()
+    if team is None:
+        # Строка не обновлена — выясняем почему; это путь ошибки, лишние запросы здесь не важны
+        if not await db.scalar(select(Team.id).where(Team.id == team_id)):
+            raise HTTPException(status_code=404, detail="Team not found")
+        if not await db.scalar(select(User.id).where(User.id == user_id)):
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=400, detail="User is already in a team")
 
-    # Присоединяем пользователя к команде
-    user.team_id = team.id
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
+    leaderboard.scheduler.mark_team(team_id)
+    await response_cache.invalidate(f"team:{team_id}", f"team_page:{team_id}", f"user_page:{user_id}")
 
     return team
 
 
 @router.get("/teams", response_model=list[TeamResponse])
-async def get_all_teams(db: AsyncSession = Depends(get_db)):
-    teams = await db.scalars(select(Team))
-    return teams.all()
\ No newline at end of file
+async def get_all_teams(request: Request, response: Response, page: PageParams = Depends(page_params),
+                        db: AsyncSession = Depends(get_read_db)):
+    stmt = select(*response_columns(Team, TeamResponse))
+    if page.stream:
+        return await keyset_response(db, stmt, [Team.created_at, Team.id], page, TeamResponse, response)
+
+    async def build():
+        teams = await keyset_page(db, stmt, [Team.created_at, Team.id], page, TeamResponse, response)
+        next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        return dump_list(TeamResponse, teams), {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+    return await response_cache.respond(request, "teams", build, variant=str(request.query_params))
+
+
+@router.get("/teams/{team_id}/leaderboard", response_model=TeamLeaderboardResponse)
+async def get_team_leaderboard(team_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    summary = await db.scalar(select(TeamStats).where(TeamStats.team_id == team_id))
+    if summary is None:
+        # Сводки ещё нет (новая команда) — считаем один раз на месте
+        if not await db.scalar(select(Team.id).where(Team.id == team_id)):
+            raise HTTPException(status_code=404, detail="Team not found")
+        await leaderboard.refresh_teams(db, [team_id])
+        await db.commit()
+        summary = await db.scalar(select(TeamStats).where(TeamStats.team_id == team_id))
+
+    members = await db.scalars(
+        select(TeamMemberStats)
+        .where(TeamMemberStats.team_id == team_id)
+        .order_by(TeamMemberStats.completion_percent.desc(), TeamMemberStats.streak.desc(), TeamMemberStats.name)
+    )
+    return TeamLeaderboardResponse(
+        team_id=summary.team_id,
+        members_count=summary.members_count,
+        streak=summary.streak,
+        completion_percent=summary.completion_percent,
+        refreshed_at=summary.refreshed_at,
+        members=[TeamLeaderboardMember.model_validate(m, from_attributes=True) for m in members],
+    )
+
+
+@router.get("/teams/{team_id}/overview", response_model=TeamOverviewResponse)
+async def get_team_overview(team_id: uuid.UUID, start: date | None = Query(None), end: date | None = Query(None),
+                            db: AsyncSession = Depends(get_read_db)):
+    """Всё для экрана команды одним ответом вместо запросов по каждому участнику и привычке.
+
+    Четыре запроса независимо от размера команды: команда, участники,
+    привычки (командные и личные привычки участников), отметки за окно.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=OVERVIEW_DEFAULT_DAYS - 1)
+    if start > end or (end - start).days >= OVERVIEW_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window must be 1..{OVERVIEW_MAX_DAYS} days")
+
+    team = (await db.execute(select(*response_columns(Team, TeamResponse)).where(Team.id == team_id))).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+
+    member_ids = select(User.id).where(User.team_id == team_id)
+    team_habits = or_(Habit.team_id == team_id, Habit.user_id.in_(member_ids))
+    members = (await db.execute(
+        select(User.id, User.name).where(User.team_id == team_id).order_by(User.created_at, User.id)
+    )).all()
+    habits = (await db.execute(
+        select(*response_columns(Habit, HabitResponse), Habit.team_id).where(team_habits)
+        .order_by(Habit.created_at, Habit.id)
+    )).all()
+    trackings = (await db.execute(
+        select(*response_columns(Tracking, TrackingResponse)).join(Habit, Habit.id == Tracking.habit_id)
+        .where(team_habits, Tracking.user_id.in_(member_ids), Tracking.date.between(start, end))
+        .order_by(Tracking.date, Tracking.id)
+    )).all()
+
+    by_habit = {}
+    for tracking in trackings:
+        by_habit.setdefault(tracking.habit_id, []).append(tracking)
+    adapter = item_adapter(TeamOverviewResponse)
+    overview = adapter.validate_python({
+        "team": team,
+        "start": start,
+        "end": end,
+        "members": members,
+        "habits": [{**h._asdict(), "trackings": by_habit.get(h.id, [])} for h in habits],
+    }, from_attributes=True)
+    return Response(content=adapter.dump_json(overview), media_type="application/json")
@@ -1,52 +1,255 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, or_, literal, delete, tuple_
+from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.api.pagination import NDJSON_MEDIA_TYPE, PageParams, keyset_page, keyset_response, page_params
+from app.api.serialization import json_list_response, response_columns
+from app.config import settings
+from app.database import dialect_insert, get_db, get_read_db
 from app.models.tracking import Tracking
 from app.models.habit import Habit
-from app.schemas.tracking import TrackingCreate, TrackingResponse
+from app.models.user import User
+from app.services import bitmaps, leaderboard, stats
+from app.services.cache import response_cache
+from app.services.feed import hub as feed_hub
+from app.schemas.tracking import TrackingBatchItemResult, TrackingBatchResponse, TrackingCreate, TrackingResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     tags=['Trackings'],
 )
 
+TRACKING_BATCH_LIMIT = 1000
+
+_tracking_list = TypeAdapter(list[TrackingCreate])
+
+
+def ignore_duplicate_trackings(db: AsyncSession, stmt):
+    """ON CONFLICT ON CONSTRAINT uix_tracking_unique_per_day DO NOTHING RETURNING."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite (тестовая БД) не знает имён ограничений, только столбцы
+        stmt = stmt.on_conflict_do_nothing(index_elements=["habit_id", "user_id", "date"])
+    else:
+        stmt = stmt.on_conflict_do_nothing(constraint="uix_tracking_unique_per_day")
+    return stmt.returning(Tracking.id, Tracking.habit_id, Tracking.user_id, Tracking.date)
+
+
+async def announce(db: AsyncSession, trackings, event_type: str):
+    """После записи отметок: сброс кэша страниц и события в ленты команд участников.
+
+    Запись уже закоммичена, поэтому сбой здесь (Redis, NOTIFY, БД) только
+    логируется: ответ 500 на успешную запись заставил бы клиента повторить её.
+    """
+    try:
+        # Привычки и пользователи отметок — одним запросом по парам (привычка, пользователь)
+        rows = (await db.execute(
+            select(Habit.id.label("habit_id"), Habit.name.label("habit_name"), Habit.team_id.label("habit_team_id"),
+                   User.id.label("user_id"), User.name.label("user_name"), User.team_id.label("user_team_id"))
+            # Пары заданы явно: без условия, связывающего таблицы, это было бы декартово произведение
+            .select_from(Habit)
+            .join(User, tuple_(Habit.id, User.id).in_({(t.habit_id, t.user_id) for t in trackings}))
+        )).all()
+    except Exception:
+        logger.exception("Failed to load habits and users for %s", event_type)
+        return
+    pairs = {(row.habit_id, row.user_id): row for row in rows}
+    try:
+        await response_cache.invalidate(*{f"team_page:{row.habit_team_id}" for row in rows if row.habit_team_id},
+                                        *{f"user_page:{t.user_id}" for t in trackings})
+    except Exception:
+        logger.exception("Failed to invalidate pages after %s", event_type)
+
+    for tracking in trackings:
+        row = pairs.get((tracking.habit_id, tracking.user_id))
+        if row is None or row.user_team_id is None:
+            continue
+        # publish сам перехватывает и логирует ошибки доставки
+        await feed_hub.publish(row.user_team_id, {
+            "type": event_type,
+            "id": str(tracking.id),
+            "habit_id": str(row.habit_id),
+            "habit_name": row.habit_name,
+            "user_id": str(row.user_id),
+            "user_name": row.user_name,
+            "date": tracking.date.isoformat(),
+        })
+
+
+async def _read_batch(request: Request) -> list[TrackingCreate]:
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+            items = []
+            buffer = b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                items.extend(TrackingCreate.model_validate_json(line) for line in lines if line.strip())
+                if len(items) > TRACKING_BATCH_LIMIT:
+                    break
+            if buffer.strip():
+                items.append(TrackingCreate.model_validate_json(buffer))
+        else:
+            items = _tracking_list.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    if len(items) > TRACKING_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {TRACKING_BATCH_LIMIT} trackings")
+    return items
+
 
 @router.post("/trackings", response_model=TrackingResponse)
 async def create_tracking(tracking_data: TrackingCreate, db: AsyncSession = Depends(get_db)):
-    habit = await db.scalar(select(Habit).where(Habit.id == tracking_data.habit_id))
-    if not habit:
-        raise HTTPException(status_code=404, detail="Habit not found")
-
-    # Проверка, чтобы не дублировать дату
-    existing_tracking = await db.scalar(
-        select(Tracking).where(
-            and_(
-                Tracking.habit_id == tracking_data.habit_id,
-                Tracking.date == tracking_data.date
-            )
-        )
+    # Один запрос: INSERT ... SELECT из habits, дубликат отсекает uix_tracking_unique_per_day
+    source = select(
+        literal(uuid.uuid4(), Tracking.id.type),
+        Habit.id,
+        literal(tracking_data.user_id, Tracking.user_id.type),
+        literal(tracking_data.date, Tracking.date.type),
+    ).where(Habit.id == tracking_data.habit_id)
+    stmt = ignore_duplicate_trackings(
+        db, dialect_insert(db, Tracking).from_select(["id", "habit_id", "user_id", "date"], source)
     )
-    if existing_tracking:
+    try:
+        tracking = (await db.execute(stmt)).first()
+        if tracking is not None:
+            await stats.record_completion(db, tracking.habit_id, tracking.date)
+            if settings.COMPLETION_BITMAPS:
+                await bitmaps.set_day(db, tracking.habit_id, tracking.user_id, tracking.date)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if tracking is None:
+        # Строка не вставлена: либо нет привычки, либо отметка за этот день уже есть
+        if not await db.scalar(select(Habit.id).where(Habit.id == tracking_data.habit_id)):
+            raise HTTPException(status_code=404, detail="Habit not found")
         raise HTTPException(status_code=400, detail="Tracking already exists for this date")
 
-    tracking = Tracking(
-        habit_id=tracking_data.habit_id,
-        user_id=tracking_data.user_id,
-        date=tracking_data.date,
+    leaderboard.scheduler.mark_user(tracking.user_id)
+    await announce(db, [tracking], "tracking.created")
+    return tracking
+
+
+@router.post(
+    "/trackings/batch",
+    response_model=TrackingBatchResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": _tracking_list.json_schema()},
+                NDJSON_MEDIA_TYPE: {"schema": TrackingCreate.model_json_schema()},
+            },
+        }
+    },
+)
+async def create_trackings_batch(request: Request, db: AsyncSession = Depends(get_db)):
+    """Пакетная загрузка отметок (офлайн-синхронизация мобильных клиентов).
+
+    Принимает JSON-массив или NDJSON; привычка должна принадлежать
+    пользователю или его команде. Все строки пишутся одним INSERT.
+    """
+    items = await _read_batch(request)
+    if not items:
+        return TrackingBatchResponse(created=0, duplicates=0, rejected=0, items=[])
+
+    # Владение проверяем одним запросом: пары (habit_id, user_id), которым можно отмечаться
+    habit_ids = {item.habit_id for item in items}
+    user_ids = {item.user_id for item in items}
+    allowed = set(
+        (await db.execute(
+            select(Habit.id, User.id)
+            .join(User, or_(
+                User.id == Habit.user_id,
+                and_(Habit.team_id.is_not(None), User.team_id == Habit.team_id),
+            ))
+            .where(Habit.id.in_(habit_ids), User.id.in_(user_ids))
+        )).all()
     )
-    db.add(tracking)
-    await db.commit()
-    await db.refresh(tracking)
 
-    return tracking
+    rows = {}
+    for item in items:
+        key = (item.habit_id, item.user_id, item.date)
+        if (item.habit_id, item.user_id) in allowed and key not in rows:
+            rows[key] = {"id": uuid.uuid4(), "habit_id": item.habit_id, "user_id": item.user_id, "date": item.date}
+
+    inserted = {}
+    if rows:
+        result = await db.execute(ignore_duplicate_trackings(db, dialect_insert(db, Tracking).values(list(rows.values()))))
+        created = result.all()
+        inserted = {(r.habit_id, r.user_id, r.date): r.id for r in created}
+        # Офлайн-бэклог почти всегда приходит задним числом — пересчитываем затронутые привычки целиком
+        await stats.rebuild_habits(db, {habit_id for habit_id, _, _ in inserted})
+        if settings.COMPLETION_BITMAPS:
+            await bitmaps.rebuild(db, {(habit_id, user_id, day.year) for habit_id, user_id, day in inserted})
+        await db.commit()
+        for user_id in {user_id for _, user_id, _ in inserted}:
+            leaderboard.scheduler.mark_user(user_id)
+        if created:
+            await announce(db, created, "tracking.created")
+
+    results = []
+    for item in items:
+        key = (item.habit_id, item.user_id, item.date)
+        if (item.habit_id, item.user_id) not in allowed:
+            status, tracking_id = "rejected", None
+        elif key in inserted:
+            # Повтор внутри пакета считается дубликатом первой записи
+            status, tracking_id = "created", inserted.pop(key)
+        else:
+            status, tracking_id = "duplicate", None
+        results.append(TrackingBatchItemResult(
+            habit_id=item.habit_id, user_id=item.user_id, date=item.date, status=status, id=tracking_id,
+        ))
+
+    return TrackingBatchResponse(
+        created=sum(r.status == "created" for r in results),
+        duplicates=sum(r.status == "duplicate" for r in results),
+        rejected=sum(r.status == "rejected" for r in results),
+        items=results,
+    )
+
+
+@router.delete("/trackings/{tracking_id}", status_code=204)
+async def delete_tracking(tracking_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    tracking = (await db.execute(
+        delete(Tracking).where(Tracking.id == tracking_id)
+        .returning(Tracking.id, Tracking.habit_id, Tracking.user_id, Tracking.date)
+    )).first()
+    if tracking is None:
+        raise HTTPException(status_code=404, detail="Tracking not found")
+
+    await stats.record_removal(db, tracking.habit_id, tracking.date)
+    if settings.COMPLETION_BITMAPS:
+        await bitmaps.clear_day(db, tracking.habit_id, tracking.user_id, tracking.date)
+    await db.commit()
+    leaderboard.scheduler.mark_user(tracking.user_id)
+    await announce(db, [tracking], "tracking.deleted")
+    return
 
 
 @router.get("/habits/{habit_id}/trackings", response_model=list[TrackingResponse])
-async def get_trackings(habit_id: str, db: AsyncSession = Depends(get_db)):
-    habit = await db.scalar(select(Habit).where(Habit.id == habit_id))
-    if not habit:
-        raise HTTPException(status_code=404, detail="Habit not found")
+async def get_trackings(habit_id: uuid.UUID, response: Response, page: PageParams = Depends(page_params),
+                        db: AsyncSession = Depends(get_read_db)):
+    habit_exists = select(Habit.id).where(Habit.id == habit_id)
+    stmt = select(*response_columns(Tracking, TrackingResponse)).where(Tracking.habit_id == habit_id)
+    if page.stream:
+        # После начала стрима статус уже не поменять — проверяем привычку заранее
+        if not await db.scalar(habit_exists):
+            raise HTTPException(status_code=404, detail="Habit not found")
+        return await keyset_response(db, stmt, [Tracking.date, Tracking.id], page, TrackingResponse, response)
 
-    result = await db.scalars(select(Tracking).where(Tracking.habit_id == habit_id))
-    return list(result)
+    trackings = await keyset_page(db, stmt, [Tracking.date, Tracking.id], page, TrackingResponse, response)
+    # Существование привычки проверяем, только если страница пуста
+    if not trackings and not await db.scalar(habit_exists):
+        raise HTTPException(status_code=404, detail="Habit not found")
+    return json_list_response(TrackingResponse, trackings, response.headers)
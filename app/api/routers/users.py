@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.database import get_db
+from app.api.queries import insert_returning
+from app.api.pagination import PageParams, keyset_response, page_params
+from app.api.serialization import response_columns
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
 
@@ -12,13 +15,11 @@ router = APIRouter(
 
 @router.post("/", response_model=UserResponse)
 async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
-    user = User(email=user_in.email, name=user_in.name)
-    db.add(user)
+    user = await insert_returning(db, User, {"email": user_in.email, "name": user_in.name})
     await db.commit()
-    await db.refresh(user)
     return user
 
 @router.get("/", response_model=list[UserResponse])
-async def list_users(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+async def list_users(response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
+    return await keyset_response(db, select(*response_columns(User, UserResponse)), [User.created_at, User.id],
+                                 page, UserResponse, response)
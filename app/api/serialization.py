@@ -0,0 +1,34 @@
+"""Лёгкий путь ответов-списков: только нужные столбцы и готовый JSON.
+
+Запрос выбирает столбцы схемы ответа (строки-кортежи, без ORM-объектов и
+identity map), TypeAdapter собирается один раз на схему, а тело отдаётся
+байтами — без повторной валидации response_model и jsonable_encoder.
+"""
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def response_columns(model, schema: type[BaseModel]) -> list:
+    """Столбцы модели, которые попадают в ответ schema."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+@lru_cache
+def item_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+@lru_cache
+def list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def dump_list(schema: type[BaseModel], rows) -> bytes:
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def json_list_response(schema: type[BaseModel], rows, headers=None) -> Response:
+    return Response(content=dump_list(schema, rows), media_type="application/json", headers=headers)
@@ -1,45 +1,266 @@
-import requests
-import jwt
-from jwt.algorithms import RSAAlgorithm
-from fastapi import Depends, HTTPException, Security
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from typing import Optional
 
 # Получение JWKS (JSON Web Key Set) от Clerk
 JWKS_URL = "https://curious-polecat-50.clerk.accounts.dev/.well-known/jwks.json"
+JWT_AUDIENCE = "your-audience"
+JWT_ISSUER = "https://api.clerk.com"
+
+# TTL ключей, если Clerk не прислал Cache-Control
+JWKS_DEFAULT_TTL = 300
+# Не чаще одного внепланового запроса JWKS на неизвестный kid за этот интервал
+JWKS_MIN_REFETCH_INTERVAL = 30
+# Фоновое обновление стартует заранее, до истечения TTL
+JWKS_REFRESH_MARGIN = 0.1
+# Сколько проверенных токенов держим в памяти
+TOKEN_CACHE_SIZE = 10_000
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class KeyNotFoundError(Exception):
+    pass
+
+
+def parse_max_age(cache_control: str | None) -> float | None:
+    if not cache_control:
+        return None
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    return float(match.group(1)) if match else None
+
+
+class HttpJWKSSource:
+    """JWKS по HTTPS, TTL берётся из Cache-Control ответа."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def fetch(self) -> tuple[dict, float | None]:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.get(self.url)
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Unable to fetch JWKS")
+        return response.json(), parse_max_age(response.headers.get("cache-control"))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FileJWKSSource:
+    """Локальный JWKS-файл: для тестов и работы без доступа к Clerk."""
+
+    def __init__(self, path: str | Path, ttl: float | None = None):
+        self.path = Path(path)
+        self.ttl = ttl
+
+    async def fetch(self) -> tuple[dict, float | None]:
+        text = await asyncio.to_thread(self.path.read_text)
+        return json.loads(text), self.ttl
+
+    async def aclose(self):
+        pass
+
+
+class JWKSKeyStore:
+    """Кэш разобранных RSA-ключей по kid.
+
+    Ключи обновляются в фоне до истечения TTL; запрос неизвестного kid
+    вызывает не более одного внепланового обращения к источнику, сколько бы
+    корутин его ни ждало.
+    """
+
+    def __init__(self, source, default_ttl: float = JWKS_DEFAULT_TTL,
+                 min_refetch_interval: float = JWKS_MIN_REFETCH_INTERVAL):
+        self.source = source
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.fetch_count = 0
+        self._keys: dict = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._inflight: asyncio.Task | None = None
+        self._refresher: asyncio.Task | None = None
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() < self._expires_at
+
+    async def _load(self):
+        from jwt.algorithms import RSAAlgorithm
+
+        jwks, max_age = await self.source.fetch()
+        keys = {}
+        for key in jwks.get("keys", []):
+            if key.get("kty") == "RSA" and "kid" in key:
+                keys[key["kid"]] = RSAAlgorithm.from_jwk(key)
+        ttl = self.default_ttl if max_age is None else max_age
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + ttl
+        self.fetch_count += 1
+
+    async def refresh(self):
+        # single-flight: все ожидающие получают результат одного запроса
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._inflight)
+
+    async def get_key(self, kid: str):
+        if not self._is_fresh():
+            await self.refresh()
+        self._ensure_refresher()
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Неизвестный kid: возможно, Clerk сменил ключи раньше TTL
+        if time.monotonic() - self._fetched_at >= self.min_refetch_interval:
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise KeyNotFoundError(kid)
+        return key
+
+    def has_key(self, kid: str) -> bool:
+        return kid in self._keys
+
+    def _ensure_refresher(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            ttl_left = self._expires_at - time.monotonic()
+            await asyncio.sleep(max(ttl_left * (1 - JWKS_REFRESH_MARGIN), 1.0))
+            try:
+                await self.refresh()
+            except Exception:
+                # Ключи остаются прежними, следующая попытка по расписанию
+                await asyncio.sleep(self.min_refetch_interval)
+
+    async def aclose(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        await self.source.aclose()
+
+
+class VerifiedTokenCache:
+    """LRU уже проверенных токенов: повторный запрос той же сессии не
+    пересчитывает RS256. Запись живёт до claim exp токена."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[float, str, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str, store: JWKSKeyStore) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            exp, kid, payload = entry
+            # Ключ мог быть отозван ротацией JWKS — тогда проверяем заново
+            if exp > time.time() and store.has_key(kid):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, kid: str, payload: dict):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = (float(exp), kid, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+# Хранилище ключей создаётся при первой проверке токена
+key_store: JWKSKeyStore | None = None
+token_cache = VerifiedTokenCache()
+
+
+def get_key_store() -> JWKSKeyStore:
+    global key_store
+    if key_store is None:
+        key_store = JWKSKeyStore(HttpJWKSSource(JWKS_URL))
+    return key_store
+
+
+def use_key_store(store: JWKSKeyStore):
+    global key_store
+    key_store = store
+    token_cache.clear()
+
+
+async def aclose():
+    if key_store is not None:
+        await key_store.aclose()
 
-# Загружаем JWKS для проверки подписи токенов
-def get_jwks():
-    response = requests.get(JWKS_URL)
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Unable to fetch JWKS")
-    return response.json()
-
-# Извлечение публичного ключа для проверки токена
-def get_public_key(kid: str):
-    jwks = get_jwks()
-    for key in jwks["keys"]:
-        if key["kid"] == kid:
-            return RSAAlgorithm.from_jwk(key)
-    raise HTTPException(status_code=400, detail="Public key not found")
 
 # Функция для проверки JWT
-def verify_jwt(token: str):
+async def verify_jwt(token: str, store: JWKSKeyStore | None = None, cache: VerifiedTokenCache | None = None):
+    # PyJWT и криптография грузятся при первой проверке, а не при импорте приложения
+    import jwt
+
+    store = store or get_key_store()
+    cache = cache or token_cache
+    payload = cache.get(token, store)
+    if payload is not None:
+        return payload
     try:
         # Извлекаем "kid" из заголовка токена
         unverified_header = jwt.get_unverified_header(token)
         if unverified_header is None or "kid" not in unverified_header:
             raise HTTPException(status_code=400, detail="Invalid token header")
+        kid = unverified_header["kid"]
 
         # Получаем публичный ключ
-        public_key = get_public_key(unverified_header["kid"])
+        public_key = await store.get_key(kid)
 
         # Проверяем подпись токена и его содержимое
-        payload = jwt.decode(token, public_key, algorithms=["RS256"], audience="your-audience", issuer="https://api.clerk.com")
+        payload = jwt.decode(token, public_key, algorithms=["RS256"], audience=JWT_AUDIENCE, issuer=JWT_ISSUER)
+        cache.put(token, kid, payload)
         return payload
+    except HTTPException:
+        raise
+    except KeyNotFoundError:
+        raise HTTPException(status_code=401, detail="Public key not found")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTClaimsError:
+    except (jwt.InvalidAudienceError, jwt.InvalidIssuerError):
         raise HTTPException(status_code=401, detail="Invalid claims, please check the audience and issuer")
     except Exception:
         raise HTTPException(status_code=401, detail="Could not parse token")
@@ -48,5 +269,5 @@ def verify_jwt(token: str):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Зависимость для верификации токена в каждом эндпоинте
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    return verify_jwt(token)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return await verify_jwt(token)
@@ -3,20 +3,86 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    DB_USERNAME: str
-    DB_PASSWORD: str
-    DB_NAME: str
-    DB_HOST: str
-    DB_PORT: str
-    DATABASE_URL: str
-
-    @model_validator(mode="before")
-    def set_more_field(cls, values):
-        values["DATABASE_URL"] = (
-            f"postgresql+asyncpg://{values['DB_USERNAME']}:{values['DB_PASSWORD']}"
-            f"@{values['DB_HOST']}:{values['DB_PORT']}/{values['DB_NAME']}"
-        )
-        return values
+    # Подключение к БД: DATABASE_URL целиком или DB_*. Без них импорт приложения
+    # работает, а первое обращение к БД падает с понятной ошибкой (app.database)
+    DB_USERNAME: str | None = None
+    DB_PASSWORD: str | None = None
+    DB_NAME: str | None = None
+    DB_HOST: str | None = None
+    DB_PORT: str = "5432"
+    # Собирается из DB_*, если не задан явно
+    DATABASE_URL: str = ""
+
+    # Движок БД
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Кэш подготовленных выражений asyncpg и SQLAlchemy на соединение;
+    # 0 отключает (нужно за pgbouncer в режиме transaction)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+
+    # Реплика для GET-запросов; без неё чтение идёт в основную БД
+    READ_DATABASE_URL: str | None = None
+    # Сколько секунд после записи клиент читает из основной БД (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    # Кэш ответов: в памяти процесса или Redis-совместимый сервер (redis://...)
+    CACHE_ENABLED: bool = True
+    CACHE_URL: str | None = None
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_MAX_ENTRIES: int = 10_000
+
+    # Idempotency-Key: сколько хранить результат записи для повторов клиента.
+    # Хранилище то же, что у кэша (память процесса или CACHE_URL)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_MAX_ENTRIES: int = 100_000
+
+    # Метрики запросов (Server-Timing, /metrics); предупреждение о N+1, если
+    # выражение одной формы выполнено за запрос столько раз или больше
+    METRICS_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Лента команды (SSE): local — в пределах процесса, postgres — LISTEN/NOTIFY между воркерами
+    FEED_BACKEND: str = "local"
+    FEED_QUEUE_SIZE: int = 100
+    FEED_HEARTBEAT_SECONDS: float = 15
+
+    # Помесячные секции tracking (Postgres): сколько будущих месяцев держать созданными
+    TRACKING_PARTITIONS_AHEAD: int = 3
+
+    # Вести ли рядом с tracking компактные годовые битовые карты отметок
+    COMPLETION_BITMAPS: bool = False
+
+    # Фоновые задачи: воркер в процессе приложения, одновременно не больше JOBS_CONCURRENCY;
+    # ежедневные задачи ставятся после указанного часа (UTC)
+    JOBS_ENABLED: bool = True
+    JOBS_CONCURRENCY: int = 4
+    JOBS_POLL_SECONDS: float = 2
+    JOBS_REMINDER_HOUR: int = 18
+    JOBS_ROLLUP_HOUR: int = 3
+
+    # Запуск сервера (python main.py): 0 воркеров — по числу ядер
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # Фронтенд: разрешённые источники CORS и каталог сборки SPA (если есть — раздаётся с /)
+    CORS_ORIGINS: list[str] = ["http://localhost:3000"]
+    FRONTEND_BUILD_DIR: str = "frontend/build"
+
+    @model_validator(mode="after")
+    def set_more_field(self):
+        if not self.DATABASE_URL and self.DB_USERNAME and self.DB_PASSWORD and self.DB_HOST and self.DB_NAME:
+            self.DATABASE_URL = (
+                f"postgresql+asyncpg://{self.DB_USERNAME}:{self.DB_PASSWORD}"
+                f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+            )
+        return self
 
     class Config:
         env_file = '.env'
@@ -1,22 +1,290 @@
+import re
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event, exc, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
+DATABASE_NOT_CONFIGURED = (
+    "Database is not configured: set DATABASE_URL or DB_USERNAME, DB_PASSWORD, DB_HOST "
+    "and DB_NAME (environment or .env)"
+)
 
-# Асинхронный движок
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
 
-# Сессия
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+class PoolMetrics:
+    """Счётчики пула соединений: сколько раз и как долго ждали соединение."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+
+class QueryStats:
+    """SQL-статистика одного запроса к API: число выражений, время в БД и ожидание пула."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[_statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Выражения одной формы, выполненные threshold и более раз, — признак N+1."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+# Параметры драйверов ($1, %(name)s, ?) и раскрытые IN-списки сводим к одной форме
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_PARAM_LIST_RE = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+
+
+def _statement_shape(statement: str) -> str:
+    shape = _PARAM_RE.sub("?", " ".join(statement.split()))
+    return _PARAM_LIST_RE.sub("(?)", shape)
+
+
+@contextmanager
+def collect_query_stats():
+    """Собирает статистику выражений, выполненных в текущем контексте (запросе)."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started = conn.info.pop("query_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(async_engine):
+    """Подключает учёт SQL-выражений к движку (повторный вызов ничего не делает)."""
+    sync_engine = async_engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул со своими счётчиками ожидания: у основной БД и реплики они раздельные."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул — счётчики переживают пересоздание
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    # Время внутри _do_get — ожидание свободного соединения (или открытие нового в overflow)
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.metrics.record_wait(waited)
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.pool_wait_seconds += waited
+        return connection
+
+
+def _create_engine(url: str):
+    connect_args = {}
+    # Кэши подготовленных выражений — параметры только asyncpg; aiosqlite их не принимает
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+# Движки и фабрики сессий создаются при первом обращении, а не при импорте:
+# драйвер БД не грузится, пока приложению не понадобилось соединение
+_ENGINE_ATTRIBUTES = ("engine", "read_engine", "AsyncSessionLocal", "ReadSessionLocal")
+
+
+def _init_engines():
+    global engine, read_engine, AsyncSessionLocal, ReadSessionLocal
+    if "engine" in globals():
+        return
+    if not DATABASE_URL:
+        raise RuntimeError(DATABASE_NOT_CONFIGURED)
+    # Асинхронный движок
+    engine = _create_engine(DATABASE_URL)
+    # Движок реплики для чтения
+    read_engine = _create_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else engine
+    instrument_engine(engine)
+    instrument_engine(read_engine)
+
+    # Сессия
+    AsyncSessionLocal = async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+    ReadSessionLocal = async_sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+def __getattr__(name: str):
+    # from app.database import AsyncSessionLocal / database.engine по-прежнему работают
+    if name in _ENGINE_ATTRIBUTES:
+        _init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    _init_engines()
+    return AsyncSessionLocal
+
 
 Base = declarative_base()
 
 # Асинхронная зависимость для получения сессии
 async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+    async with get_sessionmaker()() as session:
+        yield session
+
+
+# read-your-writes: после записи клиент какое-то время читает из основной БД,
+# чтобы не увидеть отставшую реплику. Клиента узнаём по cookie, а пользователя
+# из пути (/users/{user_id}/...) — ещё и по памяти воркера.
+LAST_WRITE_COOKIE = "hh_last_write"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+_recent_writers: dict[uuid.UUID, float] = {}
+
+
+def _user_from_path(request: Request) -> uuid.UUID | None:
+    try:
+        return uuid.UUID(str(request.path_params["user_id"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def wrote_recently(request: Request) -> bool:
+    window = settings.READ_YOUR_WRITES_SECONDS
+    try:
+        if time.time() - float(request.cookies.get(LAST_WRITE_COOKIE, "")) < window:
+            return True
+    except ValueError:
+        pass
+    user_id = _user_from_path(request)
+    return user_id is not None and time.time() - _recent_writers.get(user_id, 0) < window
+
+
+async def track_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in _SAFE_METHODS and response.status_code < 400:
+        now = time.time()
+        response.set_cookie(LAST_WRITE_COOKIE, f"{now:.3f}", max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+                            httponly=True, samesite="lax")
+        user_id = _user_from_path(request)
+        if user_id is not None:
+            _recent_writers[user_id] = now
+            if len(_recent_writers) > 10_000:
+                # Чистим просроченные записи, чтобы словарь не рос бесконечно
+                for key, ts in list(_recent_writers.items()):
+                    if now - ts >= settings.READ_YOUR_WRITES_SECONDS:
+                        del _recent_writers[key]
+    return response
+
+
+# Фабрика сессий для чтения: реплика, если клиент недавно ничего не писал.
+# Отдельной зависимостью — для страниц, которые ведут несколько запросов параллельно
+def get_read_sessionmaker(request: Request):
+    _init_engines()
+    return AsyncSessionLocal if wrote_recently(request) else ReadSessionLocal
+
+
+# Зависимость для GET-эндпоинтов
+async def get_read_db(request: Request):
+    async with get_read_sessionmaker(request)() as session:
+        yield session
+
+
+def pool_status() -> dict:
+    _init_engines()
+    status = engine.pool.metrics.snapshot(engine.pool)
+    if read_engine is not engine:
+        status["replica"] = read_engine.pool.metrics.snapshot(read_engine.pool)
+    return status
+
+
+async def dispose_engines():
+    """Закрывает соединения пулов при остановке воркера."""
+    if "engine" not in globals():
+        return
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+# insert() диалекта текущей БД — нужен для ON CONFLICT (Postgres в проде, SQLite в тестах)
+def dialect_insert(session: AsyncSession, model):
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    dialect = sqlite if session.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(model)
@@ -1,10 +1,79 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.api.routers import users, habits, trackings, teams, frontend
+from starlette.exceptions import HTTPException
+from starlette.middleware.cors import CORSMiddleware
+from starlette.staticfiles import StaticFiles
+
+from app import auth, metrics
+from app.database import dispose_engines, get_sessionmaker, track_writes
+from app.config import settings
+from app.services import idempotency, jobs, leaderboard, partitions
+from app.services.feed import hub as feed_hub
+from app.api.routers import users, habits, trackings, teams, feed, stats, analytics, system, frontend
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_factory = get_sessionmaker()
+    leaderboard.scheduler.start(session_factory)
+    partitions.maintainer.start(session_factory)
+    if settings.JOBS_ENABLED:
+        jobs.worker.start(session_factory)
+    await feed_hub.start()
+    yield
+    await feed_hub.stop()
+    await jobs.worker.stop()
+    await partitions.maintainer.stop()
+    await leaderboard.scheduler.stop()
+    await auth.aclose()
+    # Фоновые задачи остановлены — соединения пулов можно закрыть
+    await dispose_engines()
+
+
+class SPAStaticFiles(StaticFiles):
+    """Сборка фронтенда; на неизвестный путь отдаёт index.html (маршрутизация SPA)."""
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            return await super().get_response("index.html", scope)
+
+
+def create_app() -> FastAPI:
+    """Приложение целиком: middleware и монтирование — до начала обслуживания запросов."""
+    app = FastAPI(lifespan=lifespan)
+    app.middleware("http")(track_writes)
+    # Повтор отдаётся до track_writes: он ничего не пишет и не должен прижимать чтения к мастеру
+    app.middleware("http")(idempotency.idempotent_requests)
+    app.middleware("http")(metrics.instrument_requests)
+    if settings.CORS_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=settings.CORS_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    app.include_router(users.router)
+    app.include_router(habits.router)
+    app.include_router(trackings.router)
+    app.include_router(teams.router)
+    app.include_router(feed.router)
+    app.include_router(stats.router)
+    app.include_router(analytics.router)
+    app.include_router(system.router)
+    app.include_router(frontend.router)
+
+    # Монтируется последним: маршруты API и страниц имеют приоритет
+    if os.path.isdir(settings.FRONTEND_BUILD_DIR):
+        app.mount("/", SPAStaticFiles(directory=settings.FRONTEND_BUILD_DIR, html=True), name="spa")
+    return app
 
-app = FastAPI()
 
-app.include_router(users.router)
-app.include_router(habits.router)
-app.include_router(trackings.router)
-app.include_router(teams.router)
-app.include_router(frontend.router)
+app = create_app()
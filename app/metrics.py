@@ -0,0 +1,174 @@
+"""Метрики запросов к API.
+
+Middleware считает для каждого запроса число SQL-выражений, время в БД,
+ожидание соединения из пула и общую длительность. Значения уходят клиенту
+в заголовке Server-Timing и копятся по маршрутам для GET /metrics (формат
+Prometheus). Для стриминговых ответов учитывается только работа до отправки
+заголовков.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from fastapi import Request
+
+from app import auth
+from app.config import settings
+from app.database import QueryStats, collect_query_stats, pool_status
+from app.services import idempotency
+from app.services.cache import response_cache
+from app.services.feed import hub as feed_hub
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.statuses: defaultdict[int, int] = defaultdict(int)
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.n_plus_one = 0
+
+    def observe(self, status: int, seconds: float, stats: QueryStats, n_plus_one: bool):
+        self.statuses[status] += 1
+        self.count += 1
+        self.seconds += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.queries += stats.count
+        self.db_seconds += stats.seconds
+        self.pool_wait_seconds += stats.pool_wait_seconds
+        self.n_plus_one += n_plus_one
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: defaultdict[tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: QueryStats,
+                n_plus_one: bool = False):
+        self.routes[method, route].observe(status, seconds, stats, n_plus_one)
+
+    def clear(self):
+        self.routes.clear()
+
+    def render(self) -> str:
+        """Текст в формате Prometheus exposition 0.0.4."""
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+        routes = sorted(self.routes.items())
+        family("http_requests_total", "counter", "Requests by route, method and status.", [
+            ("", {"method": method, "route": route, "status": status}, n)
+            for (method, route), m in routes for status, n in sorted(m.statuses.items())
+        ])
+        family("http_request_duration_seconds", "histogram", "Request latency until response headers.", [
+            sample
+            for (method, route), m in routes
+            for sample in [
+                *(("_bucket", {"method": method, "route": route, "le": bound}, n)
+                  for bound, n in zip(LATENCY_BUCKETS, m.buckets)),
+                ("_bucket", {"method": method, "route": route, "le": "+Inf"}, m.count),
+                ("_sum", {"method": method, "route": route}, m.seconds),
+                ("_count", {"method": method, "route": route}, m.count),
+            ]
+        ])
+        for name, attr, help_text in (
+            ("db_queries_total", "queries", "SQL statements executed."),
+            ("db_query_seconds_total", "db_seconds", "Time spent executing SQL statements."),
+            ("db_pool_wait_seconds_total", "pool_wait_seconds", "Time spent waiting for a pooled connection."),
+            ("db_n_plus_one_total", "n_plus_one", "Requests that repeated one statement shape (possible N+1)."),
+        ):
+            family(name, "counter", help_text, [
+                ("", {"method": method, "route": route}, getattr(m, attr)) for (method, route), m in routes
+            ])
+
+        pools = pool_status()
+        pools = {"primary": pools, **({"replica": pools.pop("replica")} if "replica" in pools else {})}
+        family("db_pool_connections", "gauge", "Connection pool state.", [
+            ("", {"engine": engine, "state": state}, pool[state])
+            for engine, pool in pools.items() for state in ("size", "checked_out", "overflow", "checked_in")
+        ])
+        family("db_pool_timeouts_total", "counter", "Connection checkouts that timed out.", [
+            ("", {"engine": engine}, pool["timeouts"]) for engine, pool in pools.items()
+        ])
+
+        token_stats = auth.token_cache.stats()
+        cache_stats = response_cache.stats()
+        idempotency_stats = idempotency.store.stats()
+        family("cache_requests_total", "counter", "Cache lookups by cache and result.", [
+            ("", {"cache": "response", "result": "hit"}, cache_stats["hits"]),
+            ("", {"cache": "response", "result": "miss"}, cache_stats["misses"]),
+            ("", {"cache": "token", "result": "hit"}, token_stats["hits"]),
+            ("", {"cache": "token", "result": "miss"}, token_stats["misses"]),
+            ("", {"cache": "idempotency", "result": "hit"}, idempotency_stats["replays"]),
+            ("", {"cache": "idempotency", "result": "miss"}, idempotency_stats["executed"]),
+        ])
+        feed_stats = feed_hub.stats()
+        family("team_feed_subscribers", "gauge", "Open team feed streams in this process.", [
+            ("", {}, feed_stats["subscribers"]),
+        ])
+        family("team_feed_events_total", "counter", "Team feed events published by this process.", [
+            ("", {}, feed_stats["published"]),
+        ])
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def server_timing(stats: QueryStats, seconds: float) -> str:
+    return (f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", '
+            f"pool;dur={stats.pool_wait_seconds * 1000:.2f}, "
+            f"total;dur={seconds * 1000:.2f}")
+
+
+def route_template(request: Request) -> str:
+    # Шаблон маршрута, а не фактический путь: иначе каждый id — новая серия метрик
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+registry = MetricsRegistry()
+
+
+async def instrument_requests(request: Request, call_next):
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    with collect_query_stats() as stats:
+        response = await call_next(request)
+    seconds = time.perf_counter() - started
+
+    route = route_template(request)
+    repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+    for shape, count in repeated:
+        logger.warning("Possible N+1 in %s %s: %d executions of %s", request.method, route, count, shape)
+    registry.observe(request.method, route, response.status_code, seconds, stats, bool(repeated))
+    response.headers.append("Server-Timing", server_timing(stats, seconds))
+    return response
@@ -1,4 +1,8 @@
 from .team import Team
 from .user import User
 from .habit import Habit
-from .tracking import Tracking
\ No newline at end of file
+from .tracking import Tracking
+from .habit_stats import HabitStats
+from .team_stats import TeamStats, TeamMemberStats
+from .completion_bitmap import CompletionBitmap
+from .job import Job
@@ -0,0 +1,21 @@
+import uuid
+
+from sqlalchemy import UUID, ForeignKey, LargeBinary, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class CompletionBitmap(Base):
+    """Отметки пользователя по привычке за год — битовая строка (см. app.services.bitmaps)."""
+
+    __tablename__ = "completion_bitmaps"
+
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    year: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    # Бит i (младший бит байта i // 8) — отметка за (i + 1)-й день года; 46 байт на год
+    days: Mapped[bytes] = mapped_column(LargeBinary)
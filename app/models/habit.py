@@ -13,10 +13,12 @@ class Habit(Base):
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name: Mapped[str]
     description: Mapped[str]
-    user_id: Mapped[str] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"))
-    team_id: Mapped[str | None] = mapped_column(UUID(as_uuid=True), ForeignKey("teams.id"), nullable=True)
+    user_id: Mapped[str] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    team_id: Mapped[str | None] = mapped_column(UUID(as_uuid=True), ForeignKey("teams.id"), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     user: Mapped["User"] = relationship(back_populates="habits")
-    team: Mapped["Team"] = relationship(back_populates="habits", lazy="joined")
-    trackings: Mapped[list["Tracking"]] = relationship(back_populates="habit", cascade="all, delete-orphan")
\ No newline at end of file
+    # Команда нужна редко — подгружается явно (selectinload/joinedload) там, где используется
+    team: Mapped["Team"] = relationship(back_populates="habits")
+    trackings: Mapped[list["Tracking"]] = relationship(back_populates="habit", cascade="all, delete-orphan")
+    stats: Mapped["HabitStats | None"] = relationship(back_populates="habit", cascade="all, delete-orphan")
\ No newline at end of file
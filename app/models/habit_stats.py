@@ -0,0 +1,25 @@
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import UUID, BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database import Base
+
+
+class HabitStats(Base):
+    """Агрегаты по привычке, обновляемые при каждой отметке (см. app.services.stats)."""
+
+    __tablename__ = "habit_stats"
+
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True
+    )
+    current_streak: Mapped[int] = mapped_column(default=0)
+    longest_streak: Mapped[int] = mapped_column(default=0)
+    last_completed: Mapped[date | None]
+    total_completed: Mapped[int] = mapped_column(default=0)
+    # Бит i — была ли отметка за день last_completed - i (последние 30 дней)
+    recent_days: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    habit: Mapped["Habit"] = relationship(back_populates="stats")
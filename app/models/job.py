@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, UUID, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class Job(Base):
+    """Фоновая задача (см. app.services.jobs). Строка живёт после рестарта процесса."""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind: Mapped[str]
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    # pending -> running -> done | failed; при ошибке снова pending с отсрочкой
+    status: Mapped[str] = mapped_column(default="pending")
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=5)
+    run_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Упавший воркер не держит задачу: после истечения аренды её забирает другой
+    locked_until: Mapped[datetime | None]
+    idempotency_key: Mapped[str | None] = mapped_column(unique=True)
+    last_error: Mapped[str | None]
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    finished_at: Mapped[datetime | None]
+
+    __table_args__ = (
+        # Выборка готовых к запуску задач
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import UUID, ForeignKey
+from sqlalchemy import UUID, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -17,4 +17,9 @@ class Team(Base):
     habits: Mapped[list["Habit"]] = relationship(back_populates="team", cascade="all, delete-orphan")
 
     owner: Mapped["User"] = relationship(back_populates="teams", foreign_keys=[owner_id])
-    members: Mapped[list["User"]] = relationship(back_populates="team", foreign_keys="[User.team_id]")
\ No newline at end of file
+    members: Mapped[list["User"]] = relationship(back_populates="team", foreign_keys="[User.team_id]")
+
+    __table_args__ = (
+        # keyset-пагинация GET /teams
+        Index("ix_teams_created_at_id", "created_at", "id"),
+    )
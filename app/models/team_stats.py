@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import UUID, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class TeamStats(Base):
+    """Сводка команды для лидерборда (см. app.services.leaderboard)."""
+
+    __tablename__ = "team_stats"
+
+    team_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True
+    )
+    members_count: Mapped[int] = mapped_column(default=0)
+    streak: Mapped[int] = mapped_column(default=0)
+    completion_percent: Mapped[int] = mapped_column(default=0)
+    refreshed_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+class TeamMemberStats(Base):
+    __tablename__ = "team_member_stats"
+
+    team_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Имя копируется, чтобы лидерборд читался без join с users
+    name: Mapped[str]
+    completed_30d: Mapped[int] = mapped_column(default=0)
+    possible_30d: Mapped[int] = mapped_column(default=0)
+    completion_percent: Mapped[int] = mapped_column(default=0)
+    streak: Mapped[int] = mapped_column(default=0)
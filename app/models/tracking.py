@@ -1,22 +1,38 @@
 import uuid
-from datetime import date
+import datetime
 
-from sqlalchemy import UUID, ForeignKey, UniqueConstraint
+from sqlalchemy import UUID, ForeignKey, Index, UniqueConstraint, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
+from app.services.partitions import initial_partitions_ddl
 
 
 class Tracking(Base):
+    """Отметка выполнения. В Postgres таблица секционирована по месяцам поля date
+    (см. app.services.partitions), поэтому date входит в первичный ключ."""
     __tablename__ = "tracking"
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     habit_id: Mapped[str] = mapped_column(UUID(as_uuid=True), ForeignKey("habits.id"))
     user_id: Mapped[str] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"))
-    date: Mapped[date]
+    date: Mapped[datetime.date] = mapped_column(primary_key=True)
 
     habit: Mapped["Habit"] = relationship(back_populates="trackings")
     user: Mapped["User"] = relationship(back_populates="trackings")
 
     __table_args__ = (
         UniqueConstraint("habit_id", "user_id", "date", name="uix_tracking_unique_per_day"),
+        Index("ix_tracking_user_id_date", "user_id", "date"),
+        Index("ix_tracking_habit_id_date", "habit_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
     )
+
+
+@event.listens_for(Tracking.__table__, "after_create")
+def _create_initial_partitions(target, connection, **kw):
+    # Без секций секционированная таблица не принимает ни одной строки (create_all в тестах
+    # и бенчмарках); дальше секции поддерживает app.services.partitions
+    if connection.dialect.name != "postgresql":
+        return
+    for ddl in initial_partitions_ddl():
+        connection.execute(text(ddl))
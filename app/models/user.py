@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import UUID, ForeignKey
+from sqlalchemy import UUID, ForeignKey, Index
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from app.database import Base
 
@@ -9,11 +9,11 @@ from app.database import Base
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email: Mapped[str] = mapped_column(unique=True, index=True)
     name: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
-    team_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("teams.id"))
+    team_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("teams.id"), index=True)
 
     habits: Mapped[list["Habit"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     trackings: Mapped[list["Tracking"]] = relationship(back_populates="user", cascade="all, delete-orphan")
@@ -21,3 +21,8 @@ class User(Base):
     team: Mapped["Team"] = relationship(back_populates="members", foreign_keys=[team_id])
     teams: Mapped[list["Team"]] = relationship(back_populates="owner", foreign_keys="[Team.owner_id]")
 
+    __table_args__ = (
+        # keyset-пагинация GET /users
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
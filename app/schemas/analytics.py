@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import date
+
+
+class HabitAnalytics(BaseModel):
+    habit_id: UUID
+    name: str
+    completed: int
+
+
+class MemberAnalytics(BaseModel):
+    user_id: UUID
+    name: str
+    completion_rate: float
+
+
+class AnalyticsBase(BaseModel):
+    start: date
+    end: date
+    completion_rate: float
+    # Число отметок за каждый день периода, начиная со start
+    heatmap: list[int]
+    # Понедельник — первый элемент
+    weekday_rates: list[float]
+    rolling_7d: list[float]
+    rolling_30d: list[float]
+    habits: list[HabitAnalytics]
+    # Строки и столбцы — привычки из correlation_habits (не больше 50 самых выполняемых)
+    correlation_habits: list[UUID]
+    habit_correlation: list[list[float | None]]
+
+
+class UserAnalyticsResponse(AnalyticsBase):
+    user_id: UUID
+
+
+class TeamAnalyticsResponse(AnalyticsBase):
+    team_id: UUID
+    members: list[MemberAnalytics]
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from uuid import UUID
+from datetime import date
 
 class HabitCreate(BaseModel):
     name: str
@@ -11,5 +12,16 @@ class HabitResponse(BaseModel):
     description: str | None = None
     user_id: UUID
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class HabitStatsResponse(BaseModel):
+    habit_id: UUID
+    current_streak: int
+    longest_streak: int
+    last_completed: date | None
+    total_completed: int
+    completed_7d: int
+    completed_30d: int
+    completion_rate_7d: int
+    completion_rate_30d: int
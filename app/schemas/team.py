@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
+
+from app.schemas.tracking import TrackingResponse
 
 
 class TeamCreate(BaseModel):
@@ -13,5 +15,45 @@ class TeamResponse(BaseModel):
     owner_id: UUID
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TeamLeaderboardMember(BaseModel):
+    user_id: UUID
+    name: str
+    completed_30d: int
+    possible_30d: int
+    completion_percent: int
+    streak: int
+
+
+class TeamLeaderboardResponse(BaseModel):
+    team_id: UUID
+    members_count: int
+    streak: int
+    completion_percent: int
+    refreshed_at: datetime
+    members: list[TeamLeaderboardMember]
+
+
+class TeamOverviewMember(BaseModel):
+    id: UUID
+    name: str
+
+
+class TeamOverviewHabit(BaseModel):
+    id: UUID
+    name: str
+    description: str | None = None
+    user_id: UUID
+    team_id: UUID | None
+    trackings: list[TrackingResponse]
+
+
+class TeamOverviewResponse(BaseModel):
+    """Команда целиком для экрана команды: участники, их и командные привычки, отметки за окно."""
+    team: TeamResponse
+    start: date
+    end: date
+    members: list[TeamOverviewMember]
+    habits: list[TeamOverviewHabit]
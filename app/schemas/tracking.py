@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
 from datetime import date
 from uuid import UUID
 
@@ -15,5 +17,19 @@ class TrackingResponse(BaseModel):
     user_id: UUID
     date: date
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TrackingBatchItemResult(BaseModel):
+    habit_id: UUID
+    user_id: UUID
+    date: date
+    status: Literal["created", "duplicate", "rejected"]
+    id: UUID | None = None
+
+
+class TrackingBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    rejected: int
+    items: list[TrackingBatchItemResult]
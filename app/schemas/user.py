@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from uuid import UUID
 from datetime import datetime
 
@@ -15,5 +15,4 @@ class UserResponse(BaseModel):
     created_at: datetime
     team_id: UUID | None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
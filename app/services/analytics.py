@@ -0,0 +1,144 @@
+"""Аналитика по истории отметок: тепловая карта, дни недели, скользящие
+средние и корреляция привычек.
+
+История загружается пачкой в виде массивов индексов дней и сводится в
+матрицу «привычка × день», дальше всё считается векторно в NumPy.
+"""
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.tracking import Tracking
+
+# Корреляция считается попарно: матрица растёт квадратично от числа привычек,
+# поэтому берём только самые выполняемые
+MAX_CORRELATION_HABITS = 50
+
+
+def completion_matrix(habit_pos: np.ndarray, day_pos: np.ndarray, n_habits: int, n_days: int) -> np.ndarray:
+    """Число отметок по (привычка, день); для личной привычки это 0/1."""
+    flat = habit_pos.astype(np.int64) * n_days + day_pos
+    return np.bincount(flat, minlength=n_habits * n_days).astype(np.int32).reshape(n_habits, n_days)
+
+
+def active_matrix(created_pos: np.ndarray, n_days: int) -> np.ndarray:
+    """Маска дней, когда привычка уже существовала."""
+    return np.arange(n_days)[np.newaxis, :] >= created_pos[:, np.newaxis]
+
+
+def daily_rate(done: np.ndarray, possible: np.ndarray) -> np.ndarray:
+    completed = np.minimum(done, possible).sum(axis=0)
+    total = possible.sum(axis=0)
+    return np.divide(completed, total, out=np.zeros(done.shape[1]), where=total > 0)
+
+
+def weekday_rates(done: np.ndarray, possible: np.ndarray, start: date) -> list[float]:
+    """Доля выполнения по дням недели, понедельник — 0."""
+    weekdays = (np.arange(done.shape[1]) + start.weekday()) % 7
+    completed = np.bincount(weekdays, weights=np.minimum(done, possible).sum(axis=0), minlength=7)
+    total = np.bincount(weekdays, weights=possible.sum(axis=0), minlength=7)
+    return np.divide(completed, total, out=np.zeros(7), where=total > 0).round(4).tolist()
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Скользящее среднее по окну, в начале ряда — по доступным дням."""
+    cumsum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+
+def correlation_positions(done: np.ndarray, limit: int = MAX_CORRELATION_HABITS) -> np.ndarray:
+    """Позиции не более limit привычек с наибольшим числом отметок, в исходном порядке."""
+    if done.shape[0] <= limit:
+        return np.arange(done.shape[0])
+    totals = done.sum(axis=1)
+    # Устойчивая сортировка: при равенстве выигрывает привычка, созданная раньше
+    return np.sort(np.argsort(-totals, kind="stable")[:limit])
+
+
+def habit_correlation(done: np.ndarray) -> list[list[float | None]]:
+    """Корреляция Пирсона дневных рядов привычек; None для рядов без разброса."""
+    if done.shape[0] == 0:
+        return []
+    series = done.astype(np.float64)
+    centered = series - series.mean(axis=1, keepdims=True)
+    norms = np.sqrt((centered ** 2).sum(axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        matrix = (centered @ centered.T) / np.outer(norms, norms)
+    matrix = np.round(matrix, 4)
+    return [[None if np.isnan(value) else float(value) for value in row] for row in matrix]
+
+
+def correlation(habit_ids: list, done: np.ndarray) -> dict:
+    positions = correlation_positions(done)
+    return {
+        "correlation_habits": [habit_ids[i] for i in positions],
+        "habit_correlation": habit_correlation(done[positions]),
+    }
+
+
+async def load_day_arrays(db: AsyncSession, habit_ids: list, start: date, end: date):
+    """Отметки привычек за период как три массива: позиция привычки, пользователь, индекс дня."""
+    positions = {habit_id: i for i, habit_id in enumerate(habit_ids)}
+    window = Tracking.habit_id.in_(habit_ids), Tracking.date.between(start, end)
+    habit_pos, user_ids, day_chunks = [], [], []
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Одна строка на (привычку, пользователя) с массивом индексов дней
+        rows = await db.execute(
+            select(Tracking.habit_id, Tracking.user_id, func.array_agg(Tracking.date - start))
+            .where(*window).group_by(Tracking.habit_id, Tracking.user_id)
+        )
+        for habit_id, user_id, days in rows:
+            habit_pos.append(np.full(len(days), positions[habit_id], dtype=np.int32))
+            user_ids.extend([user_id] * len(days))
+            day_chunks.append(np.asarray(days, dtype=np.int32))
+    else:
+        rows = (await db.execute(select(Tracking.habit_id, Tracking.user_id, Tracking.date).where(*window))).all()
+        start_ordinal = start.toordinal()
+        habit_pos.append(np.fromiter((positions[r.habit_id] for r in rows), dtype=np.int32, count=len(rows)))
+        user_ids.extend(r.user_id for r in rows)
+        day_chunks.append(np.fromiter((r.date.toordinal() - start_ordinal for r in rows),
+                                      dtype=np.int32, count=len(rows)))
+
+    empty = np.zeros(0, dtype=np.int32)
+    return (np.concatenate(habit_pos) if habit_pos else empty, user_ids,
+            np.concatenate(day_chunks) if day_chunks else empty)
+
+
+def date_range(days: int, today: date | None = None) -> tuple[date, date]:
+    end = today or date.today()
+    return end - timedelta(days=days - 1), end
+
+
+def summarize(done: np.ndarray, possible: np.ndarray, start: date) -> dict:
+    rate = daily_rate(done, possible)
+    total = int(possible.sum())
+    return {
+        "heatmap": done.sum(axis=0).tolist(),
+        "completion_rate": round(float(np.minimum(done, possible).sum()) / total, 4) if total else 0.0,
+        "weekday_rates": weekday_rates(done, possible, start),
+        "rolling_7d": rolling_mean(rate, 7).round(4).tolist(),
+        "rolling_30d": rolling_mean(rate, 30).round(4).tolist(),
+    }
+
+
+def created_positions(created: list, start: date) -> np.ndarray:
+    return np.fromiter(((c.date() - start).days for c in created), dtype=np.int32, count=len(created))
+
+
+def member_rates(user_ids: list, members: list[uuid.UUID], possible_by_member: dict) -> dict:
+    """Доля выполнения по участникам: их отметки / доступные им привычко-дни."""
+    index = {member: i for i, member in enumerate(members)}
+    member_pos = np.fromiter((index.get(u, -1) for u in user_ids), dtype=np.int32, count=len(user_ids))
+    known = member_pos >= 0
+    # Повторная отметка той же привычки в тот же день невозможна (уникальный ключ)
+    counts = np.bincount(member_pos[known], minlength=len(members))
+    return {
+        member: round(min(1.0, counts[i] / possible_by_member[member]), 4) if possible_by_member.get(member) else 0.0
+        for member, i in index.items()
+    }
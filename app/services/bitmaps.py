@@ -0,0 +1,222 @@
+"""Компактная история отметок: битовая карта на (привычка, пользователь, год).
+
+Строка tracking весит под сотню байт ради одного бита информации. Здесь
+год отметок — 46 байт: бит i — отметка за (i + 1)-й день года. Диапазоны,
+подсчёт и стрики считаются битовыми операциями над целым числом.
+
+Карты ведутся рядом с tracking при COMPLETION_BITMAPS=true; tracking остаётся
+источником истины, а карты всегда можно перестроить по нему:
+
+    python -m app.services.bitmaps backfill
+"""
+import asyncio
+import sys
+import uuid
+from datetime import date, timedelta
+from itertools import groupby
+
+from sqlalchemy import extract, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.completion_bitmap import CompletionBitmap
+from app.models.habit import Habit
+from app.models.tracking import Tracking
+
+BITMAP_BYTES = 46
+BACKFILL_CHUNK_SIZE = 500
+
+
+def day_bit(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def to_int(days: bytes | None) -> int:
+    return int.from_bytes(days or b"", "little")
+
+
+def to_bytes(bits: int) -> bytes:
+    # Порядок совпадает с set_bit/get_bit в Postgres: бит n — младший бит n % 8 байта n // 8
+    return bits.to_bytes(BITMAP_BYTES, "little")
+
+
+def year_mask(year: int, start: date, end: date) -> int:
+    """Биты дней года, попадающих в [start, end]."""
+    first, last = max(start, date(year, 1, 1)), min(end, date(year, 12, 31))
+    if first > last:
+        return 0
+    return ((1 << day_bit(last) + 1) - 1) ^ ((1 << day_bit(first)) - 1)
+
+
+def bits_to_days(year: int, bits: int) -> list[date]:
+    first = date(year, 1, 1)
+    days = []
+    while bits:
+        lowest = bits & -bits
+        days.append(first + timedelta(days=lowest.bit_length() - 1))
+        bits ^= lowest
+    return days
+
+
+def days_to_bits(days) -> dict[int, int]:
+    bitmaps: dict[int, int] = {}
+    for day in days:
+        bitmaps[day.year] = bitmaps.get(day.year, 0) | 1 << day_bit(day)
+    return bitmaps
+
+
+def run_ending_at(bits: int, bit: int) -> int:
+    """Длина серии единиц, заканчивающейся битом bit."""
+    gaps = ~bits & ((1 << bit + 1) - 1)
+    return bit + 1 if not gaps else bit - gaps.bit_length() + 1
+
+
+def streak(bitmaps: dict[int, int], today: date) -> int:
+    """Стрик, заканчивающийся сегодня или вчера, как в лидерборде."""
+    day = today if bitmaps.get(today.year, 0) >> day_bit(today) & 1 else today - timedelta(days=1)
+    total = 0
+    while True:
+        bit = day_bit(day)
+        run = run_ending_at(bitmaps.get(day.year, 0), bit)
+        total += run
+        if run <= bit:
+            return total
+        # Серия доходит до 1 января — продолжается в предыдущем году
+        day = date(day.year - 1, 12, 31)
+
+
+def longest_streak(bitmaps: dict[int, int]) -> int:
+    if not bitmaps:
+        return 0
+    origin = date(min(bitmaps), 1, 1)
+    bits = 0
+    for year, year_bits in bitmaps.items():
+        bits |= year_bits << (date(year, 1, 1) - origin).days
+    # Каждый шаг укорачивает все серии на один день
+    longest = 0
+    while bits:
+        bits &= bits >> 1
+        longest += 1
+    return longest
+
+
+async def _load(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID, *conditions) -> dict[int, int]:
+    rows = await db.execute(
+        select(CompletionBitmap.year, CompletionBitmap.days)
+        .where(CompletionBitmap.habit_id == habit_id, CompletionBitmap.user_id == user_id, *conditions)
+    )
+    return {row.year: to_int(row.days) for row in rows}
+
+
+async def _upsert(db: AsyncSession, rows: list[dict]):
+    if not rows:
+        return
+    stmt = dialect_insert(db, CompletionBitmap).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[CompletionBitmap.habit_id, CompletionBitmap.user_id, CompletionBitmap.year],
+        set_={"days": stmt.excluded.days},
+    ))
+
+
+async def _write_day(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID, day: date, value: bool):
+    bit = day_bit(day)
+    stmt = dialect_insert(db, CompletionBitmap).values(
+        habit_id=habit_id, user_id=user_id, year=day.year, days=to_bytes(int(value) << bit),
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Бит меняется на месте, без чтения строки: параллельные отметки не затирают друг друга
+        days = func.set_bit(CompletionBitmap.days, bit, int(value))
+    else:
+        bits = to_int(await db.scalar(
+            select(CompletionBitmap.days).where(
+                CompletionBitmap.habit_id == habit_id, CompletionBitmap.user_id == user_id,
+                CompletionBitmap.year == day.year,
+            )
+        ))
+        days = to_bytes(bits | 1 << bit if value else bits & ~(1 << bit))
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[CompletionBitmap.habit_id, CompletionBitmap.user_id, CompletionBitmap.year],
+        set_={"days": days},
+    ))
+
+
+async def set_day(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID, day: date) -> None:
+    await _write_day(db, habit_id, user_id, day, True)
+
+
+async def clear_day(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID, day: date) -> None:
+    await _write_day(db, habit_id, user_id, day, False)
+
+
+async def completed_days(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID,
+                         start: date, end: date) -> list[date]:
+    bitmaps = await _load(db, habit_id, user_id, CompletionBitmap.year.between(start.year, end.year))
+    return [day for year in sorted(bitmaps)
+            for day in bits_to_days(year, bitmaps[year] & year_mask(year, start, end))]
+
+
+async def count_days(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID, start: date, end: date) -> int:
+    bitmaps = await _load(db, habit_id, user_id, CompletionBitmap.year.between(start.year, end.year))
+    return sum(bin(bits & year_mask(year, start, end)).count("1") for year, bits in bitmaps.items())
+
+
+async def current_streak(db: AsyncSession, habit_id: uuid.UUID, user_id: uuid.UUID,
+                         today: date | None = None) -> int:
+    today = today or date.today()
+    return streak(await _load(db, habit_id, user_id, CompletionBitmap.year <= today.year), today)
+
+
+async def rebuild(db: AsyncSession, keys) -> None:
+    """Перестраивает карты (habit_id, user_id, year) по tracking одним чтением на чанк."""
+    keys = list(keys)
+    for start in range(0, len(keys), BACKFILL_CHUNK_SIZE):
+        chunk = keys[start:start + BACKFILL_CHUNK_SIZE]
+        result = await db.execute(
+            select(Tracking.habit_id, Tracking.user_id, Tracking.date)
+            .where(tuple_(Tracking.habit_id, Tracking.user_id, extract("year", Tracking.date)).in_(chunk))
+        )
+        bits = dict.fromkeys(chunk, 0)
+        for row in result:
+            bits[row.habit_id, row.user_id, row.date.year] |= 1 << day_bit(row.date)
+        await _upsert(db, [
+            {"habit_id": habit_id, "user_id": user_id, "year": year, "days": to_bytes(value)}
+            for (habit_id, user_id, year), value in bits.items()
+        ])
+
+
+async def backfill(db: AsyncSession) -> int:
+    """Карты для всей истории tracking, чанками по привычкам. Возвращает число карт."""
+    habit_ids = list(await db.scalars(select(Habit.id).order_by(Habit.id)))
+    written = 0
+    for start in range(0, len(habit_ids), BACKFILL_CHUNK_SIZE):
+        result = await db.execute(
+            select(Tracking.habit_id, Tracking.user_id, Tracking.date)
+            .where(Tracking.habit_id.in_(habit_ids[start:start + BACKFILL_CHUNK_SIZE]))
+            .order_by(Tracking.habit_id, Tracking.user_id)
+        )
+        rows = []
+        for (habit_id, user_id), trackings in groupby(result, key=lambda row: (row.habit_id, row.user_id)):
+            rows.extend(
+                {"habit_id": habit_id, "user_id": user_id, "year": year, "days": to_bytes(bits)}
+                for year, bits in days_to_bits(row.date for row in trackings).items()
+            )
+        await _upsert(db, rows)
+        await db.commit()
+        written += len(rows)
+    return written
+
+
+async def _main(argv: list[str]):
+    from app.database import AsyncSessionLocal
+
+    if argv != ["backfill"]:
+        print("usage: python -m app.services.bitmaps backfill")
+        return 2
+    async with AsyncSessionLocal() as db:
+        count = await backfill(db)
+    print(f"Wrote {count} completion bitmaps")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,189 @@
+"""Кэш ответов GET с ETag и HTML-фрагментов страниц, инвалидация по событиям.
+
+Ключ ответа — пространство имён ресурса (например, "team:<id>") плюс его
+текущая версия. Обработчики записи вызывают invalidate(), версия меняется,
+и старые записи больше не находятся (в памяти их вытеснит LRU/TTL).
+Бэкенд по умолчанию — LRU в памяти процесса; при CACHE_URL=redis://...
+кэш и версии общие для всех воркеров. Версии в памяти видит только свой
+процесс, поэтому без CACHE_URL сервер запускается с одним воркером (main.py).
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from app import database
+from app.config import settings
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # Версии тоже LRU: пространств имён столько же, сколько пользователей и команд
+        self._versions: OrderedDict[str, str] = OrderedDict()
+        # Версия пространств без своей записи. Вытеснение версии её уменьшает: иначе
+        # вытесненное пространство вернулось бы к "0" и нашло записи до инвалидации
+        self._default_version = 0
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value: dict, ttl: int) -> bool:
+        """Записывает, только если ключа нет. False — ключ уже занят."""
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def get_version(self, namespace: str) -> str:
+        version = self._versions.get(namespace)
+        if version is None:
+            return str(self._default_version)
+        self._versions.move_to_end(namespace)
+        return version
+
+    async def set_version(self, namespace: str, version: str):
+        self._versions[namespace] = version
+        self._versions.move_to_end(namespace)
+        while len(self._versions) > self.max_entries:
+            self._versions.popitem(last=False)
+            self._default_version -= 1
+
+
+class RedisCacheBackend:
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL requires the 'redis' package")
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> dict | None:
+        raw = await self._redis.get(f"cache:{key}")
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: dict, ttl: int):
+        await self._redis.set(f"cache:{key}", json.dumps(value), ex=ttl)
+
+    async def add(self, key: str, value: dict, ttl: int) -> bool:
+        return bool(await self._redis.set(f"cache:{key}", json.dumps(value), ex=ttl, nx=True))
+
+    async def delete(self, key: str):
+        await self._redis.delete(f"cache:{key}")
+
+    async def get_version(self, namespace: str) -> str:
+        raw = await self._redis.get(f"cache-version:{namespace}")
+        return raw.decode() if raw else "0"
+
+    async def set_version(self, namespace: str, version: str):
+        await self._redis.set(f"cache-version:{namespace}", version)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def invalidate(self, *namespaces: str):
+        # Версия — момент инвалидации: по ней же видно, что реплика могла ещё не догнать запись
+        version = f"{time.time():.6f}"
+        for namespace in namespaces:
+            await self.backend.set_version(namespace, version)
+
+    async def respond(self, request: Request, namespace: str, build, variant: str = "") -> Response:
+        """Отдаёт закэшированный ответ или строит его через build().
+
+        build — корутина, возвращающая (тело JSON в bytes, заголовки).
+        """
+        if not self.enabled:
+            body, headers = await build()
+            return _response(request, body, headers, _etag(body))
+
+        version = await self.backend.get_version(namespace)
+        key = f"{namespace}:{version}:{variant}"
+        entry = await self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return _response(request, entry["body"].encode(), entry["headers"], entry["etag"])
+
+        self.misses += 1
+        body, headers = await build()
+        etag = _etag(body)
+        if not self._replica_may_lag(version):
+            await self.backend.set(key, {"body": body.decode(), "headers": headers, "etag": etag}, self.ttl)
+        return _response(request, body, headers, etag)
+
+    async def fragment(self, namespace: str, render, variant: str = "", depends_on: tuple[str, ...] = ()) -> str:
+        """Закэшированный HTML-фрагмент страницы; render — корутина, возвращающая строку.
+
+        depends_on — другие пространства имён, чья инвалидация тоже сбрасывает фрагмент.
+        """
+        if not self.enabled:
+            return await render()
+
+        versions = [await self.backend.get_version(name) for name in (namespace, *depends_on)]
+        version = max(versions, key=float)
+        key = f"fragment:{namespace}:{':'.join(versions)}:{variant}"
+        entry = await self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry["html"]
+
+        self.misses += 1
+        html = await render()
+        if not self._replica_may_lag(version):
+            await self.backend.set(key, {"html": html}, self.ttl)
+        return html
+
+    @staticmethod
+    def _replica_may_lag(version: str) -> bool:
+        # Сразу после записи данные могли прийти с отстающей реплики — такие не кэшируем
+        return (database.read_engine is not database.engine
+                and time.time() - float(version) < settings.READ_YOUR_WRITES_SECONDS)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _response(request: Request, body: bytes, headers: dict, etag: str) -> Response:
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def make_backend(max_entries: int = settings.CACHE_MAX_ENTRIES):
+    if settings.CACHE_URL:
+        return RedisCacheBackend(settings.CACHE_URL)
+    return MemoryCacheBackend(max_entries)
+
+
+response_cache = ResponseCache(make_backend(), settings.CACHE_TTL_SECONDS, enabled=settings.CACHE_ENABLED)
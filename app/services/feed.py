@@ -0,0 +1,157 @@
+"""Лента активности команды: pub/sub между обработчиками записи и SSE-подписчиками.
+
+Каждый подписчик получает ограниченную очередь. Если клиент не успевает
+читать, новые события для него отбрасываются, а счётчик пропусков уходит
+ему отдельным событием lagged — клиент перезагружает страницу. Запись
+никогда не ждёт медленного читателя.
+
+Бэкенд доставки: local — в пределах процесса; postgres — LISTEN/NOTIFY,
+чтобы события видели подписчики всех воркеров.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "team_feed"
+
+
+class Subscription:
+    def __init__(self, team_id: uuid.UUID, maxsize: int):
+        self.team_id = team_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class LocalFeedBackend:
+    """События доставляются только подписчикам этого процесса."""
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, team_id: uuid.UUID, event: dict):
+        self._deliver(team_id, event)
+
+
+class PostgresFeedBackend:
+    """LISTEN/NOTIFY: каждый воркер слушает канал и раздаёт события своим подписчикам."""
+
+    def __init__(self, dsn: str, channel: str = NOTIFY_CHANNEL):
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://")
+        self.channel = channel
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self, deliver):
+        import asyncpg
+
+        def on_notify(connection, pid, channel, payload):
+            message = json.loads(payload)
+            deliver(uuid.UUID(message["team_id"]), message["event"])
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.channel, on_notify)
+
+    async def stop(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def publish(self, team_id: uuid.UUID, event: dict):
+        payload = json.dumps({"team_id": str(team_id), "event": event}, default=str)
+        # Одно соединение и для LISTEN, и для NOTIFY — операции на нём не должны пересекаться
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+
+class FeedHub:
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: defaultdict[uuid.UUID, set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self._started = False
+
+    def subscribe(self, team_id: uuid.UUID) -> Subscription:
+        subscription = Subscription(team_id, self.queue_size)
+        self._subscribers[team_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.team_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.team_id]
+
+    def deliver(self, team_id: uuid.UUID, event: dict):
+        for subscription in list(self._subscribers.get(team_id, ())):
+            subscription.offer(event)
+
+    async def publish(self, team_id: uuid.UUID, event: dict):
+        # Лента — не источник истины: ошибка доставки не должна ломать запись
+        try:
+            if not self._started:
+                await self.start()
+            await self.backend.publish(team_id, event)
+            self.published += 1
+        except Exception:
+            logger.exception("Failed to publish team feed event")
+
+    async def start(self):
+        if not self._started:
+            await self.backend.start(self.deliver)
+            self._started = True
+
+    async def stop(self):
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    def stats(self) -> dict:
+        return {
+            "teams": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+        }
+
+
+async def sse_events(hub: FeedHub, subscription: Subscription, heartbeat: float):
+    """События подписки в формате text/event-stream; комментарий-пинг держит соединение."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if subscription.dropped:
+                dropped, subscription.dropped = subscription.dropped, 0
+                yield f"event: lagged\ndata: {json.dumps({'dropped': dropped})}\n\n"
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _make_backend():
+    if settings.FEED_BACKEND == "postgres":
+        return PostgresFeedBackend(settings.DATABASE_URL)
+    return LocalFeedBackend()
+
+
+hub = FeedHub(_make_backend(), settings.FEED_QUEUE_SIZE)
@@ -0,0 +1,170 @@
+"""Idempotency-Key для записей: повтор запроса получает сохранённый ответ.
+
+Мобильные клиенты повторяют POST при обрыве сети. С заголовком
+Idempotency-Key первый запрос выполняется как обычно, а его статус, тело и
+заголовки сохраняются на IDEMPOTENCY_TTL_SECONDS. Повтор с тем же ключом и
+телом получает этот ответ с заголовком Idempotent-Replayed: true, не доходя
+до обработчика и БД. Пока первый запрос выполняется, повтор получает 409,
+тот же ключ с другим телом — 422. Ответы 5xx не сохраняются: такой запрос
+можно повторить.
+
+Ключ действует в пределах метода, пути и вызывающего: субъекта токена, а без
+токена — пользователя из пути или поля user_id тела. У анонимного запроса
+вызывающий неизвестен, поэтому ключ дополнительно привязан к телу: ответ
+получит только повтор того же запроса, а тот же ключ с другим телом
+выполнится как новый запрос. Хранилище — бэкенд кэша:
+LRU с TTL в памяти процесса или общий Redis при CACHE_URL (при нескольких
+воркерах обязателен, см. main.py).
+"""
+import asyncio
+import hashlib
+import json
+import re
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from app import auth
+from app.config import settings
+from app.services.cache import make_backend
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# Сколько держится отметка «выполняется», если процесс упал, не дописав результат.
+# Пока запрос выполняется, отметка продлевается каждые IN_FLIGHT_REFRESH секунд
+IN_FLIGHT_TTL = 60
+IN_FLIGHT_REFRESH = IN_FLIGHT_TTL / 3
+# Большие ответы не сохраняем: повтор выполнится заново
+MAX_STORED_BODY = 64 * 1024
+
+_USER_PATH = re.compile(r"^/users/([^/]+)/")
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+_SKIPPED_HEADERS = {"content-length", "set-cookie", "server-timing"}
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _path_user_id(request: Request) -> str | None:
+    # Middleware работает до маршрутизации; все маршруты с пользователем в пути — /users/{user_id}/...
+    # (сопоставление с маршрутами не годится: вложенные роутеры FastAPI не отдают параметры пути)
+    match = _USER_PATH.match(request.url.path)
+    return match[1] if match else None
+
+
+async def caller(request: Request, body: bytes) -> str:
+    """Кто отправил запрос: ключи разных вызывающих не пересекаются."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"sub:{(await auth.verify_jwt(token))['sub']}"
+        except (HTTPException, KeyError):
+            # Непроверенный токен — по его хэшу: чужой токен клиент не воспроизведёт
+            return f"token:{fingerprint(token.encode())}"
+    user_id = _path_user_id(request)
+    if user_id is None:
+        try:
+            data = json.loads(body)
+            user_id = data.get("user_id") if isinstance(data, dict) else None
+        except ValueError:
+            pass
+    # Без пользователя общий «anonymous» отдал бы один ответ всем анонимным клиентам с тем же ключом
+    return f"user:{user_id}" if user_id else f"anonymous:{fingerprint(body)}"
+
+
+class IdempotencyStore:
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.replays = 0
+        self.executed = 0
+
+    async def begin(self, key: str, digest: str) -> dict | None:
+        """Занимает ключ под новый запрос. Если ключ уже занят, возвращает его запись."""
+        if await self.backend.add(key, {"fingerprint": digest, "status": None}, IN_FLIGHT_TTL):
+            return None
+        # Запись могла истечь между add и get — тогда считаем запрос ещё выполняющимся
+        return await self.backend.get(key) or {"fingerprint": digest, "status": None}
+
+    @asynccontextmanager
+    async def holding(self, key: str, digest: str):
+        """Продлевает отметку «выполняется», пока запрос не завершится."""
+        async def refresh():
+            while True:
+                await asyncio.sleep(IN_FLIGHT_REFRESH)
+                await self.backend.set(key, {"fingerprint": digest, "status": None}, IN_FLIGHT_TTL)
+
+        task = asyncio.create_task(refresh())
+        try:
+            yield
+        finally:
+            # Продление остановлено до finish/release — иначе оно перезаписало бы результат
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def finish(self, key: str, digest: str, status: int, body: bytes, headers: dict):
+        await self.backend.set(key, {
+            "fingerprint": digest,
+            "status": status,
+            "body": body.decode(),
+            "headers": headers,
+        }, self.ttl)
+
+    async def release(self, key: str):
+        await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        return {"replays": self.replays, "executed": self.executed}
+
+
+store = IdempotencyStore(make_backend(settings.IDEMPOTENCY_MAX_ENTRIES), settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+async def idempotent_requests(request: Request, call_next):
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None or request.method not in _WRITE_METHODS or not settings.IDEMPOTENCY_ENABLED:
+        return await call_next(request)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)
+
+    body = await request.body()
+    body_hash = fingerprint(body)
+    store_key = f"idempotency:{await caller(request, body)}:{request.method}:{request.url.path}:{key}"
+    entry = await store.begin(store_key, body_hash)
+    if entry is not None:
+        if entry["fingerprint"] != body_hash:
+            return JSONResponse({"detail": "Idempotency-Key was used with a different request"}, status_code=422)
+        if entry["status"] is None:
+            return JSONResponse({"detail": "A request with this Idempotency-Key is in progress"},
+                                status_code=409, headers={"Retry-After": "1"})
+        store.replays += 1
+        return Response(content=entry["body"], status_code=entry["status"],
+                        headers={**entry["headers"], REPLAYED_HEADER: "true"})
+
+    try:
+        async with store.holding(store_key, body_hash):
+            response = await call_next(request)
+            store.executed += 1
+            if response.status_code < 500:
+                body = b"".join([chunk async for chunk in response.body_iterator])
+    except BaseException:
+        await store.release(store_key)
+        raise
+    if response.status_code >= 500:
+        await store.release(store_key)
+        return response
+
+    try:
+        if len(body) > MAX_STORED_BODY:
+            raise ValueError
+        headers = {name: value for name, value in response.headers.items() if name not in _SKIPPED_HEADERS}
+        await store.finish(store_key, body_hash, response.status_code, body, headers)
+    except (ValueError, UnicodeDecodeError):
+        await store.release(store_key)
+
+    replayable = Response(content=body, status_code=response.status_code)
+    replayable.raw_headers = response.raw_headers
+    return replayable
@@ -0,0 +1,291 @@
+"""Фоновые задачи: очередь в таблице jobs и пул обработчиков в процессе приложения.
+
+Задача — строка jobs, поэтому переживает рестарт. Воркер забирает готовые
+задачи одним UPDATE ... RETURNING (в Postgres с FOR UPDATE SKIP LOCKED, так
+что несколько воркеров не берут одну задачу), выполняет не больше
+JOBS_CONCURRENCY одновременно и при ошибке откладывает повтор с растущей
+паузой. Задача, взятая упавшим процессом, возвращается в работу после
+истечения аренды. Ключ идемпотентности не даёт поставить задачу дважды:
+ежедневные задачи ставятся с ключом вида reminders:2026-10-18 и выполняются
+один раз в день на все воркеры.
+
+Обработчики работают пачками запросов по всем пользователям, а не по одному.
+Ручной запуск:
+
+    python -m app.services.jobs enqueue KIND
+    python -m app.services.jobs run
+"""
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import dialect_insert
+from app.models.habit import Habit
+from app.models.job import Job
+from app.models.team import Team
+from app.models.tracking import Tracking
+from app.models.user import User
+from app.services import leaderboard, stats
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 600
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+DEFAULT_MAX_ATTEMPTS = 5
+REMINDER_CHUNK_SIZE = 500
+
+HANDLERS = {}
+
+# Задача, которую выполняет текущий обработчик: для продления аренды из него
+_current_job: ContextVar[dict | None] = ContextVar("current_job", default=None)
+
+
+def handler(kind: str):
+    """Регистрирует обработчик задач вида kind: async (db, payload) -> None."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+async def enqueue(db: AsyncSession, kind: str, payload: dict | None = None, *, key: str | None = None,
+                  run_at: datetime | None = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> bool:
+    """Ставит задачу в транзакции вызывающего. False — задача с таким ключом уже есть."""
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, Job).values(
+        id=uuid.uuid4(), kind=kind, payload=payload or {}, status="pending", attempts=0,
+        max_attempts=max_attempts, run_at=run_at or now, idempotency_key=key, created_at=now,
+    )
+    if key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+    return (await db.execute(stmt.returning(Job.id))).first() is not None
+
+
+async def claim(db: AsyncSession, limit: int, lease: float = LEASE_SECONDS) -> list:
+    """Забирает до limit готовых задач и продлевает им аренду."""
+    now = datetime.utcnow()
+    # Воркер упал на последней попытке: аренда истекла, повторять нечего — задача провалена
+    await db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .values(status="failed", finished_at=now, locked_until=None,
+                last_error="Lease expired on the last attempt")
+    )
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == "pending", Job.run_at <= now),
+            and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts),
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = (await db.execute(
+        update(Job).where(Job.id.in_(due))
+        .values(status="running", attempts=Job.attempts + 1, locked_until=now + timedelta(seconds=lease))
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+    )).all()
+    await db.commit()
+    return claimed
+
+
+async def extend_lease(db: AsyncSession):
+    """Продлевает аренду выполняемой задачи в транзакции обработчика.
+
+    Долгие обработчики вызывают её перед коммитом очередного чанка, иначе после
+    LEASE_SECONDS задачу заберёт другой воркер. Чаще трети аренды не пишет.
+    """
+    job = _current_job.get()
+    if job is None or time.monotonic() - job["renewed"] < job["lease"] / 3:
+        return
+    await db.execute(
+        update(Job).where(Job.id == job["id"], Job.status == "running")
+        .values(locked_until=datetime.utcnow() + timedelta(seconds=job["lease"]))
+    )
+    job["renewed"] = time.monotonic()
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+class JobWorker:
+    def __init__(self, concurrency: int, poll_interval: float, lease: float = LEASE_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._session_factory = None
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._scheduled: set[str] = set()
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Прерванные задачи остаются running и вернутся в очередь после истечения аренды
+        tasks = [self._task, *self._running] if self._task is not None else list(self._running)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._running.clear()
+
+    async def schedule_daily(self, db: AsyncSession, now: datetime | None = None) -> list[str]:
+        """Ставит ежедневные задачи, чей час уже наступил."""
+        now = now or datetime.utcnow()
+        created = []
+        for kind, hour in (("daily_rollup", settings.JOBS_ROLLUP_HOUR),
+                           ("reminders", settings.JOBS_REMINDER_HOUR)):
+            key = f"{kind}:{now.date().isoformat()}"
+            if now.hour < hour or key in self._scheduled:
+                continue
+            if await enqueue(db, kind, {"date": now.date().isoformat()}, key=key):
+                created.append(key)
+            self._scheduled.add(key)
+        await db.commit()
+        return created
+
+    async def drain(self, session_factory) -> int:
+        """Выполняет все готовые задачи до пустой очереди. Возвращает их число."""
+        self._session_factory = session_factory
+        done = 0
+        while True:
+            async with session_factory() as db:
+                claimed = await claim(db, self.concurrency, self.lease)
+            if not claimed:
+                return done
+            await asyncio.gather(*(self._execute(job) for job in claimed))
+            done += len(claimed)
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._session_factory() as db:
+                    await self.schedule_daily(db)
+                    free = self.concurrency - len(self._running)
+                    claimed = await claim(db, free, self.lease) if free > 0 else []
+                for job in claimed:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+            except Exception:
+                logger.exception("Job polling failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _execute(self, job):
+        try:
+            func = HANDLERS.get(job.kind)
+            if func is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            _current_job.set({"id": job.id, "lease": self.lease, "renewed": time.monotonic()})
+            async with self._session_factory() as db:
+                await func(db, job.payload)
+                await db.commit()
+            values = {"status": "done", "finished_at": datetime.utcnow(), "locked_until": None, "last_error": None}
+        except Exception as e:
+            logger.exception("Job %s (%s) failed, attempt %d of %d",
+                             job.id, job.kind, job.attempts, job.max_attempts)
+            if job.attempts < job.max_attempts:
+                values = {"status": "pending",
+                          "run_at": datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))}
+            else:
+                values = {"status": "failed", "finished_at": datetime.utcnow()}
+            values.update(locked_until=None, last_error=repr(e)[:1000])
+
+        async with self._session_factory() as db:
+            await db.execute(update(Job).where(Job.id == job.id).values(**values))
+            await db.commit()
+
+
+@handler("daily_rollup")
+async def daily_rollup(db: AsyncSession, payload: dict):
+    """Ночной пересчёт агрегатов привычек и лидерборда; коммит после каждого чанка."""
+    habit_ids = list(await db.scalars(select(Habit.id)))
+    for start in range(0, len(habit_ids), stats.REBUILD_CHUNK_SIZE):
+        await stats.rebuild_habits(db, habit_ids[start:start + stats.REBUILD_CHUNK_SIZE])
+        await extend_lease(db)
+        await db.commit()
+    await refresh_leaderboard(db, payload)
+
+
+@handler("leaderboard_refresh")
+async def refresh_leaderboard(db: AsyncSession, payload: dict):
+    """Полный пересчёт лидерборда (смена дня); ставит LeaderboardScheduler раз в интервал."""
+    team_ids = list(await db.scalars(select(Team.id)))
+    for start in range(0, len(team_ids), leaderboard.REFRESH_CHUNK_SIZE):
+        await leaderboard.refresh_teams(db, team_ids[start:start + leaderboard.REFRESH_CHUNK_SIZE])
+        await extend_lease(db)
+        await db.commit()
+
+
+def users_without_checkin(day: date):
+    """Пользователи, у которых есть привычки (свои или командные), но нет отметок за day."""
+    has_habits = exists().where(or_(
+        Habit.user_id == User.id,
+        and_(User.team_id.is_not(None), Habit.team_id == User.team_id),
+    ))
+    checked_in = exists().where(Tracking.user_id == User.id, Tracking.date == day)
+    return select(User.id, User.name, User.email).where(has_habits, ~checked_in).order_by(User.id)
+
+
+async def send_reminders(users, day: date):
+    # Канала доставки (почта, push) в приложении пока нет — напоминания уходят в журнал
+    for user in users:
+        logger.info("Reminder for %s: no check-ins on %s", user.email, day)
+
+
+@handler("reminders")
+async def remind_missing_checkins(db: AsyncSession, payload: dict):
+    day = date.fromisoformat(payload["date"]) if "date" in payload else date.today()
+    query = users_without_checkin(day).limit(REMINDER_CHUNK_SIZE)
+    after, sent = None, 0
+    while True:
+        users = (await db.execute(query if after is None else query.where(User.id > after))).all()
+        if not users:
+            break
+        await send_reminders(users, day)
+        sent += len(users)
+        after = users[-1].id
+    logger.info("Sent %d reminders for %s", sent, day)
+
+
+worker = JobWorker(settings.JOBS_CONCURRENCY, settings.JOBS_POLL_SECONDS)
+
+
+async def _main(argv: list[str]):
+    from app.database import AsyncSessionLocal
+
+    if len(argv) == 2 and argv[0] == "enqueue" and argv[1] in HANDLERS:
+        async with AsyncSessionLocal() as db:
+            await enqueue(db, argv[1], {"date": date.today().isoformat()})
+            await db.commit()
+        print(f"Enqueued {argv[1]}")
+        return 0
+    if argv == ["run"]:
+        count = await worker.drain(AsyncSessionLocal)
+        print(f"Ran {count} jobs")
+        return 0
+    print(f"usage: python -m app.services.jobs enqueue {{{','.join(sorted(HANDLERS))}}}\n"
+          "       python -m app.services.jobs run")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,241 @@
+"""Лидерборд команд.
+
+Сводка хранится в team_stats / team_member_stats и пересчитывается в фоне:
+отметки помечают команду «грязной», планировщик раз в несколько секунд
+пересчитывает только такие команды и периодически — все (смена дня).
+Полный пересчёт ставится в очередь задач (app.services.jobs) с ключом
+интервала, так что при нескольких воркерах его выполняет один.
+Эндпоинт лидерборда читает только сводные таблицы. Пересчёт команды держит
+блокировку её строки в teams, так что пересчёты одной команды разными
+воркерами не перекрываются.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import dialect_insert
+from app.models.habit import Habit
+from app.models.team import Team
+from app.models.team_stats import TeamMemberStats, TeamStats
+from app.models.tracking import Tracking
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 30
+STREAK_LOOKBACK_DAYS = 365
+REFRESH_CHUNK_SIZE = 100
+# Строк участников на один INSERT: 7 параметров на строку, у asyncpg предел 32767
+MEMBER_INSERT_BATCH = 1000
+DIRTY_REFRESH_INTERVAL = 5
+FULL_REFRESH_INTERVAL = 600
+
+
+def _streak(days: list[date], today: date) -> int:
+    """Стрик по датам в порядке убывания: серия, заканчивающаяся сегодня или вчера."""
+    if not days or (today - days[0]).days > 1:
+        return 0
+    streak = 1
+    for previous, day in zip(days, days[1:]):
+        if (previous - day).days != 1:
+            break
+        streak += 1
+    return streak
+
+
+def _possible_days(created_at: datetime, today: date) -> int:
+    return max(0, min(WINDOW_DAYS, (today - created_at.date()).days + 1))
+
+
+async def refresh_teams(db: AsyncSession, team_ids, today: date | None = None) -> None:
+    """Пересчёт сводки для набора команд фиксированным числом запросов на чанк."""
+    today = today or date.today()
+    # Один порядок блокировок у всех воркеров — без взаимоблокировок между чанками
+    team_ids = sorted(team_ids)
+    for start in range(0, len(team_ids), REFRESH_CHUNK_SIZE):
+        await _refresh_chunk(db, team_ids[start:start + REFRESH_CHUNK_SIZE], today)
+
+
+async def _refresh_chunk(db: AsyncSession, team_ids: list, today: date) -> None:
+    # Пересчёт той же команды другим воркером ждёт коммита этого; удалённые команды пропускаются
+    team_ids = list(await db.scalars(
+        select(Team.id).where(Team.id.in_(team_ids)).order_by(Team.id).with_for_update()
+    ))
+    if not team_ids:
+        return
+    members = (await db.execute(
+        select(User.id, User.name, User.team_id).where(User.team_id.in_(team_ids))
+    )).all()
+    # Привычки участника в зачёте команды: его собственные и общие привычки команды.
+    # Участники — подзапросом: список id больших команд упёрся бы в предел параметров
+    member_ids = select(User.id).where(User.team_id.in_(team_ids))
+    habits = (await db.execute(
+        select(Habit.user_id, Habit.team_id, Habit.created_at)
+        .where(or_(Habit.team_id.in_(team_ids), Habit.user_id.in_(member_ids)))
+    )).all()
+
+    in_scope = and_(
+        Tracking.user_id == User.id,
+        Habit.id == Tracking.habit_id,
+        or_(Habit.user_id == User.id, Habit.team_id == User.team_id),
+    )
+    completed = dict((await db.execute(
+        select(User.id, func.count())
+        .select_from(User).join(Tracking, Tracking.user_id == User.id).join(Habit, in_scope)
+        .where(User.team_id.in_(team_ids), Tracking.date.between(today - timedelta(days=WINDOW_DAYS - 1), today))
+        .group_by(User.id)
+    )).all())
+    streak_rows = await db.execute(
+        select(User.id, Tracking.date)
+        .select_from(User).join(Tracking, Tracking.user_id == User.id).join(Habit, in_scope)
+        .where(User.team_id.in_(team_ids),
+               Tracking.date.between(today - timedelta(days=STREAK_LOOKBACK_DAYS), today))
+        .distinct()
+        .order_by(User.id, Tracking.date.desc())
+    )
+    streaks = {user_id: _streak([row.date for row in rows], today)
+               for user_id, rows in groupby(streak_rows, key=lambda row: row.id)}
+
+    member_rows = []
+    for member in members:
+        possible = sum(
+            _possible_days(h.created_at, today) for h in habits
+            if h.user_id == member.id or h.team_id == member.team_id
+        )
+        done = completed.get(member.id, 0)
+        member_rows.append({
+            "team_id": member.team_id,
+            "user_id": member.id,
+            "name": member.name,
+            "completed_30d": done,
+            "possible_30d": possible,
+            "completion_percent": min(100, round(done / possible * 100)) if possible else 0,
+            "streak": streaks.get(member.id, 0),
+        })
+
+    team_rows = []
+    now = datetime.utcnow()
+    for team_id in team_ids:
+        rows = [row for row in member_rows if row["team_id"] == team_id]
+        team_rows.append({
+            "team_id": team_id,
+            "members_count": len(rows),
+            # Командный стрик — столько дней подряд отмечались все участники
+            "streak": min((row["streak"] for row in rows), default=0),
+            "completion_percent": round(sum(row["completion_percent"] for row in rows) / len(rows)) if rows else 0,
+            "refreshed_at": now,
+        })
+
+    # Вышедшие из команды участники исчезают из сводки, остальные обновляются на месте
+    await db.execute(delete(TeamMemberStats).where(
+        TeamMemberStats.team_id.in_(team_ids),
+        ~exists().where(User.id == TeamMemberStats.user_id, User.team_id == TeamMemberStats.team_id),
+    ))
+    for start in range(0, len(member_rows), MEMBER_INSERT_BATCH):
+        stmt = dialect_insert(db, TeamMemberStats).values(member_rows[start:start + MEMBER_INSERT_BATCH])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[TeamMemberStats.team_id, TeamMemberStats.user_id],
+            set_={column: stmt.excluded[column] for column in member_rows[0] if column not in ("team_id", "user_id")},
+        ))
+    stmt = dialect_insert(db, TeamStats).values(team_rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[TeamStats.team_id],
+        set_={column: stmt.excluded[column] for column in team_rows[0] if column != "team_id"},
+    ))
+
+
+class LeaderboardScheduler:
+    """Фоновый пересчёт лидерборда внутри процесса приложения."""
+
+    def __init__(self, dirty_interval: float = DIRTY_REFRESH_INTERVAL,
+                 full_interval: float = FULL_REFRESH_INTERVAL):
+        self.dirty_interval = dirty_interval
+        self.full_interval = full_interval
+        self._dirty_users: set[uuid.UUID] = set()
+        self._dirty_teams: set[uuid.UUID] = set()
+        self._task: asyncio.Task | None = None
+        self._session_factory = None
+
+    def mark_user(self, user_id: uuid.UUID):
+        self._dirty_users.add(user_id)
+
+    def mark_team(self, team_id: uuid.UUID):
+        self._dirty_teams.add(team_id)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Пересчитывает помеченные команды. Возвращает их количество."""
+        users, self._dirty_users = self._dirty_users, set()
+        teams, self._dirty_teams = self._dirty_teams, set()
+        try:
+            if users:
+                teams |= set(await db.scalars(
+                    select(User.team_id).where(User.id.in_(users), User.team_id.is_not(None))
+                ))
+            if teams:
+                await refresh_teams(db, teams)
+                await db.commit()
+        except BaseException:
+            # Пометки возвращаются: команды пересчитаются в следующий проход
+            self._dirty_users |= users
+            self._dirty_teams |= teams
+            raise
+        return len(teams)
+
+    async def refresh_all(self, db: AsyncSession) -> int:
+        team_ids = list(await db.scalars(select(Team.id)))
+        await refresh_teams(db, team_ids)
+        await db.commit()
+        return len(team_ids)
+
+    async def request_full_refresh(self, db: AsyncSession) -> bool:
+        """Ставит полный пересчёт в очередь задач. False — на этот интервал он уже поставлен."""
+        from app.services import jobs
+
+        interval = int(time.time() // self.full_interval)
+        created = await jobs.enqueue(db, "leaderboard_refresh", key=f"leaderboard_refresh:{interval}")
+        await db.commit()
+        return created
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_full = loop.time()
+        while True:
+            try:
+                async with self._session_factory() as db:
+                    if loop.time() >= next_full:
+                        self._dirty_users.clear()
+                        self._dirty_teams.clear()
+                        if settings.JOBS_ENABLED:
+                            await self.request_full_refresh(db)
+                        else:
+                            await self.refresh_all(db)
+                        next_full = loop.time() + self.full_interval
+                    else:
+                        await self.flush(db)
+            except Exception:
+                logger.exception("Leaderboard refresh failed")
+            await asyncio.sleep(self.dirty_interval)
+
+
+scheduler = LeaderboardScheduler()
@@ -0,0 +1,235 @@
+"""Помесячные секции таблицы tracking (только Postgres).
+
+tracking секционирована по RANGE (date): одна секция на календарный месяц
+(tracking_y2026m10) и секция по умолчанию tracking_default для дат, у которых
+своей секции ещё нет. Запросы с условием по дате читают только нужные месяцы,
+а старую историю можно отсоединить целым месяцем без DELETE.
+
+Секции на ближайшие месяцы создаёт фоновая задача при старте приложения и
+раз в сутки; то же вручную:
+
+    python -m app.services.partitions ensure [--ahead N]
+    python -m app.services.partitions archive --older-than MONTHS [--drop]
+    python -m app.services.partitions list
+
+На других СУБД (SQLite в тестах) все операции ничего не делают.
+"""
+import asyncio
+import logging
+import re
+import sys
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "tracking"
+DEFAULT_PARTITION = "tracking_default"
+ARCHIVE_SCHEMA = "archive"
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+_PARTITION_NAME = re.compile(r"^tracking_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"tracking_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """Месяц секции по её имени; None для секции по умолчанию и чужих таблиц."""
+    match = _PARTITION_NAME.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def months_between(first: date, last: date) -> list[date]:
+    """Начала месяцев от first до last включительно."""
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_ddl(month: date) -> str:
+    return (f"CREATE TABLE {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+
+
+def initial_partitions_ddl(today: date | None = None) -> list[str]:
+    """Секция по умолчанию и секции текущего и следующего месяца для свежей схемы."""
+    current = month_start(today or date.today())
+    return [f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT",
+            partition_ddl(current), partition_ddl(add_months(current, 1))]
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    kind = await db.scalar(
+        text("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(:table)"),
+        {"table": PARENT_TABLE},
+    )
+    return kind == "p"
+
+
+async def list_partitions(db: AsyncSession) -> list[str]:
+    rows = await db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": PARENT_TABLE})
+    return list(rows)
+
+
+async def create_partition(db: AsyncSession, month: date) -> str:
+    """Секция на месяц. Если такие даты уже попали в секцию по умолчанию, строки переносятся."""
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    stray = False
+    if await db.scalar(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": DEFAULT_PARTITION}):
+        stray = await db.scalar(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end)"
+        ), bounds)
+    # Postgres не даст создать секцию, пока подходящие строки лежат в секции по умолчанию
+    if stray:
+        await db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    await db.execute(text(partition_ddl(month)))
+    if stray:
+        await db.execute(text(
+            f"INSERT INTO {PARENT_TABLE} (id, habit_id, user_id, date) "
+            f"SELECT id, habit_id, user_id, date FROM {DEFAULT_PARTITION} "
+            "WHERE date >= :start AND date < :end"
+        ), bounds)
+        await db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"), bounds)
+        await db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return name
+
+
+async def ensure_partitions(db: AsyncSession, ahead: int | None = None, today: date | None = None) -> list[str]:
+    """Создаёт недостающие секции с текущего месяца на ahead месяцев вперёд. Возвращает новые."""
+    if not await is_partitioned(db):
+        return []
+    ahead = settings.TRACKING_PARTITIONS_AHEAD if ahead is None else ahead
+    current = month_start(today or date.today())
+    existing = set(await list_partitions(db))
+    created = []
+    for month in months_between(current, add_months(current, ahead)):
+        if partition_name(month) not in existing:
+            created.append(await create_partition(db, month))
+    await db.commit()
+    return created
+
+
+async def archive_partitions(db: AsyncSession, older_than: int, drop: bool = False,
+                             today: date | None = None) -> list[str]:
+    """Отсоединяет секции месяцев старше older_than месяцев от текущего.
+
+    Отсоединённая секция переносится в схему archive (её можно выгрузить
+    pg_dump и удалить) или сразу удаляется при drop=True.
+    """
+    if not await is_partitioned(db):
+        return []
+    cutoff = add_months(month_start(today or date.today()), -older_than)
+    names = [name for name in await list_partitions(db)
+             if (month := partition_month(name)) is not None and month < cutoff]
+    if names and not drop:
+        await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    for name in names:
+        await db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if drop:
+            await db.execute(text(f"DROP TABLE {name}"))
+        else:
+            await db.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+    await db.commit()
+    return names
+
+
+class PartitionMaintainer:
+    """Раз в сутки создаёт секции на ближайшие месяцы."""
+
+    def __init__(self, interval: float = MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        self._session_factory = None
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._session_factory() as db:
+                    created = await ensure_partitions(db)
+                if created:
+                    logger.info("Created tracking partitions: %s", ", ".join(created))
+            except Exception:
+                logger.exception("Tracking partition maintenance failed")
+            await asyncio.sleep(self.interval)
+
+
+maintainer = PartitionMaintainer()
+
+
+USAGE = ("usage: python -m app.services.partitions ensure [--ahead N]\n"
+         "       python -m app.services.partitions archive --older-than MONTHS [--drop]\n"
+         "       python -m app.services.partitions list")
+
+
+async def _main(argv: list[str]):
+    import argparse
+
+    from app.database import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.partitions", usage=USAGE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure")
+    ensure.add_argument("--ahead", type=int, default=None)
+    archive = commands.add_parser("archive")
+    archive.add_argument("--older-than", type=int, required=True)
+    archive.add_argument("--drop", action="store_true")
+    commands.add_parser("list")
+    args = parser.parse_args(argv)
+
+    async with AsyncSessionLocal() as db:
+        if not await is_partitioned(db):
+            print("tracking is not partitioned (run migrations on Postgres first)")
+            return 1
+        if args.command == "ensure":
+            names = await ensure_partitions(db, ahead=args.ahead)
+            print(f"Created {len(names)} partitions" + (f": {', '.join(names)}" if names else ""))
+        elif args.command == "archive":
+            names = await archive_partitions(db, args.older_than, drop=args.drop)
+            action = "Dropped" if args.drop else f"Moved to schema {ARCHIVE_SCHEMA}"
+            print(f"{action}: {', '.join(names)}" if names else "Nothing to archive")
+        else:
+            for name in await list_partitions(db):
+                print(name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
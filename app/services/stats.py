@@ -0,0 +1,187 @@
+"""Стрики и процент выполнения привычек.
+
+Агрегаты хранятся в habit_stats и обновляются инкрементально при каждой
+отметке, поэтому страницам не нужно сканировать tracking. Полный пересчёт:
+
+    python -m app.services.stats rebuild
+"""
+import asyncio
+import sys
+import uuid
+from datetime import date, datetime
+from itertools import groupby
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.habit import Habit
+from app.models.habit_stats import HabitStats
+from app.models.tracking import Tracking
+
+WINDOW_DAYS = 30
+WINDOW_MASK = (1 << WINDOW_DAYS) - 1
+REBUILD_CHUNK_SIZE = 500
+
+
+def _apply_completion(stats: HabitStats, day: date) -> bool:
+    """Добавляет день в агрегаты. False — нужен полный пересчёт привычки."""
+    last = stats.last_completed
+    if last is None:
+        stats.current_streak = stats.longest_streak = stats.total_completed = 1
+        stats.last_completed = day
+        stats.recent_days = 1
+        return True
+    if day == last:
+        # Другой участник команды уже отметился в этот день
+        return True
+    if day < last:
+        offset = (last - day).days
+        # Отметка задним числом: без пересчёта можно только если день уже учтён
+        return offset < WINDOW_DAYS and bool(stats.recent_days >> offset & 1)
+
+    gap = (day - last).days
+    stats.current_streak = stats.current_streak + 1 if gap == 1 else 1
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    stats.total_completed += 1
+    stats.last_completed = day
+    stats.recent_days = (stats.recent_days << gap | 1) & WINDOW_MASK
+    return True
+
+
+def compute_stats(days: list[date]) -> dict:
+    """Агрегаты по отсортированному списку уникальных дат."""
+    stats = {"current_streak": 0, "longest_streak": 0, "last_completed": None,
+             "total_completed": len(days), "recent_days": 0}
+    streak = 0
+    previous = None
+    for day in days:
+        streak = streak + 1 if previous is not None and (day - previous).days == 1 else 1
+        stats["longest_streak"] = max(stats["longest_streak"], streak)
+        previous = day
+    if previous is not None:
+        stats["current_streak"] = streak
+        stats["last_completed"] = previous
+        for day in reversed(days):
+            offset = (previous - day).days
+            if offset >= WINDOW_DAYS:
+                break
+            stats["recent_days"] |= 1 << offset
+    return stats
+
+
+async def _upsert(db: AsyncSession, rows: list[dict]):
+    if not rows:
+        return
+    now = datetime.utcnow()
+    rows = [dict(row, updated_at=now) for row in rows]
+    stmt = dialect_insert(db, HabitStats).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[HabitStats.habit_id],
+        set_={column: stmt.excluded[column] for column in rows[0] if column != "habit_id"},
+    ))
+
+
+def _lock_habits(query):
+    # Все записи агрегатов привычки идут под блокировкой её строки в habits, иначе два
+    # параллельных пересчёта запишут каждый свой снимок без отметки соседа. NO KEY UPDATE
+    # не конфликтует с KEY SHARE, который берёт внешний ключ при вставке в tracking
+    return query.with_for_update(of=Habit, key_share=True)
+
+
+async def rebuild_habits(db: AsyncSession, habit_ids, locked: bool = False) -> None:
+    """Пересчёт агрегатов для набора привычек одним чтением tracking.
+
+    locked=True — строки привычек уже заблокированы в этой транзакции.
+    """
+    # Порядок блокировок одинаковый у всех транзакций — без взаимных блокировок
+    habit_ids = sorted(habit_ids)
+    for start in range(0, len(habit_ids), REBUILD_CHUNK_SIZE):
+        chunk = habit_ids[start:start + REBUILD_CHUNK_SIZE]
+        if not locked:
+            await db.execute(_lock_habits(select(Habit.id).where(Habit.id.in_(chunk)).order_by(Habit.id)))
+        # В READ COMMITTED следующий запрос видит отметки, закоммиченные до получения блокировки
+        result = await db.execute(
+            select(Tracking.habit_id, Tracking.date)
+            .where(Tracking.habit_id.in_(chunk))
+            .distinct()
+            .order_by(Tracking.habit_id, Tracking.date)
+        )
+        days_by_habit = {habit_id: [row.date for row in rows]
+                         for habit_id, rows in groupby(result, key=lambda row: row.habit_id)}
+        await _upsert(db, [
+            {"habit_id": habit_id, **compute_stats(days_by_habit.get(habit_id, []))} for habit_id in chunk
+        ])
+    db.expire_all()
+
+
+async def record_completion(db: AsyncSession, habit_id: uuid.UUID, day: date) -> None:
+    """Учитывает новую отметку. Вызывается в транзакции, вставившей строку tracking."""
+    await db.execute(_lock_habits(select(Habit.id).where(Habit.id == habit_id)))
+    # Агрегаты читаем отдельным запросом уже под блокировкой: в READ COMMITTED у него свой
+    # снимок, и он видит инкремент транзакции, которую мы ждали. Строка, присоединённая к
+    # заблокированной в том же запросе, пришла бы из снимка до ожидания
+    stats = await db.scalar(
+        select(HabitStats).where(HabitStats.habit_id == habit_id).with_for_update()
+    )
+    if stats is None or not _apply_completion(stats, day):
+        await rebuild_habits(db, [habit_id], locked=True)
+
+
+async def record_removal(db: AsyncSession, habit_id: uuid.UUID, day: date) -> None:
+    # Удаление может разорвать любой из стриков, включая самый длинный — пересчитываем привычку
+    await rebuild_habits(db, [habit_id])
+
+
+def snapshot(stats: HabitStats | None, today: date | None = None) -> dict:
+    """Значения на сегодня: стрик обнуляется, если вчера отметки не было."""
+    today = today or date.today()
+    if stats is None or stats.last_completed is None:
+        return {"current_streak": 0, "longest_streak": 0, "last_completed": None, "total_completed": 0,
+                "completed_7d": 0, "completed_30d": 0, "completion_rate_7d": 0, "completion_rate_30d": 0}
+
+    age = (today - stats.last_completed).days
+    current_streak = stats.current_streak if age <= 1 else 0
+
+    def completed_within(window: int) -> int:
+        # Дни last_completed - i, попадающие в [today - window + 1, today]
+        visible = window - max(age, 0)
+        if visible <= 0:
+            return 0
+        return bin(stats.recent_days & ((1 << min(visible, WINDOW_DAYS)) - 1)).count("1")
+
+    completed_7d = completed_within(7)
+    completed_30d = completed_within(30)
+    return {
+        "current_streak": current_streak,
+        "longest_streak": stats.longest_streak,
+        "last_completed": stats.last_completed,
+        "total_completed": stats.total_completed,
+        "completed_7d": completed_7d,
+        "completed_30d": completed_30d,
+        "completion_rate_7d": round(completed_7d / 7 * 100),
+        "completion_rate_30d": round(completed_30d / 30 * 100),
+    }
+
+
+async def rebuild_all(db: AsyncSession) -> int:
+    habit_ids = list(await db.scalars(select(Habit.id)))
+    await rebuild_habits(db, habit_ids)
+    await db.commit()
+    return len(habit_ids)
+
+
+async def _main(argv: list[str]):
+    from app.database import AsyncSessionLocal
+
+    if argv != ["rebuild"]:
+        print("usage: python -m app.services.stats rebuild")
+        return 2
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_all(db)
+    print(f"Rebuilt stats for {count} habits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,77 @@
+"""Векторная аналитика против построчного цикла на синтетической истории.
+
+    python -m benchmarks.bench_analytics --rows 10000000 --habits 5000 --days 3650
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services import analytics
+
+
+def loop_summary(habit_pos, day_pos, created_pos, n_days, start):
+    # Так бы считалось без NumPy: проход по каждой строке tracking
+    done = set()
+    for habit, day in zip(habit_pos.tolist(), day_pos.tolist()):
+        if day >= created_pos[habit]:
+            done.add((habit, day))
+    per_day = defaultdict(int)
+    for _, day in done:
+        per_day[day] += 1
+    active_per_day = [0] * n_days
+    for created in created_pos.tolist():
+        for day in range(created, n_days):
+            active_per_day[day] += 1
+    weekday_done, weekday_total = [0] * 7, [0] * 7
+    rates = []
+    for day in range(n_days):
+        weekday = (start + timedelta(days=day)).weekday()
+        weekday_done[weekday] += per_day[day]
+        weekday_total[weekday] += active_per_day[day]
+        rates.append(per_day[day] / active_per_day[day] if active_per_day[day] else 0.0)
+    rolling = [sum(rates[max(0, i - 6):i + 1]) / (i + 1 - max(0, i - 6)) for i in range(n_days)]
+    return [d / t if t else 0.0 for d, t in zip(weekday_done, weekday_total)], rolling
+
+
+def vectorized_summary(habit_pos, day_pos, created_pos, n_habits, n_days, start):
+    done = analytics.completion_matrix(habit_pos, day_pos, n_habits, n_days)
+    possible = analytics.active_matrix(created_pos, n_days).astype(np.int32)
+    return analytics.summarize(done, possible, start), done
+
+
+def main(args):
+    rng = np.random.default_rng(42)
+    start = date(2000, 1, 1)
+    habit_pos = rng.integers(0, args.habits, args.rows, dtype=np.int32)
+    day_pos = rng.integers(0, args.days, args.rows, dtype=np.int32)
+    created_pos = rng.integers(0, args.days // 2, args.habits, dtype=np.int32)
+    print(f"{args.rows:,} rows, {args.habits:,} habits, {args.days:,} days")
+
+    started = time.perf_counter()
+    summary, done = vectorized_summary(habit_pos, day_pos, created_pos, args.habits, args.days, start)
+    vectorized = time.perf_counter() - started
+    print(f"numpy summary:       {vectorized:8.3f} s")
+
+    started = time.perf_counter()
+    analytics.habit_correlation(done[:args.team_habits])
+    print(f"numpy correlation:   {time.perf_counter() - started:8.3f} s ({args.team_habits} habits)")
+
+    if not args.skip_loop:
+        started = time.perf_counter()
+        weekday, _ = loop_summary(habit_pos, day_pos, created_pos, args.days, start)
+        loop = time.perf_counter() - started
+        print(f"python loop summary: {loop:8.3f} s  (x{loop / vectorized:.0f} slower)")
+        assert np.allclose(weekday, summary["weekday_rates"], atol=1e-4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--habits", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--team-habits", type=int, default=200)
+    parser.add_argument("--skip-loop", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""Пропускная способность проверки JWT: до и после кэширования JWKS.
+
+Поднимает локальный JWKS-сервер с искусственной задержкой (имитация RTT до
+Clerk) и сравнивает старый путь — блокирующий запрос JWKS на каждый токен —
+с JWKSKeyStore.
+
+    python -m benchmarks.bench_auth --tokens 200 --latency 0.02 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from app.auth import HttpJWKSSource, JWKSKeyStore, JWT_AUDIENCE, JWT_ISSUER, verify_jwt
+
+KID = "bench-key"
+
+
+def make_keys():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": KID, "use": "sig", "alg": "RS256"})
+    return private_key, {"keys": [jwk]}
+
+
+def serve_jwks(jwks: dict, latency: float):
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=300")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/jwks.json"
+
+
+def verify_uncached(token: str, url: str):
+    # Прежняя реализация: JWKS запрашивается синхронно на каждый токен
+    jwks = httpx.get(url).json()
+    key = next(RSAAlgorithm.from_jwk(k) for k in jwks["keys"] if k["kid"] == KID)
+    return jwt.decode(token, key, algorithms=["RS256"], audience=JWT_AUDIENCE, issuer=JWT_ISSUER)
+
+
+async def run(tokens: list[str], verify, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(token):
+        async with semaphore:
+            await verify(token)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(t) for t in tokens))
+    return len(tokens) / (time.perf_counter() - start)
+
+
+async def main(args):
+    private_key, jwks = make_keys()
+    server, url = serve_jwks(jwks, args.latency)
+    tokens = [
+        jwt.encode({"sub": f"user_{i}", "aud": JWT_AUDIENCE, "iss": JWT_ISSUER, "exp": int(time.time()) + 600},
+                   private_key, algorithm="RS256", headers={"kid": KID})
+        for i in range(args.tokens)
+    ]
+
+    async def before(token):
+        verify_uncached(token, url)
+
+    store = JWKSKeyStore(HttpJWKSSource(url))
+
+    async def after(token):
+        await verify_jwt(token, store)
+
+    before_rate = await run(tokens, before, args.concurrency)
+    after_rate = await run(tokens, after, args.concurrency)
+    await store.aclose()
+    server.shutdown()
+
+    print(f"JWKS latency {args.latency * 1000:.0f} ms, {args.tokens} tokens, concurrency {args.concurrency}")
+    print(f"before (fetch per token): {before_rate:10.1f} tokens/s")
+    print(f"after  (JWKSKeyStore):    {after_rate:10.1f} tokens/s  (JWKS fetches: {store.fetch_count})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
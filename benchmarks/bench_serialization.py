@@ -0,0 +1,69 @@
+"""Список привычек: ORM-объекты + response_model против столбцов + TypeAdapter.
+
+    python -m benchmarks.bench_serialization --rows 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from app.api.serialization import dump_list, response_columns
+from app.database import Base
+from app.models import Habit, Team, User
+from app.schemas.habit import HabitResponse
+
+
+async def orm_path(db: AsyncSession) -> bytes:
+    # Прежний путь: сущности с JOIN команды, валидация каждой и jsonable_encoder
+    habits = (await db.scalars(select(Habit).options(joinedload(Habit.team)))).all()
+    items = [HabitResponse.model_validate(h, from_attributes=True) for h in habits]
+    return json.dumps(jsonable_encoder(items)).encode()
+
+
+async def lean_path(db: AsyncSession) -> bytes:
+    rows = (await db.execute(select(*response_columns(Habit, HabitResponse)))).all()
+    return dump_list(HabitResponse, rows)
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    user_id, team_id = uuid.uuid4(), uuid.uuid4()
+    async with AsyncSession(engine) as db:
+        await db.execute(insert(User), [{"id": user_id, "email": "bench@example.com", "name": "Bench"}])
+        await db.execute(insert(Team), [{"id": team_id, "name": "Bench", "owner_id": user_id}])
+        await db.execute(insert(Habit), [
+            {"id": uuid.uuid4(), "name": f"Habit {i}", "description": "", "user_id": user_id,
+             "team_id": team_id if i % 2 else None, "created_at": datetime.utcnow()}
+            for i in range(args.rows)
+        ])
+        await db.commit()
+    print(f"{args.rows:,} habits")
+
+    for name, path_fn in (("orm + response_model", orm_path), ("columns + TypeAdapter", lean_path)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            async with AsyncSession(engine) as db:
+                started = time.perf_counter()
+                body = await path_fn(db)
+                best = min(best, time.perf_counter() - started)
+        print(f"{name:22} {best * 1000:8.1f} ms  ({len(body):,} bytes)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
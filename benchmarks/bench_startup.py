@@ -0,0 +1,116 @@
+"""Время импорта приложения, запуска сервера и его остановки.
+
+Импорт меряется в чистом интерпретаторе с -X importtime: печатается общее
+время и самые дорогие модули. Запуск — от старта `python main.py` до
+первого ответа GET /system/pool; остановка — от SIGTERM до выхода процесса.
+С бюджетами (--max-import-ms, --max-boot-ms) код выхода 1 при превышении.
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+    python -m benchmarks.bench_startup --max-import-ms 800 --max-boot-ms 2500
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Без фоновых задач: они сразу пошли бы в БД, которой у бенчмарка может не быть
+ENV = {**os.environ, "JOBS_ENABLED": "false"}
+
+
+def measure_import(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """Время импорта (мс) и вклад модулей (self, мс) по выводу -X importtime."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=ENV, capture_output=True, text=True, check=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|", 2)
+        modules.append((int(own) / 1000, name.strip()))
+    return elapsed, modules
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_boot(timeout: float) -> tuple[float, float]:
+    """Мс до первого ответа сервера и мс от SIGTERM до выхода."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py", "--workers", "1", "--port", str(port)],
+                              cwd=ROOT, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode}")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError("server did not start in time")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/system/pool", timeout=1).raise_for_status()
+                break
+            except httpx.TransportError:
+                time.sleep(0.01)
+        boot = (time.perf_counter() - started) * 1000
+
+        stopping = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout)
+        return boot, (time.perf_counter() - stopping) * 1000
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-server", action="store_true", help="только время импорта")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-boot-ms", type=float)
+    args = parser.parse_args(argv)
+
+    imports, modules = [], []
+    for _ in range(args.runs):
+        elapsed, modules = measure_import(args.module)
+        imports.append(elapsed)
+    import_ms = statistics.median(imports)
+    print(f"import {args.module}: median {import_ms:.0f} ms over {args.runs} runs (interpreter start included)")
+    for own, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {own:8.1f} ms  {name}")
+
+    failures = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+
+    if not args.no_server:
+        boots, stops = zip(*(measure_boot(args.timeout) for _ in range(args.runs)))
+        boot_ms = statistics.median(boots)
+        print(f"boot to first response: median {boot_ms:.0f} ms")
+        print(f"graceful shutdown: median {statistics.median(stops):.0f} ms")
+        if args.max_boot_ms is not None and boot_ms > args.max_boot_ms:
+            failures.append(f"boot {boot_ms:.0f} ms > {args.max_boot_ms:.0f} ms")
+
+    for line in failures:
+        print(f"OVER BUDGET {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
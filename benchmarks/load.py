@@ -0,0 +1,351 @@
+"""Нагрузочный прогон API: засев синтетических данных и конкурентные клиенты.
+
+Засевает базу пользователями, командами, привычками и историей отметок,
+затем гоняет настоящее FastAPI-приложение (в процессе через ASGI или
+запущенный сервер по --base-url) смесью сценариев: отметки, списки,
+HTML-страницы. Печатает p50/p95/p99 и RPS по эндпоинтам; результаты можно
+сохранить как базовую линию и сравнивать с ней следующие прогоны.
+
+Засев пересоздаёт схему. Без --reset прогон откажется работать с чужой
+базой: удалённой (не localhost) или уже содержащей таблицы; свой файл SQLite
+во временном каталоге пересоздаётся всегда.
+
+    python -m benchmarks.load --users 2000 --duration 30 --concurrency 50 --save-baseline main
+    python -m benchmarks.load --users 2000 --duration 30 --concurrency 50 --compare main
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+from sqlalchemy import insert, inspect, make_url, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+SEED_CHUNK_SIZE = 5000
+DEFAULT_MIX = "checkin=3,list=5,pages=2"
+DEFAULT_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'habit_hive_load.db')}"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+@dataclass
+class Dataset:
+    """Идентификаторы засеянных строк — из них сценарии выбирают цели запросов."""
+    users: list = field(default_factory=list)
+    teams: list = field(default_factory=list)
+    habits: list = field(default_factory=list)
+    # (habit_id, user_id), которым можно отмечаться
+    checkins: list = field(default_factory=list)
+
+
+async def seed(session_factory, args) -> Dataset:
+    from app.database import Base
+    from app.models import Habit, Team, Tracking, User
+    from app.services import stats
+    from app.services.leaderboard import scheduler
+
+    rng = random.Random(args.seed)
+    data = Dataset()
+    today = date.today()
+    created_at = datetime.utcnow() - timedelta(days=args.days)
+
+    users, teams, habits, trackings = [], [], [], []
+    for i in range(args.users):
+        users.append({"id": uuid.uuid4(), "email": f"load-{i}@example.com", "name": f"User {i}",
+                      "created_at": created_at + timedelta(seconds=i), "team_id": None})
+    for i in range(args.teams):
+        owner = users[i % len(users)]
+        teams.append({"id": uuid.uuid4(), "name": f"Team {i}", "owner_id": owner["id"],
+                      "created_at": created_at + timedelta(seconds=i)})
+    members = defaultdict(list)
+    for user in users:
+        if teams and rng.random() < args.team_share:
+            team = rng.choice(teams)
+            user["team_id"] = team["id"]
+            members[team["id"]].append(user["id"])
+
+    for user in users:
+        for j in range(args.habits_per_user):
+            # Часть привычек — общие привычки команды пользователя
+            shared = user["team_id"] is not None and rng.random() < args.shared_habits
+            habit = {"id": uuid.uuid4(), "name": f"Habit {j}", "description": "", "user_id": user["id"],
+                     "team_id": user["team_id"] if shared else None, "created_at": created_at}
+            habits.append(habit)
+            trackers = members[user["team_id"]] if shared else [user["id"]]
+            for tracker in trackers:
+                data.checkins.append((habit["id"], tracker))
+                # История заканчивается вчера: сегодняшние отметки сценария продолжают стрики
+                for day in range(1, args.days + 1):
+                    if rng.random() < args.completion:
+                        trackings.append({"id": uuid.uuid4(), "habit_id": habit["id"], "user_id": tracker,
+                                          "date": today - timedelta(days=day)})
+
+    engine = session_factory.kw["bind"]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        # Сначала пользователи без команды: teams.owner_id и users.team_id ссылаются друг на друга
+        for model, rows in ((User, [dict(u, team_id=None) for u in users]), (Team, teams),
+                            (Habit, habits), (Tracking, trackings)):
+            for start in range(0, len(rows), SEED_CHUNK_SIZE):
+                await db.execute(insert(model), rows[start:start + SEED_CHUNK_SIZE])
+        memberships = [{"id": u["id"], "team_id": u["team_id"]} for u in users if u["team_id"]]
+        for start in range(0, len(memberships), SEED_CHUNK_SIZE):
+            await db.execute(update(User), memberships[start:start + SEED_CHUNK_SIZE])
+        await db.commit()
+        await stats.rebuild_all(db)
+        await scheduler.refresh_all(db)
+
+    data.users = [u["id"] for u in users]
+    data.teams = [t["id"] for t in teams]
+    data.habits = [h["id"] for h in habits]
+    print(f"seeded {len(users):,} users, {len(teams):,} teams, {len(habits):,} habits, "
+          f"{len(trackings):,} trackings")
+    return data
+
+
+def scenarios(data: Dataset, rng: random.Random) -> dict:
+    """Сценарий -> функция, возвращающая (метку эндпоинта, метод, путь, тело)."""
+    def checkin():
+        habit_id, user_id = rng.choice(data.checkins)
+        # Отметка за сегодня, как у настоящих клиентов: стрик и агрегаты обновляются
+        # инкрементально; повтор той же пары — дубликат (400), тоже частый случай
+        return "POST /trackings", "POST", "/trackings", {
+            "habit_id": str(habit_id), "user_id": str(user_id), "date": date.today().isoformat()}
+
+    def list_():
+        choice = rng.randrange(4)
+        if choice == 0:
+            return "GET /users/{user_id}/habits", "GET", f"/users/{rng.choice(data.users)}/habits", None
+        if choice == 1:
+            return "GET /habits/{habit_id}/trackings", "GET", f"/habits/{rng.choice(data.habits)}/trackings", None
+        if choice == 2 and data.teams:
+            return "GET /teams/{team_id}/leaderboard", "GET", f"/teams/{rng.choice(data.teams)}/leaderboard", None
+        return "GET /teams", "GET", "/teams", None
+
+    def pages():
+        choice = rng.randrange(4)
+        if choice == 0:
+            return "GET /habit/{habit_id}", "GET", f"/habit/{rng.choice(data.habits)}", None
+        page = ("/dashboard", "/team", "/habits")[choice - 1]
+        return f"GET {page}", "GET", f"{page}?user_id={rng.choice(data.users)}", None
+
+    return {"checkin": checkin, "list": list_, "pages": pages}
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+async def drive(client: httpx.AsyncClient, data: Dataset, args) -> tuple[dict, float]:
+    """Гоняет сценарии concurrency воркерами. Возвращает задержки по меткам и длительность."""
+    weights = parse_mix(args.mix)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+    remaining = args.requests
+
+    async def worker(number: int):
+        nonlocal remaining
+        rng = random.Random(args.seed * 1000 + number)
+        builders = scenarios(data, rng)
+        names = [name for name in weights if name in builders]
+        while time.perf_counter() < deadline:
+            if args.requests:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            label, method, path, body = builders[rng.choices(names, [weights[n] for n in names])[0]]()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            latencies[label].append(time.perf_counter() - started)
+            if failed:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed), elapsed
+
+
+def summarize(latencies: dict, errors: dict, elapsed: float) -> dict:
+    results = {}
+    everything = [value for values in latencies.values() for value in values]
+    for label, values in sorted(latencies.items()) + [("total", everything)]:
+        if not values:
+            continue
+        p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+        results[label] = {
+            "requests": len(values),
+            "errors": sum(errors.values()) if label == "total" else errors.get(label, 0),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        }
+    return results
+
+
+def print_report(results: dict):
+    print(f"{'endpoint':40} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, r in results.items():
+        print(f"{label:40} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Эндпоинты, у которых p95 вырос или RPS упал больше чем на tolerance."""
+    regressions = []
+    for label, r in results.items():
+        before = baseline["results"].get(label)
+        if before is None:
+            continue
+        if r["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']} -> {r['p95_ms']} ms")
+        if r["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: rps {before['rps']} -> {r['rps']}")
+    return regressions
+
+
+def config(args) -> dict:
+    keys = ("users", "teams", "habits_per_user", "days", "completion", "team_share", "shared_habits",
+            "concurrency", "duration", "requests", "mix", "seed")
+    return {key: getattr(args, key) for key in keys}
+
+
+def save_baseline(name: str, args, results: dict) -> Path:
+    BASELINES_DIR.mkdir(exist_ok=True)
+    path = BASELINES_DIR / f"{name}.json"
+    path.write_text(json.dumps({
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config(args),
+        "results": results,
+    }, indent=2, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_baseline(name: str) -> dict:
+    return json.loads((BASELINES_DIR / f"{name}.json").read_text())
+
+
+async def check_target(engine, args):
+    """Не даёт засеву снести схему чужой базы: удалённой или уже непустой."""
+    if args.reset or args.database_url == DEFAULT_DATABASE_URL:
+        return
+    url = make_url(args.database_url)
+    local = url.get_backend_name() == "sqlite" or (url.host or "localhost") in LOCAL_HOSTS
+    problem = None if local else "is not local"
+    if problem is None:
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        if tables:
+            problem = f"already has tables ({', '.join(sorted(tables)[:5])})"
+    if problem:
+        raise SystemExit(f"refusing to drop and reseed {url.render_as_string(hide_password=True)}: "
+                         f"the database {problem}; pass --reset to do it anyway")
+
+
+async def run(args) -> dict:
+    from app import database
+    from app.main import app
+
+    engine = create_async_engine(args.database_url, pool_size=args.concurrency, max_overflow=0,
+                                 **({"connect_args": {"timeout": 30}} if args.database_url.startswith("sqlite")
+                                    else {}))
+    database.instrument_engine(engine)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        await check_target(engine, args)
+        data = await seed(session_factory, args)
+
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+        else:
+            async def override_get_db():
+                async with session_factory() as session:
+                    yield session
+
+            app.dependency_overrides[database.get_db] = override_get_db
+            app.dependency_overrides[database.get_read_db] = override_get_db
+            app.dependency_overrides[database.get_read_sessionmaker] = lambda: session_factory
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+        async with client:
+            results, elapsed = await drive(client, data, args)
+    finally:
+        app.dependency_overrides.pop(database.get_db, None)
+        app.dependency_overrides.pop(database.get_read_db, None)
+        app.dependency_overrides.pop(database.get_read_sessionmaker, None)
+        await engine.dispose()
+    print(f"{elapsed:.1f} s, concurrency {args.concurrency}")
+    print_report(results)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--reset", action="store_true",
+                        help="пересоздать схему, даже если база удалённая или непустая")
+    parser.add_argument("--base-url", help="запущенный сервер, работающий с той же --database-url")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--teams", type=int, default=25)
+    parser.add_argument("--habits-per-user", type=int, default=3)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--completion", type=float, default=0.6)
+    parser.add_argument("--team-share", type=float, default=0.7)
+    parser.add_argument("--shared-habits", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--requests", type=int, default=0, help="остановиться после N запросов (0 — по времени)")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    if args.save_baseline:
+        print(f"baseline saved to {save_baseline(args.save_baseline, args, results)}")
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline["config"] != config(args):
+            print("warning: baseline was recorded with a different configuration")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against '{args.compare}' (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,62 @@
+"""Запуск сервера.
+
+    python main.py                      # настройки SERVER_* из окружения / .env
+    python main.py --workers 0 --port 8080
+
+Каждый воркер — отдельный процесс со своим приложением (create_app), пулом
+соединений и фоновыми задачами. При нескольких воркерах ленте команды нужен
+FEED_BACKEND=postgres, иначе события видят только подписчики своего процесса,
+а кэшу ответов и ключам идемпотентности — CACHE_URL (без него запуск
+завершается ошибкой).
+uvloop и httptools используются, если установлены (uvicorn[standard]). По
+SIGTERM воркер перестаёт принимать соединения, дожидается текущих запросов
+(не дольше SERVER_GRACEFUL_SHUTDOWN_SECONDS) и закрывает пулы БД.
+"""
+import argparse
+import importlib.util
 import os
 
-from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import FileResponse
-from starlette.staticfiles import StaticFiles
-from uvicorn import run
-from app.main import app
+import uvicorn
+
+from app.config import settings
+
 
-run(app, host='127.0.0.1', port=8000)
+def pick(module: str, fast: str, fallback: str) -> str:
+    return fast if importlib.util.find_spec(module) is not None else fallback
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Разрешаем фронту доступ
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Habit Hive API server")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="число процессов; 0 — по числу ядер")
+    parser.add_argument("--loop", default=pick("uvloop", "uvloop", "asyncio"))
+    parser.add_argument("--http", default=pick("httptools", "httptools", "h11"))
+    parser.add_argument("--reload", action="store_true", help="перезапуск при изменении кода (разработка)")
+    args = parser.parse_args(argv)
 
-# Путь до build
-frontend_path = os.path.join(os.path.dirname(__file__), "frontend", "build")
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and not args.reload and not settings.CACHE_URL:
+        # Инвалидация кэша и ключи идемпотентности в памяти видит только свой воркер
+        in_memory = [name for name, enabled in (("CACHE_ENABLED", settings.CACHE_ENABLED),
+                                                ("IDEMPOTENCY_ENABLED", settings.IDEMPOTENCY_ENABLED)) if enabled]
+        if in_memory:
+            parser.error(f"several workers need CACHE_URL=redis://... for {', '.join(in_memory)} "
+                         "(or set them to false)")
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else workers,
+        reload=args.reload,
+        loop=args.loop,
+        http=args.http,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+    )
 
-# Подключаем как статические файлы
-app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
 
-# На любой неизвестный путь отдаём index.html (SPA-маршрутизация)
-@app.get("/{full_path:path}")
-async def serve_spa():
-    return FileResponse(os.path.join(frontend_path, "index.html"))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
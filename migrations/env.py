@@ -8,12 +8,14 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from app.config import settings
-from app.database import Base
+from app.database import DATABASE_NOT_CONFIGURED, Base
 from app.models import User, Tracking, Team, Habit
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
+if not settings.DATABASE_URL:
+    raise RuntimeError(DATABASE_NOT_CONFIGURED)
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,47 @@
+"""Tracking and foreign key indexes
+
+Revision ID: 369ec6c874bb
+Revises: fcd67e3fc78f
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '369ec6c874bb'
+down_revision: Union[str, None] = 'fcd67e3fc78f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, столбцы)
+INDEXES = [
+    ('ix_tracking_user_id_date', 'tracking', ['user_id', 'date']),
+    ('ix_tracking_habit_id_date', 'tracking', ['habit_id', 'date']),
+    ('ix_habits_user_id', 'habits', ['user_id']),
+    ('ix_habits_team_id', 'habits', ['team_id']),
+    ('ix_users_team_id', 'users', ['team_id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_teams_created_at_id', 'teams', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        # id уже покрыт первичным ключом
+        op.drop_index('ix_users_id', table_name='users', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_id', 'users', ['id'], unique=False, postgresql_concurrently=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
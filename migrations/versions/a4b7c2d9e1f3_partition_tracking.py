@@ -0,0 +1,104 @@
+"""Partition tracking by month
+
+Revision ID: a4b7c2d9e1f3
+Revises: c90d2073e57c
+Create Date: 2026-10-18 15:42:10.503218
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4b7c2d9e1f3'
+down_revision: Union[str, None] = 'c90d2073e57c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секции создаются от первой отметки до трёх месяцев вперёд;
+# дальше их поддерживает app.services.partitions
+MONTHS_AHEAD = 3
+
+INDEXES = ('uix_tracking_unique_per_day', 'ix_tracking_user_id_date', 'ix_tracking_habit_id_date')
+
+
+# Арифметика месяцев встроена в миграцию: она не должна меняться вместе с кодом приложения
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Секционирование есть только в Postgres; на других СУБД схема не меняется
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Старая таблица уступает имена: индексы и ограничения в схеме уникальны
+    op.execute('ALTER TABLE tracking RENAME TO tracking_unpartitioned')
+    op.execute('ALTER TABLE tracking_unpartitioned RENAME CONSTRAINT tracking_pkey TO tracking_unpartitioned_pkey')
+    op.execute('ALTER TABLE tracking_unpartitioned RENAME CONSTRAINT uix_tracking_unique_per_day '
+               'TO uix_tracking_unpartitioned_unique_per_day')
+    for name in INDEXES[1:]:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_unpartitioned')
+
+    # Ключ секционирования обязан входить в первичный ключ и уникальные ограничения
+    op.execute("""
+        CREATE TABLE tracking (
+            id UUID NOT NULL,
+            habit_id UUID NOT NULL REFERENCES habits (id),
+            user_id UUID NOT NULL REFERENCES users (id),
+            date DATE NOT NULL,
+            CONSTRAINT tracking_pkey PRIMARY KEY (id, date),
+            CONSTRAINT uix_tracking_unique_per_day UNIQUE (habit_id, user_id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute('CREATE INDEX ix_tracking_user_id_date ON tracking (user_id, date)')
+    op.execute('CREATE INDEX ix_tracking_habit_id_date ON tracking (habit_id, date)')
+
+    current = date.today().replace(day=1)
+    first = op.get_bind().scalar(sa.text('SELECT min(date) FROM tracking_unpartitioned')) or current
+    month, last = min(first.replace(day=1), current), add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"CREATE TABLE tracking_y{month.year}m{month.month:02d} PARTITION OF tracking "
+                   f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+        month = add_months(month, 1)
+    op.execute('CREATE TABLE tracking_default PARTITION OF tracking DEFAULT')
+
+    op.execute('INSERT INTO tracking (id, habit_id, user_id, date) '
+               'SELECT id, habit_id, user_id, date FROM tracking_unpartitioned')
+    op.execute('DROP TABLE tracking_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Отсоединённые в архив секции в обратную миграцию не попадают
+    op.execute('ALTER TABLE tracking RENAME TO tracking_partitioned')
+    op.execute('ALTER TABLE tracking_partitioned RENAME CONSTRAINT tracking_pkey TO tracking_partitioned_pkey')
+    op.execute('ALTER TABLE tracking_partitioned RENAME CONSTRAINT uix_tracking_unique_per_day '
+               'TO uix_tracking_partitioned_unique_per_day')
+    for name in INDEXES[1:]:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_partitioned')
+
+    op.create_table('tracking',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('habit_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('habit_id', 'user_id', 'date', name='uix_tracking_unique_per_day')
+    )
+    op.create_index('ix_tracking_user_id_date', 'tracking', ['user_id', 'date'], unique=False)
+    op.create_index('ix_tracking_habit_id_date', 'tracking', ['habit_id', 'date'], unique=False)
+    op.execute('INSERT INTO tracking (id, habit_id, user_id, date) '
+               'SELECT id, habit_id, user_id, date FROM tracking_partitioned')
+    # Секции удаляются вместе с родительской таблицей
+    op.execute('DROP TABLE tracking_partitioned')
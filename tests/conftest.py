@@ -1,9 +1,92 @@
+import asyncio
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+# По умолчанию тесты идут на SQLite-файле; TEST_DATABASE_URL позволяет прогнать их на Postgres
+TEST_DATABASE_URL = os.getenv(
+    "TEST_DATABASE_URL",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'habit_hive_test.db')}",
+)
+# Движки приложения (пул в /system/pool) смотрят в ту же тестовую БД; задаётся до импорта настроек
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+
+from app.database import Base, get_db, get_read_db, get_read_sessionmaker, instrument_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+test_engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+instrument_engine(test_engine)
+TestSessionLocal = async_sessionmaker(bind=test_engine, class_=AsyncSession, expire_on_commit=False)
+
+if test_engine.dialect.name == "sqlite":
+    @event.listens_for(test_engine.sync_engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 
-from app.main import app
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    async def create_schema():
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_read_sessionmaker] = lambda: TestSessionLocal
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def db_engine():
+    return test_engine
+
+
+@pytest.fixture
+def sql_queries():
+    """Список SQL-запросов к тестовой БД, выполненных за время теста."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", record)
 
 
 @pytest.fixture
 def client_httpx():
-    return TestClient(app=app)
\ No newline at end of file
+    return TestClient(app=app)
+
+
+@pytest.fixture
+def make_user(client_httpx):
+    def make(email, name="Tracker"):
+        response = client_httpx.post("/users/", json={"email": email, "name": name})
+        assert response.status_code == 200
+        return response.json()["id"]
+    return make
+
+
+@pytest.fixture
+def make_habit(client_httpx):
+    def make(user_id, name="Пить воду"):
+        response = client_httpx.post(f"/users/{user_id}/habits", json={"name": name, "description": ""})
+        assert response.status_code == 200
+        return response.json()["id"]
+    return make
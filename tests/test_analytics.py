@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from app.services import analytics
+
+TODAY = date.today()
+
+
+def test_vectorized_matches_loops():
+    start = date(2025, 3, 3)  # понедельник
+    habit_pos = np.array([0, 0, 0, 1, 1], dtype=np.int32)
+    day_pos = np.array([0, 1, 7, 1, 8], dtype=np.int32)
+    done = analytics.completion_matrix(habit_pos, day_pos, n_habits=2, n_days=14)
+    possible = analytics.active_matrix(np.array([0, 1]), 14).astype(np.int32)
+
+    assert done.sum() == 5
+    rates = analytics.weekday_rates(done, possible, start)
+    # Понедельники: обе отметки первой привычки, вторая существует только ко второму понедельнику
+    assert rates[0] == 0.6667
+    assert rates[1] == 0.75
+    assert rates[2] == 0.0
+
+    rolling = analytics.rolling_mean(np.array([1.0, 0.0, 1.0, 1.0]), 2)
+    assert rolling.tolist() == [1.0, 0.5, 0.5, 1.0]
+
+    correlation = analytics.habit_correlation(np.array([[1, 0, 1, 0], [1, 0, 1, 0], [0, 0, 0, 0]]))
+    assert correlation[0][1] == 1.0
+    assert correlation[2][2] is None
+
+
+def test_user_and_team_analytics(client_httpx, make_user, make_habit):
+    owner = make_user("analytics@example.com", "Analyst")
+    mate = make_user("analytics-mate@example.com", "Mate")
+    team_id = client_httpx.post(f"/users/{owner}/teams", json={"name": "Аналитики"}).json()["id"]
+    for user_id in (owner, mate):
+        client_httpx.post(f"/users/{user_id}/join/{team_id}")
+    habit_id = make_habit(owner, "Бег")
+    client_httpx.post("/trackings/batch", json=[
+        {"habit_id": habit_id, "user_id": owner, "date": str(TODAY - timedelta(days=d))} for d in range(3)
+    ])
+
+    data = client_httpx.get(f"/users/{owner}/analytics", params={"days": 30}).json()
+    assert len(data["heatmap"]) == 30
+    assert data["heatmap"][-3:] == [1, 1, 1]
+    assert data["habits"][0]["completed"] == 3
+    assert len(data["weekday_rates"]) == 7
+
+    team = client_httpx.get(f"/teams/{team_id}/analytics", params={"days": 30}).json()
+    assert {m["name"]: m["completion_rate"] for m in team["members"]}["Mate"] == 0.0
+    assert sum(team["heatmap"]) == 3
+    assert team["correlation_habits"] == [habit_id]
+
+
+def test_correlation_is_capped_to_most_completed_habits():
+    done = np.zeros((analytics.MAX_CORRELATION_HABITS + 10, 5), dtype=np.int32)
+    done[-1] = 1
+    done[3, :2] = 1
+    ids = list(range(done.shape[0]))
+    data = analytics.correlation(ids, done)
+    assert len(data["correlation_habits"]) == analytics.MAX_CORRELATION_HABITS
+    assert len(data["habit_correlation"]) == len(data["habit_correlation"][0]) == analytics.MAX_CORRELATION_HABITS
+    # Самые выполняемые попадают в матрицу, порядок привычек сохраняется
+    assert data["correlation_habits"][:4] == [0, 1, 2, 3]
+    assert data["correlation_habits"][-1] == ids[-1]
+
+
+class _PostgresSession:
+    """Сессия с диалектом Postgres, отдающая заранее заданные строки array_agg."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def get_bind(self):
+        return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self.rows
+
+
+def test_postgres_branch_unpacks_day_arrays():
+    start = date(2025, 1, 1)
+    first, second, user = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db = _PostgresSession([(second, user, [0, 2]), (first, user, [1])])
+    habit_pos, user_ids, day_pos = asyncio.run(
+        analytics.load_day_arrays(db, [first, second], start, start + timedelta(days=2))
+    )
+    assert habit_pos.tolist() == [1, 1, 0]
+    assert day_pos.tolist() == [0, 2, 1]
+    assert user_ids == [user, user, user]
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "array_agg(tracking.date - " in sql
+    assert "GROUP BY tracking.habit_id, tracking.user_id" in sql
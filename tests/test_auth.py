@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+
+from app.auth import (FileJWKSSource, JWKSKeyStore, JWT_AUDIENCE, JWT_ISSUER, VerifiedTokenCache, parse_max_age,
+                      verify_jwt)
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private_key, jwk
+
+
+def make_token(private_key, kid, **claims):
+    payload = {"sub": "user_1", "aud": JWT_AUDIENCE, "iss": JWT_ISSUER, "exp": int(time.time()) + 60}
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+class CountingSource(FileJWKSSource):
+    async def fetch(self):
+        await asyncio.sleep(0.01)
+        return await super().fetch()
+
+
+@pytest.fixture
+def jwks_file(tmp_path):
+    private_key, jwk = make_key("key-1")
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [jwk]}))
+    return path, private_key
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=600") == 600
+    assert parse_max_age("no-store") == 0
+    assert parse_max_age(None) is None
+
+
+@pytest.mark.asyncio
+async def test_verify_jwt_uses_cached_key(jwks_file):
+    path, private_key = jwks_file
+    store = JWKSKeyStore(FileJWKSSource(path))
+    token = make_token(private_key, "key-1")
+
+    for _ in range(5):
+        payload = await verify_jwt(token, store)
+        assert payload["sub"] == "user_1"
+    assert store.fetch_count == 1
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_single_flight(jwks_file):
+    path, _ = jwks_file
+    store = JWKSKeyStore(CountingSource(path), min_refetch_interval=0)
+    await store.refresh()
+
+    # Ротация ключей: новый kid появляется в JWKS раньше истечения TTL
+    new_key, new_jwk = make_key("key-2")
+    path.write_text(json.dumps({"keys": [new_jwk]}))
+    token = make_token(new_key, "key-2")
+
+    results = await asyncio.gather(*(verify_jwt(token, store) for _ in range(20)))
+    assert all(r["sub"] == "user_1" for r in results)
+    assert store.fetch_count == 2
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_rejected(jwks_file):
+    path, _ = jwks_file
+    store = JWKSKeyStore(FileJWKSSource(path))
+    other_key, _ = make_key("key-x")
+
+    with pytest.raises(HTTPException) as exc:
+        await verify_jwt(make_token(other_key, "key-x"), store)
+    assert exc.value.status_code == 401
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_expired_token(jwks_file):
+    path, private_key = jwks_file
+    store = JWKSKeyStore(FileJWKSSource(path))
+    token = make_token(private_key, "key-1", exp=int(time.time()) - 10)
+
+    with pytest.raises(HTTPException) as exc:
+        await verify_jwt(token, store)
+    assert exc.value.detail == "Token has expired"
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_verified_token_cache(jwks_file):
+    path, private_key = jwks_file
+    store = JWKSKeyStore(FileJWKSSource(path))
+    cache = VerifiedTokenCache(maxsize=2)
+    tokens = [make_token(private_key, "key-1", sub=f"user_{i}") for i in range(3)]
+
+    await verify_jwt(tokens[0], store, cache)
+    await verify_jwt(tokens[0], store, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # LRU: третий токен вытесняет самый давний
+    await verify_jwt(tokens[1], store, cache)
+    await verify_jwt(tokens[2], store, cache)
+    assert cache.stats()["size"] == 2
+    assert cache.get(tokens[0], store) is None
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_verified_token_cache_expires(jwks_file):
+    path, private_key = jwks_file
+    store = JWKSKeyStore(FileJWKSSource(path))
+    await store.refresh()
+    cache = VerifiedTokenCache()
+    token = make_token(private_key, "key-1")
+
+    cache.put(token, "key-1", {"sub": "user_1", "exp": int(time.time()) - 1})
+    assert cache.get(token, store) is None
+    assert cache.stats()["size"] == 0
+    await store.aclose()
@@ -0,0 +1,60 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services import bitmaps
+
+
+def test_streak_crosses_year_boundary():
+    days = [date(2025, 12, 29), date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)]
+    maps = bitmaps.days_to_bits(days)
+    assert bitmaps.streak(maps, date(2026, 1, 2)) == 5
+    # Сегодня ещё не отмечено — стрик считается со вчерашнего дня
+    assert bitmaps.streak(maps, date(2026, 1, 3)) == 5
+    assert bitmaps.streak(maps, date(2026, 1, 4)) == 0
+    assert bitmaps.longest_streak(maps) == 5
+
+
+def test_range_query_and_longest_streak():
+    days = [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1), date(2024, 3, 10), date(2024, 12, 31)]
+    maps = bitmaps.days_to_bits(days)
+    assert len(bitmaps.to_bytes(maps[2024])) == bitmaps.BITMAP_BYTES
+    assert bitmaps.bits_to_days(2024, maps[2024] & bitmaps.year_mask(2024, date(2024, 2, 29), date(2024, 3, 10))) \
+        == days[1:4]
+    assert bitmaps.longest_streak(maps) == 3
+
+
+def test_bitmaps_follow_trackings(client_httpx, make_user, make_habit, db_engine, monkeypatch):
+    monkeypatch.setattr(settings, "COMPLETION_BITMAPS", True)
+    user_id = make_user("bitmaps@example.com")
+    habit_id = make_habit(user_id)
+    today = date.today()
+    days = [today - timedelta(days=d) for d in (0, 1, 2, 5)]
+
+    created = client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id,
+                                                    "date": days[0].isoformat()}).json()
+    client_httpx.post("/trackings/batch", json=[
+        {"habit_id": habit_id, "user_id": user_id, "date": day.isoformat()} for day in days[1:]
+    ])
+
+    async def read():
+        async with AsyncSession(db_engine) as db:
+            return (
+                await bitmaps.completed_days(db, uuid.UUID(habit_id), uuid.UUID(user_id), days[-1], today),
+                await bitmaps.current_streak(db, uuid.UUID(habit_id), uuid.UUID(user_id), today),
+            )
+
+    assert asyncio.run(read()) == (sorted(days), 3)
+
+    assert client_httpx.delete(f"/trackings/{created['id']}").status_code == 204
+    assert asyncio.run(read()) == (sorted(days[1:]), 2)
+
+    async def backfill_and_read():
+        async with AsyncSession(db_engine) as db:
+            assert await bitmaps.backfill(db) > 0
+        return await read()
+
+    assert asyncio.run(backfill_and_read()) == (sorted(days[1:]), 2)
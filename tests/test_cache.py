@@ -0,0 +1,70 @@
+import asyncio
+
+from app.services.cache import MemoryCacheBackend, response_cache
+
+
+def test_user_habits_etag_and_invalidation(client_httpx, make_user):
+    user_id = make_user("cache@example.com", "Cache")
+
+    first = client_httpx.get(f"/users/{user_id}/habits")
+    assert first.status_code == 200 and first.json() == []
+    etag = first.headers["etag"]
+
+    hits = response_cache.hits
+    not_modified = client_httpx.get(f"/users/{user_id}/habits", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert response_cache.hits == hits + 1
+
+    # Новая привычка меняет версию пространства имён — старый ETag больше не подходит
+    assert client_httpx.post(f"/users/{user_id}/habits", json={"name": "Кэш", "description": ""}).status_code == 200
+    fresh = client_httpx.get(f"/users/{user_id}/habits", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert [h["name"] for h in fresh.json()] == ["Кэш"]
+    assert fresh.headers["etag"] != etag
+
+
+def test_team_list_invalidated_on_create(client_httpx, make_user):
+    user_id = make_user("cache-team@example.com", "Owner")
+    before = client_httpx.get("/teams", params={"limit": 1000}).json()
+
+    team = client_httpx.post(f"/users/{user_id}/teams", json={"name": "Cached"}).json()
+    after = client_httpx.get("/teams", params={"limit": 1000}).json()
+    assert len(after) == len(before) + 1
+
+    single = client_httpx.get(f"/teams/{team['id']}")
+    assert single.json()["name"] == "Cached"
+    assert client_httpx.get(f"/teams/{team['id']}", headers={"If-None-Match": single.headers["etag"]}).status_code == 304
+
+
+def test_memory_backend_lru_and_ttl():
+    async def scenario():
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", {"v": 1}, ttl=60)
+        await backend.set("b", {"v": 2}, ttl=60)
+        assert await backend.get("a") == {"v": 1}
+        # "b" — самая старая запись после обращения к "a"
+        await backend.set("c", {"v": 3}, ttl=60)
+        assert await backend.get("b") is None
+        assert await backend.get("a") == {"v": 1}
+
+        await backend.set("expired", {"v": 4}, ttl=0)
+        assert await backend.get("expired") is None
+
+    asyncio.run(scenario())
+
+
+def test_memory_backend_versions_are_bounded():
+    async def scenario():
+        backend = MemoryCacheBackend(max_entries=2)
+        stale = f"ns:a:{await backend.get_version('ns:a')}"
+        await backend.set(stale, {"v": "old"}, ttl=60)
+        await backend.set_version("ns:a", "100.0")
+        await backend.set_version("ns:b", "101.0")
+        await backend.set_version("ns:c", "102.0")
+        assert len(backend._versions) == 2
+        # Вытесненное пространство не возвращается к версии, под которой лежат старые записи
+        assert f"ns:a:{await backend.get_version('ns:a')}" != stale
+        assert await backend.get_version("ns:c") == "102.0"
+
+    asyncio.run(scenario())
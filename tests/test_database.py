@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import InstrumentedPool, _create_engine
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_checkouts(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedPool,
+                                 pool_size=1, max_overflow=0)
+    other = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'other.db'}", poolclass=InstrumentedPool)
+    for _ in range(3):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    metrics = engine.pool.metrics
+    await engine.dispose()
+
+    assert engine.pool.metrics is metrics
+    assert metrics.checkouts == 3
+    assert metrics.wait_seconds_max >= 0
+    # Счётчики у каждого пула свои: реплика не повторяет цифры основной БД
+    assert other.pool.metrics.checkouts == 0
+    await other.dispose()
+
+
+def test_pool_status_endpoint(client_httpx):
+    data = client_httpx.get("/system/pool").json()
+    assert {"size", "checked_out", "overflow", "checkouts", "timeouts", "wait_seconds_total"} <= set(data)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_engine_connects_without_asyncpg_args(tmp_path):
+    engine = _create_engine(f"sqlite+aiosqlite:///{tmp_path / 'plain.db'}")
+    async with engine.connect() as conn:
+        assert await conn.scalar(text("SELECT 1")) == 1
+    await engine.dispose()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import uuid
+from datetime import date
+
+import pytest
+
+from app.services.cache import response_cache
+from app.services.feed import FeedHub, LocalFeedBackend, hub, sse_events
+
+
+def test_subscriber_queue_drops_when_full():
+    async def scenario():
+        feed = FeedHub(LocalFeedBackend(), queue_size=2)
+        team_id = uuid.uuid4()
+        slow = feed.subscribe(team_id)
+        other_team = feed.subscribe(uuid.uuid4())
+        for i in range(5):
+            await feed.publish(team_id, {"type": "tracking.created", "n": i})
+
+        assert slow.queue.qsize() == 2 and slow.dropped == 3
+        assert other_team.queue.empty()
+
+        events = sse_events(feed, slow, heartbeat=0.01)
+        assert await anext(events) == "retry: 3000\n\n"
+        # Первым делом клиент узнаёт о пропусках, затем получает то, что успело лечь в очередь
+        assert await anext(events) == 'event: lagged\ndata: {"dropped": 3}\n\n'
+        message = await anext(events)
+        assert message.startswith("event: tracking.created\n")
+        assert json.loads(message.split("data: ")[1])["n"] == 0
+        assert json.loads((await anext(events)).split("data: ")[1])["n"] == 1
+        assert await anext(events) == ": ping\n\n"
+
+        await events.aclose()
+        assert feed.stats()["subscribers"] == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+def test_checkin_is_published_to_team_feed(client_httpx, make_user, make_habit):
+    owner_id = make_user("feed-owner@example.com", "Анна")
+    team_id = client_httpx.post(f"/users/{owner_id}/teams", json={"name": "Лента"}).json()["id"]
+    client_httpx.post(f"/users/{owner_id}/join/{team_id}")
+    loner_id = make_user("feed-loner@example.com")
+    habit_id = make_habit(owner_id, "Планка")
+
+    subscription = hub.subscribe(uuid.UUID(team_id))
+    try:
+        tracking = client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": owner_id,
+                                                         "date": date.today().isoformat()}).json()
+        # Отметки пользователя без команды никуда не публикуются
+        client_httpx.post("/trackings", json={"habit_id": make_habit(loner_id), "user_id": loner_id,
+                                              "date": date.today().isoformat()})
+        client_httpx.delete(f"/trackings/{tracking['id']}")
+
+        created = subscription.queue.get_nowait()
+        assert created == {"type": "tracking.created", "id": tracking["id"], "habit_id": habit_id,
+                           "habit_name": "Планка", "user_id": owner_id, "user_name": "Анна",
+                           "date": date.today().isoformat()}
+        assert subscription.queue.get_nowait()["type"] == "tracking.deleted"
+        assert subscription.queue.empty()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+def test_batch_checkin_publishes_only_its_own_pairs(client_httpx, make_user, make_habit):
+    first_id, second_id = make_user("feed-batch-1@example.com", "Оля"), make_user("feed-batch-2@example.com", "Иван")
+    team_id = client_httpx.post(f"/users/{first_id}/teams", json={"name": "Пакет"}).json()["id"]
+    for user_id in (first_id, second_id):
+        client_httpx.post(f"/users/{user_id}/join/{team_id}")
+    first_habit, second_habit = make_habit(first_id, "Йога"), make_habit(second_id, "Бег")
+
+    subscription = hub.subscribe(uuid.UUID(team_id))
+    try:
+        today = date.today().isoformat()
+        response = client_httpx.post("/trackings/batch", json=[
+            {"habit_id": first_habit, "user_id": first_id, "date": today},
+            {"habit_id": second_habit, "user_id": second_id, "date": today},
+        ])
+        assert response.json()["created"] == 2
+
+        events = [subscription.queue.get_nowait() for _ in range(2)]
+        # Ни одной «перекрёстной» пары привычки одного участника с другим участником
+        assert {(e["habit_name"], e["user_name"]) for e in events} == {("Йога", "Оля"), ("Бег", "Иван")}
+        assert subscription.queue.empty()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def test_feed_for_unknown_team_is_404(client_httpx):
+    assert client_httpx.get(f"/teams/{uuid.uuid4()}/feed").status_code == 404
+
+
+def test_checkin_survives_side_channel_failures(client_httpx, make_user, make_habit, monkeypatch):
+    user_id = make_user("feed-broken@example.com")
+    habit_id = make_habit(user_id)
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("cache is down")
+
+    monkeypatch.setattr(response_cache, "invalidate", broken)
+    monkeypatch.setattr(hub.backend, "publish", broken)
+    # Запись уже закоммичена: сбой кэша или ленты не превращает её в 500
+    response = client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id,
+                                                     "date": date.today().isoformat()})
+    assert response.status_code == 200
+    assert client_httpx.delete(f"/trackings/{response.json()['id']}").status_code == 204
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.habit import Habit
+from app.services.cache import response_cache
+
+
+def _text(response) -> str:
+    return " ".join(response.text.split())
+
+
+def test_dashboard_remembers_viewer_and_reflects_checkins(client_httpx, make_user, make_habit):
+    user_id = make_user("page-dashboard@example.com", "Вера")
+    habit_id = make_habit(user_id, "Растяжка")
+
+    page = client_httpx.get("/dashboard", params={"user_id": user_id})
+    assert page.status_code == 200
+    assert "Привет, Вера" in page.text
+    assert "Растяжка" in page.text and "line-through" not in page.text
+
+    hits = response_cache.hits
+    # Повторный заход без параметра: пользователь из cookie, блок привычек из кэша
+    assert "Растяжка" in client_httpx.get("/dashboard").text
+    assert response_cache.hits == hits + 1
+
+    client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id, "date": date.today().isoformat()})
+    page = client_httpx.get("/dashboard")
+    assert "line-through" in page.text
+    assert "width: 100%" in page.text
+
+
+def test_pages_without_viewer_redirect_to_login(client_httpx):
+    client_httpx.cookies.clear()
+    response = client_httpx.get("/habits", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
+    assert 'name="user_id"' in client_httpx.get("/login").text
+
+
+def test_team_page_grid_invalidated_on_tracking(client_httpx, make_user, db_engine):
+    owner_id = make_user("page-owner@example.com", "Ольга")
+    member_id = make_user("page-member@example.com", "Игорь")
+    assert "не состоите в команде" in client_httpx.get("/team", params={"user_id": owner_id}).text
+
+    team_id = client_httpx.post(f"/users/{owner_id}/teams", json={"name": "Бегуны"}).json()["id"]
+    for user_id in (owner_id, member_id):
+        assert client_httpx.post(f"/users/{user_id}/join/{team_id}").status_code == 200
+
+    # Общие привычки команды через API не создаются — добавляем напрямую
+    shared_id = uuid.uuid4()
+
+    async def add_shared_habit():
+        async with AsyncSession(db_engine) as db:
+            await db.execute(insert(Habit).values(id=shared_id, name="Пробежка", description="",
+                                                  user_id=uuid.UUID(owner_id), team_id=uuid.UUID(team_id)))
+            await db.commit()
+
+    asyncio.run(add_shared_habit())
+
+    page = client_httpx.get("/team", params={"user_id": member_id})
+    assert "Команда: Бегуны" in page.text
+    assert "Ольга" in page.text and "Игорь" in page.text
+    assert "Выполнено 0 из 2" in _text(page)
+
+    client_httpx.post("/trackings", json={"habit_id": str(shared_id), "user_id": member_id,
+                                          "date": date.today().isoformat()})
+    assert "Выполнено 1 из 2" in _text(client_httpx.get("/team"))
+
+    # Личные привычки участника на странице команды не показываются
+    habit_id = client_httpx.post(f"/users/{member_id}/habits", json={"name": "Своя", "description": ""}).json()["id"]
+    client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": member_id,
+                                          "date": date.today().isoformat()})
+    assert "Своя" not in client_httpx.get("/team").text
+
+    # На странице привычек — и личные, и общие привычки
+    habits = client_httpx.get("/habits")
+    assert "Своя" in habits.text and "Пробежка" in habits.text
+    assert "Выполнение: <strong>3%</strong>" in habits.text
+
+
+def test_dashboard_sees_teammates_checkins_on_shared_habits(client_httpx, make_user, db_engine):
+    owner_id = make_user("page-streak-owner@example.com", "Анна")
+    member_id = make_user("page-streak-member@example.com", "Пётр")
+    team_id = client_httpx.post(f"/users/{owner_id}/teams", json={"name": "Стрики"}).json()["id"]
+    for user_id in (owner_id, member_id):
+        assert client_httpx.post(f"/users/{user_id}/join/{team_id}").status_code == 200
+    shared_id = uuid.uuid4()
+
+    async def add_shared_habit():
+        async with AsyncSession(db_engine) as db:
+            await db.execute(insert(Habit).values(id=shared_id, name="Зарядка", description="",
+                                                  user_id=uuid.UUID(owner_id), team_id=uuid.UUID(team_id)))
+            await db.commit()
+
+    asyncio.run(add_shared_habit())
+    assert "Стрик: <strong>0</strong>" in client_httpx.get("/dashboard", params={"user_id": owner_id}).text
+
+    # Отмечается другой участник — блок привычек владельца тоже пересобирается
+    client_httpx.post("/trackings", json={"habit_id": str(shared_id), "user_id": member_id,
+                                          "date": date.today().isoformat()})
+    assert "Стрик: <strong>1</strong>" in client_httpx.get("/dashboard", params={"user_id": owner_id}).text
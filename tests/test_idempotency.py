@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.services import idempotency
+from app.services.cache import MemoryCacheBackend
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    monkeypatch.setattr(idempotency.store, "backend", MemoryCacheBackend(1000))
+
+
+def test_user_replay_returns_stored_response_without_queries(client_httpx, sql_queries):
+    payload = {"email": "idem@example.com", "name": "Idem"}
+    headers = {"Idempotency-Key": "create-user-1"}
+    first = client_httpx.post("/users/", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+
+    sql_queries.clear()
+    replay = client_httpx.post("/users/", json=payload, headers=headers)
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert sql_queries == []
+
+
+def test_same_key_with_different_body_is_rejected(client_httpx, make_user):
+    user_id = make_user("idem2@example.com")
+    headers = {"Idempotency-Key": "create-habit-2"}
+    assert client_httpx.post(f"/users/{user_id}/habits", json={"name": "A", "description": ""},
+                             headers=headers).status_code == 200
+    response = client_httpx.post(f"/users/{user_id}/habits", json={"name": "B", "description": ""},
+                                 headers=headers)
+    assert response.status_code == 422
+
+
+def test_anonymous_callers_do_not_share_keys(client_httpx):
+    headers = {"Idempotency-Key": "anonymous-key"}
+    first = client_httpx.post("/users/", json={"email": "idem-anon-1@example.com", "name": "A"}, headers=headers)
+    # Другой анонимный клиент с тем же ключом не получает чужой ответ и не упирается в 422
+    second = client_httpx.post("/users/", json={"email": "idem-anon-2@example.com", "name": "B"}, headers=headers)
+    assert second.status_code == 200
+    assert "idempotent-replayed" not in second.headers
+    assert second.json()["id"] != first.json()["id"]
+
+
+def test_habit_replay_does_not_duplicate(client_httpx, make_user):
+    user_id = make_user("idem-habit@example.com")
+    headers = {"Idempotency-Key": "create-habit"}
+    body = {"name": "Бег", "description": ""}
+    first = client_httpx.post(f"/users/{user_id}/habits", json=body, headers=headers)
+    replay = client_httpx.post(f"/users/{user_id}/habits", json=body, headers=headers)
+    assert replay.json()["id"] == first.json()["id"]
+    assert len(client_httpx.get(f"/users/{user_id}/habits").json()) == 1
+
+
+def test_tracking_retry_gets_original_success(client_httpx, make_user, make_habit):
+    user_id = make_user("idem-tracking@example.com")
+    habit_id = make_habit(user_id)
+    body = {"habit_id": habit_id, "user_id": user_id, "date": "2024-03-01"}
+    first = client_httpx.post("/trackings", json=body, headers={"Idempotency-Key": "check-in"})
+    assert first.status_code == 200
+    # Без ключа повтор упирается в уже существующую отметку
+    assert client_httpx.post("/trackings", json=body).status_code == 400
+    replay = client_httpx.post("/trackings", json=body, headers={"Idempotency-Key": "check-in"})
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_request_in_progress_is_409(client_httpx):
+    body = b'{"email": "idem4@example.com", "name": "A"}'
+    assert await idempotency.store.begin(f"idempotency:anonymous:{idempotency.fingerprint(body)}:POST:/users/:in-flight",
+                                         idempotency.fingerprint(body)) is None
+    response = client_httpx.post("/users/", content=body,
+                                 headers={"Idempotency-Key": "in-flight", "Content-Type": "application/json"})
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_in_flight_marker_is_kept_while_request_runs(monkeypatch):
+    monkeypatch.setattr(idempotency, "IN_FLIGHT_TTL", 0.2)
+    monkeypatch.setattr(idempotency, "IN_FLIGHT_REFRESH", 0.05)
+    store = idempotency.store
+    assert await store.begin("slow", "digest") is None
+    async with store.holding("slow", "digest"):
+        # Запрос дольше IN_FLIGHT_TTL: повтор всё ещё видит его выполняющимся
+        await asyncio.sleep(0.5)
+        assert await store.backend.get("slow") == {"fingerprint": "digest", "status": None}
+    await store.finish("slow", "digest", 200, b"{}", {})
+    await asyncio.sleep(0.1)
+    assert (await store.backend.get("slow"))["status"] == 200
+
+
+def test_invalid_key_is_400(client_httpx):
+    response = client_httpx.post("/users/", json={"email": "idem5@example.com", "name": "A"},
+                                 headers={"Idempotency-Key": "x" * 256})
+    assert response.status_code == 400
+
+
+def test_keys_are_scoped_to_the_caller(client_httpx, make_user, make_habit):
+    first_user, second_user = make_user("idem-scope-1@example.com"), make_user("idem-scope-2@example.com")
+    headers = {"Idempotency-Key": "same-key"}
+    body = {"name": "Чтение", "description": ""}
+    first = client_httpx.post(f"/users/{first_user}/habits", json=body, headers=headers)
+    # Тот же ключ у другого пользователя — отдельный запрос, а не чужой сохранённый ответ
+    second = client_httpx.post(f"/users/{second_user}/habits", json=body, headers=headers)
+    assert "idempotent-replayed" not in second.headers
+    assert second.json()["user_id"] == second_user != first.json()["user_id"]
+
+    # Для /trackings пользователь берётся из тела
+    day = {"date": "2024-04-01"}
+    for user_id in (first_user, second_user):
+        response = client_httpx.post("/trackings", headers={"Idempotency-Key": "check-in-scope"},
+                                     json={"habit_id": make_habit(user_id), "user_id": user_id, **day})
+        assert response.status_code == 200
+        assert "idempotent-replayed" not in response.headers
+
+
+def test_tokens_do_not_share_keys(client_httpx):
+    def post(token, email):
+        return client_httpx.post("/users/", json={"email": email, "name": "Token"},
+                                 headers={"Idempotency-Key": "token-key", "Authorization": f"Bearer {token}"})
+
+    assert post("first", "idem-token-1@example.com").status_code == 200
+    # С общим ключом второй запрос получил бы 422 (другое тело)
+    assert post("second", "idem-token-2@example.com").status_code == 200
+    assert post("first", "idem-token-1@example.com").headers["idempotent-replayed"] == "true"
@@ -0,0 +1,153 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.job import Job
+from app.services import jobs
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return async_sessionmaker(db_engine, expire_on_commit=False)
+
+
+def test_retries_until_success(session_factory, monkeypatch):
+    calls = []
+
+    async def flaky(db, payload):
+        calls.append(payload["n"])
+        if len(calls) < 3:
+            raise RuntimeError("temporary")
+
+    monkeypatch.setitem(jobs.HANDLERS, "test.flaky", flaky)
+    monkeypatch.setattr(jobs, "RETRY_BASE_SECONDS", 0)
+
+    async def scenario():
+        async with session_factory() as db:
+            assert await jobs.enqueue(db, "test.flaky", {"n": 1}, key="flaky-1")
+            # Тот же ключ идемпотентности — вторая постановка игнорируется
+            assert not await jobs.enqueue(db, "test.flaky", {"n": 2}, key="flaky-1")
+            await db.commit()
+        ran = await jobs.JobWorker(concurrency=2, poll_interval=0).drain(session_factory)
+        async with session_factory() as db:
+            job = await db.scalar(select(Job).where(Job.idempotency_key == "flaky-1"))
+        return ran, job
+
+    ran, job = asyncio.run(scenario())
+    assert calls == [1, 1, 1]
+    assert ran >= 3
+    assert (job.status, job.attempts, job.last_error) == ("done", 3, None)
+
+
+def test_gives_up_after_max_attempts(session_factory, monkeypatch):
+    async def broken(db, payload):
+        raise ValueError("broken")
+
+    monkeypatch.setitem(jobs.HANDLERS, "test.broken", broken)
+    monkeypatch.setattr(jobs, "RETRY_BASE_SECONDS", 0)
+
+    async def scenario():
+        async with session_factory() as db:
+            await jobs.enqueue(db, "test.broken", key="broken-1", max_attempts=2)
+            await db.commit()
+        await jobs.JobWorker(concurrency=1, poll_interval=0).drain(session_factory)
+        async with session_factory() as db:
+            return await db.scalar(select(Job).where(Job.idempotency_key == "broken-1"))
+
+    job = asyncio.run(scenario())
+    assert (job.status, job.attempts) == ("failed", 2)
+    assert "broken" in job.last_error
+
+
+def test_expired_last_attempt_is_marked_failed(session_factory):
+    async def scenario():
+        stale = datetime.utcnow() - timedelta(hours=1)
+        async with session_factory() as db:
+            # Воркер взял последнюю попытку и умер: статус running, аренда истекла
+            db.add(Job(id=uuid.uuid4(), kind="test.orphan", payload={}, status="running", attempts=3,
+                       max_attempts=3, run_at=stale, locked_until=stale, idempotency_key="orphan-1",
+                       created_at=stale))
+            await db.commit()
+            claimed = await jobs.claim(db, 10)
+            job = await db.scalar(select(Job).where(Job.idempotency_key == "orphan-1"))
+        return claimed, job
+
+    claimed, job = asyncio.run(scenario())
+    assert "test.orphan" not in {c.kind for c in claimed}
+    assert (job.status, job.locked_until) == ("failed", None)
+    assert job.finished_at is not None
+
+
+def test_long_handler_extends_lease(session_factory, monkeypatch):
+    leases = []
+
+    async def long_running(db, payload):
+        job = jobs._current_job.get()
+        await db.execute(update(Job).where(Job.id == job["id"]).values(locked_until=datetime(2000, 1, 1)))
+        # Как будто с прошлого продления прошла треть аренды
+        job["renewed"] = 0
+        await jobs.extend_lease(db)
+        await db.commit()
+        leases.append(await db.scalar(select(Job.locked_until).where(Job.id == job["id"])))
+
+    monkeypatch.setitem(jobs.HANDLERS, "test.long", long_running)
+
+    async def scenario():
+        async with session_factory() as db:
+            await jobs.enqueue(db, "test.long", key="long-1")
+            await db.commit()
+        await jobs.JobWorker(concurrency=1, poll_interval=0).drain(session_factory)
+
+    asyncio.run(scenario())
+    assert leases[0] > datetime.utcnow()
+
+
+def test_daily_jobs_scheduled_once(session_factory):
+    now = datetime(2031, 5, 4, 23, 0)
+
+    async def scenario():
+        async with session_factory() as db:
+            first = await jobs.JobWorker(1, 0).schedule_daily(db, now)
+            # Другой воркер (или рестарт) в тот же день ничего не добавляет
+            second = await jobs.JobWorker(1, 0).schedule_daily(db, now)
+            count = await db.scalar(
+                select(func.count()).select_from(Job).where(Job.idempotency_key.like("%2031-05-04"))
+            )
+        return first, second, count
+
+    first, second, count = asyncio.run(scenario())
+    assert sorted(first) == ["daily_rollup:2031-05-04", "reminders:2031-05-04"]
+    assert second == []
+    assert count == 2
+
+
+def test_reminders_skip_checked_in_users(client_httpx, make_user, make_habit, session_factory, monkeypatch):
+    today = date.today()
+    idle = make_user("idle@example.com")
+    make_habit(idle)
+    busy = make_user("busy@example.com")
+    habit = make_habit(busy)
+    client_httpx.post("/trackings", json={"habit_id": habit, "user_id": busy, "date": today.isoformat()})
+    make_user("no-habits@example.com")
+
+    reminded = []
+
+    async def capture(users, day):
+        reminded.extend(user.email for user in users)
+
+    monkeypatch.setattr(jobs, "send_reminders", capture)
+    monkeypatch.setattr(jobs, "REMINDER_CHUNK_SIZE", 1)
+
+    async def scenario():
+        async with session_factory() as db:
+            await jobs.remind_missing_checkins(db, {"date": today.isoformat()})
+
+    asyncio.run(scenario())
+    assert "idle@example.com" in reminded
+    assert "busy@example.com" not in reminded
+    assert "no-habits@example.com" not in reminded
+    assert len(reminded) == len(set(reminded))
@@ -0,0 +1,111 @@
+import time
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job
+from app.models.team_stats import TeamMemberStats
+from app.models.user import User
+from app.services import leaderboard
+from app.services.leaderboard import LeaderboardScheduler, _streak, scheduler
+
+TODAY = date.today()
+
+
+def test_streak():
+    days = [TODAY - timedelta(days=d) for d in (0, 1, 2, 4)]
+    assert _streak(days, TODAY) == 3
+    assert _streak(days[1:], TODAY) == 2
+    assert _streak(days[3:], TODAY) == 0
+    assert _streak([], TODAY) == 0
+
+
+@pytest.mark.asyncio
+async def test_team_leaderboard(client_httpx, make_user, make_habit, db_engine, monkeypatch):
+    # Строки участников пишутся несколькими INSERT
+    monkeypatch.setattr(leaderboard, "MEMBER_INSERT_BATCH", 1)
+    alice = make_user("alice@example.com", "Alice")
+    bob = make_user("bob@example.com", "Bob")
+    team_id = client_httpx.post(f"/users/{alice}/teams", json={"name": "ЗОЖ-группа"}).json()["id"]
+    for user_id in (alice, bob):
+        assert client_httpx.post(f"/users/{user_id}/join/{team_id}").status_code == 200
+    habits = {alice: make_habit(alice, "Зарядка"), bob: make_habit(bob, "Без сахара")}
+
+    def track(user_id, day):
+        response = client_httpx.post("/trackings", json={"habit_id": habits[user_id], "user_id": user_id,
+                                                         "date": str(day)})
+        assert response.status_code == 200
+
+    track(alice, TODAY - timedelta(days=1))
+    track(alice, TODAY)
+    track(bob, TODAY)
+
+    board = client_httpx.get(f"/teams/{team_id}/leaderboard").json()
+    assert board["members_count"] == 2
+    assert {m["name"]: m["streak"] for m in board["members"]} == {"Alice": 2, "Bob": 1}
+    assert board["streak"] == 1
+    assert board["completion_percent"] == 100
+
+    # Новая отметка видна после фонового пересчёта помеченных команд
+    track(bob, TODAY - timedelta(days=1))
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        assert await scheduler.flush(db) >= 1
+    assert client_httpx.get(f"/teams/{team_id}/leaderboard").json()["streak"] == 2
+
+
+def test_leaderboard_unknown_team(client_httpx):
+    assert client_httpx.get("/teams/00000000-0000-0000-0000-000000000000/leaderboard").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_full_refresh_is_queued_once_per_interval(db_engine):
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        workers = [LeaderboardScheduler(full_interval=10 ** 9) for _ in range(3)]
+        key = f"leaderboard_refresh:{int(time.time() // 10 ** 9)}"
+        # Каждый воркер просит полный пересчёт, в очередь попадает одна задача
+        created = [await worker.request_full_refresh(db) for worker in workers]
+        count = await db.scalar(select(func.count()).select_from(Job).where(Job.kind == "leaderboard_refresh",
+                                                                           Job.idempotency_key == key))
+    assert created.count(True) == 1
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_upserts_members_and_drops_leavers(client_httpx, make_user, db_engine):
+    owner, leaver = make_user("upsert-owner@example.com", "Owner"), make_user("upsert-leaver@example.com", "Leaver")
+    team_id = client_httpx.post(f"/users/{owner}/teams", json={"name": "Повторы"}).json()["id"]
+    for user_id in (owner, leaver):
+        client_httpx.post(f"/users/{user_id}/join/{team_id}")
+    team = uuid.UUID(team_id)
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        # Повторный пересчёт уже посчитанной команды обновляет строки, а не конфликтует с ними
+        await leaderboard.refresh_teams(db, [team])
+        await leaderboard.refresh_teams(db, [team, uuid.uuid4()])
+        await db.commit()
+    assert client_httpx.get(f"/teams/{team_id}/leaderboard").json()["members_count"] == 2
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        await db.execute(update(User).where(User.id == uuid.UUID(leaver)).values(team_id=None))
+        await leaderboard.refresh_teams(db, [team])
+        await db.commit()
+        names = set(await db.scalars(select(TeamMemberStats.name).where(TeamMemberStats.team_id == team)))
+    assert names == {"Owner"}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_dirty_marks(db_engine, monkeypatch):
+    async def fail(db, team_ids, today=None):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(leaderboard, "refresh_teams", fail)
+    worker = LeaderboardScheduler()
+    team_id = uuid.uuid4()
+    worker.mark_team(team_id)
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        with pytest.raises(RuntimeError):
+            await worker.flush(db)
+    assert worker._dirty_teams == {team_id}
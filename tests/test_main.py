@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+from app.config import settings
+from app.main import create_app
+
+
+def test_spa_build_is_served_after_routes(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<div id=root></div>")
+    (tmp_path / "app.js").write_text("console.log(1)")
+    monkeypatch.setattr(settings, "FRONTEND_BUILD_DIR", str(tmp_path))
+    client = TestClient(create_app())
+
+    assert client.get("/app.js").text == "console.log(1)"
+    # Неизвестный путь — маршрут SPA, отдаётся index.html
+    assert client.get("/settings/profile").text == "<div id=root></div>"
+    # Маршруты приложения не перекрываются статикой
+    assert client.get("/system/pool").headers["content-type"] == "application/json"
+
+
+def test_cors_middleware_is_installed(monkeypatch):
+    monkeypatch.setattr(settings, "CORS_ORIGINS", ["http://localhost:3000"])
+    response = TestClient(create_app()).options("/system/pool", headers={
+        "Origin": "http://localhost:3000", "Access-Control-Request-Method": "GET",
+    })
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_launcher_requires_shared_cache_for_several_workers(monkeypatch):
+    started = []
+    monkeypatch.setattr(main.uvicorn, "run", lambda *args, **kwargs: started.append(kwargs["workers"]))
+    monkeypatch.setattr(settings, "CACHE_URL", None)
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_ENABLED", True)
+    with pytest.raises(SystemExit):
+        main.main(["--workers", "2"])
+    # Ключам идемпотентности общее хранилище нужно и без кэша ответов
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    with pytest.raises(SystemExit):
+        main.main(["--workers", "2"])
+    main.main(["--workers", "1"])
+    monkeypatch.setattr(settings, "CACHE_URL", "redis://localhost:6379/0")
+    main.main(["--workers", "2"])
+    assert started == [1, 2]
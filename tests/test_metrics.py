@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import uuid
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import QueryStats, collect_query_stats
+from app.metrics import instrument_requests, registry
+from app.models.user import User
+from app.services.cache import response_cache
+
+
+def test_server_timing_and_metrics(client_httpx, make_user, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", False)
+    user_id = make_user("metrics@example.com")
+
+    response = client_httpx.get(f"/users/{user_id}/habits")
+    timing = response.headers["server-timing"]
+    assert 'desc="1 queries"' in timing
+    assert "total;dur=" in timing and "pool;dur=" in timing
+
+    text = client_httpx.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/users/{user_id}/habits",status="200"}' in text
+    assert 'db_queries_total{method="GET",route="/users/{user_id}/habits"}' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}/habits",le="+Inf"}' in text
+    assert 'db_pool_connections{engine="primary",state="size"}' in text
+    # Фактический путь с id не становится отдельной серией
+    assert user_id not in text
+
+
+def test_statement_shape_ignores_parameters():
+    stats = QueryStats()
+    stats.record("SELECT * FROM users WHERE id IN (?, ?, ?)", 0.001)
+    stats.record("SELECT *\n  FROM users WHERE id IN (?)", 0.001)
+    stats.record("SELECT * FROM users WHERE id IN ($1, $2)", 0.001)
+    assert stats.count == 3
+    assert stats.repeated(3) == [("SELECT * FROM users WHERE id IN (?)", 3)]
+    assert stats.repeated(4) == []
+
+
+def test_n_plus_one_warning(db_engine, caplog):
+    async def lookup_one_by_one():
+        async with AsyncSession(db_engine) as db:
+            for _ in range(5):
+                await db.scalar(select(User).where(User.id == uuid.uuid4()))
+
+    async def call_next(request):
+        await lookup_one_by_one()
+        return Response()
+
+    class FakeRequest:
+        method = "GET"
+        scope = {}
+
+    registry.clear()
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        response = asyncio.run(instrument_requests(FakeRequest(), call_next))
+    assert 'desc="5 queries"' in response.headers["server-timing"]
+    assert "Possible N+1" in caplog.text
+    assert registry.routes["GET", "<unmatched>"].n_plus_one == 1
@@ -0,0 +1,33 @@
+import json
+
+
+def test_users_keyset_pages(client_httpx):
+    created = set()
+    for i in range(5):
+        response = client_httpx.post("/users/", json={"email": f"page{i}@example.com", "name": f"Page {i}"})
+        created.add(response.json()["id"])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        response = client_httpx.get("/users/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(u["id"] for u in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert created <= set(seen)
+
+    streamed = client_httpx.get("/users/", params={"stream": "true"})
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == seen
+
+
+def test_invalid_cursor(client_httpx):
+    assert client_httpx.get("/teams", params={"cursor": "garbage"}).status_code == 400
+    assert client_httpx.get("/teams", params={"limit": 100_000}).status_code == 422
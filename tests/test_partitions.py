@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
+
+from app.models.tracking import Tracking
+from app.services.partitions import (
+    add_months, archive_partitions, create_partition, ensure_partitions, initial_partitions_ddl, list_partitions,
+    months_between, partition_month, partition_name,
+)
+
+
+def test_month_arithmetic():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert months_between(date(2026, 11, 15), date(2027, 1, 1)) == [
+        date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1),
+    ]
+
+
+def test_partition_names_round_trip():
+    assert partition_name(date(2026, 3, 1)) == "tracking_y2026m03"
+    assert partition_month("tracking_y2026m03") == date(2026, 3, 1)
+    assert partition_month("tracking_default") is None
+
+
+def test_postgres_ddl_is_partitioned():
+    ddl = str(CreateTable(Tracking.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (date)" in ddl
+    # Ключ секционирования должен входить в первичный ключ
+    assert "PRIMARY KEY (id, date)" in ddl
+
+
+@pytest.mark.asyncio
+async def test_maintenance_is_noop_without_postgres(db_engine):
+    async with AsyncSession(db_engine) as db:
+        assert await ensure_partitions(db) == []
+        assert await archive_partitions(db, older_than=12) == []
+
+
+def test_fresh_schema_gets_initial_partitions():
+    ddl = initial_partitions_ddl(date(2026, 12, 5))
+    assert ddl[0] == "CREATE TABLE tracking_default PARTITION OF tracking DEFAULT"
+    assert "tracking_y2026m12" in ddl[1] and "tracking_y2027m01" in ddl[2]
+    assert "FROM ('2027-01-01') TO ('2027-02-01')" in ddl[2]
+
+
+@pytest.mark.asyncio
+async def test_rows_move_from_default_to_new_partition(db_engine, client_httpx, make_user, make_habit):
+    if db_engine.dialect.name != "postgresql":
+        pytest.skip("partitioning needs Postgres (TEST_DATABASE_URL)")
+    user_id = make_user("partitions@example.com")
+    habit_id = make_habit(user_id)
+    # Секции для 2001 года нет — отметка уходит в секцию по умолчанию
+    assert client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id,
+                                                 "date": "2001-02-03"}).status_code == 200
+    where = text("SELECT tableoid::regclass::text FROM tracking WHERE user_id = :user_id")
+    async with AsyncSession(db_engine) as db:
+        assert await db.scalar(where, {"user_id": user_id}) == "tracking_default"
+        assert await create_partition(db, date(2001, 2, 1)) == "tracking_y2001m02"
+        await db.commit()
+        assert await db.scalar(where, {"user_id": user_id}) == "tracking_y2001m02"
+        assert "tracking_default" in await list_partitions(db)
@@ -0,0 +1,134 @@
+import uuid
+
+import pytest
+
+from app.services.cache import response_cache
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    # Считаем запросы обработчиков, а не попадания в кэш
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+
+def test_create_endpoints_use_single_query(client_httpx, sql_queries):
+    response = client_httpx.post("/users/", json={"email": "counts@example.com", "name": "Counts"})
+    assert response.status_code == 200
+    assert response.json()["created_at"]
+    assert len(sql_queries) == 1
+    user_id = response.json()["id"]
+
+    sql_queries.clear()
+    response = client_httpx.post(f"/users/{user_id}/habits", json={"name": "Бег", "description": ""})
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user_id
+    assert len(sql_queries) == 1
+
+    sql_queries.clear()
+    response = client_httpx.post(f"/users/{user_id}/teams", json={"name": "Counters"})
+    assert response.status_code == 200
+    assert response.json()["owner_id"] == user_id
+    assert len(sql_queries) == 1
+
+
+def test_create_for_unknown_user_is_404_in_one_query(client_httpx, sql_queries):
+    missing = uuid.uuid4()
+    assert client_httpx.post(f"/users/{missing}/habits", json={"name": "x", "description": ""}).status_code == 404
+    assert client_httpx.post(f"/users/{missing}/teams", json={"name": "x"}).status_code == 404
+    assert len(sql_queries) == 2
+
+
+def test_reads_fold_existence_check(client_httpx, make_user, make_habit, sql_queries):
+    user_id = make_user("counts-read@example.com")
+    habit_id = make_habit(user_id)
+    assert client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id,
+                                                 "date": "2024-01-01"}).status_code == 200
+
+    sql_queries.clear()
+    assert len(client_httpx.get(f"/users/{user_id}/habits").json()) == 1
+    assert len(client_httpx.get(f"/habits/{habit_id}/trackings").json()) == 1
+    assert len(sql_queries) == 2
+
+    sql_queries.clear()
+    assert client_httpx.get(f"/users/{make_user('counts-empty@example.com')}/habits").json() == []
+    assert client_httpx.get(f"/users/{uuid.uuid4()}/habits").status_code == 404
+    assert client_httpx.get(f"/habits/{uuid.uuid4()}/trackings").status_code == 404
+
+
+def test_join_team_checks_in_update(client_httpx, make_user, sql_queries):
+    owner_id = make_user("counts-owner@example.com")
+    member_id = make_user("counts-member@example.com")
+    team_id = client_httpx.post(f"/users/{owner_id}/teams", json={"name": "Join"}).json()["id"]
+
+    sql_queries.clear()
+    response = client_httpx.post(f"/users/{member_id}/join/{team_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == team_id
+    assert response.json()["name"] == "Join" and response.json()["owner_id"] == owner_id
+    assert len(sql_queries) == 1
+    assert "EXISTS" in sql_queries[0]
+
+    assert client_httpx.post(f"/users/{member_id}/join/{team_id}").status_code == 400
+    assert client_httpx.post(f"/users/{uuid.uuid4()}/join/{team_id}").status_code == 404
+    assert client_httpx.post(f"/users/{member_id}/join/{uuid.uuid4()}").status_code == 404
+
+
+def test_delete_habit_with_history(client_httpx, make_user, make_habit, sql_queries):
+    user_id = make_user("counts-delete@example.com")
+    habit_id = make_habit(user_id)
+    for day in ("2024-01-01", "2024-01-02"):
+        client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id, "date": day})
+
+    sql_queries.clear()
+    assert client_httpx.delete(f"/users/{user_id}/habits/{habit_id}").status_code == 204
+    assert len(sql_queries) == 3
+    assert client_httpx.get(f"/habits/{habit_id}/trackings").status_code == 404
+    assert client_httpx.delete(f"/users/{user_id}/habits/{habit_id}").status_code == 404
+
+
+def test_list_endpoints_select_only_response_columns(client_httpx, make_user, make_habit, sql_queries):
+    user_id = make_user("counts-lean@example.com")
+    make_habit(user_id)
+
+    sql_queries.clear()
+    habits = client_httpx.get(f"/users/{user_id}/habits").json()
+    assert set(habits[0]) == {"id", "name", "description", "user_id"}
+    # Habit.team больше не подтягивается JOIN'ом в каждый запрос привычек
+    assert "teams" not in sql_queries[0]
+    assert "created_at" not in sql_queries[0].split("FROM")[0]
+
+
+def test_team_overview_query_count_is_constant(client_httpx, make_user, make_habit, sql_queries):
+    owner_id = make_user("overview-owner@example.com")
+    team_id = client_httpx.post(f"/users/{owner_id}/teams", json={"name": "Overview"}).json()["id"]
+
+    def add_member(n):
+        user_id = make_user(f"overview-{n}@example.com", name=f"Member {n}")
+        client_httpx.post(f"/users/{user_id}/join/{team_id}")
+        for name in ("Бег", "Чтение"):
+            habit_id = make_habit(user_id, name)
+            for day in ("2025-03-01", "2025-03-02", "2025-02-01"):
+                client_httpx.post("/trackings", json={"habit_id": habit_id, "user_id": user_id, "date": day})
+
+    counts, size = [], 0
+    for grow_to in (1, 5):
+        while size < grow_to:
+            add_member(size)
+            size += 1
+        sql_queries.clear()
+        response = client_httpx.get(f"/teams/{team_id}/overview", params={"start": "2025-03-01", "end": "2025-03-07"})
+        assert response.status_code == 200
+        counts.append(len(sql_queries))
+        data = response.json()
+        assert len(data["members"]) == size
+        assert len(data["habits"]) == 2 * size
+        # Отметка за февраль вне окна
+        assert all([t["date"] for t in h["trackings"]] == ["2025-03-01", "2025-03-02"] for h in data["habits"])
+
+    assert counts == [4, 4]
+
+
+def test_team_overview_validates_window(client_httpx):
+    assert client_httpx.get(f"/teams/{uuid.uuid4()}/overview").status_code == 404
+    response = client_httpx.get(f"/teams/{uuid.uuid4()}/overview", params={"start": "2025-01-01", "end": "2025-12-31"})
+    assert response.status_code == 400
@@ -0,0 +1,80 @@
+import re
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text, tuple_
+
+from app.models import Habit, Team, Tracking, User
+from app.services import partitions
+
+USER_ID = uuid.uuid4()
+HABIT_ID = uuid.uuid4()
+TEAM_ID = uuid.uuid4()
+MONTH = partitions.month_start(date.today())
+
+
+def tracking_index(columns: str) -> str:
+    # В Postgres tracking секционирована: план читает индексы секций,
+    # которые Postgres называет по секции (tracking_y2026m10_user_id_date_idx)
+    return rf"ix_tracking_{columns}|tracking_(y\d{{4}}m\d{{2}}|default)_{columns}_idx"
+
+
+# Запрос -> индекс (регулярное выражение), который обязан использовать план
+QUERIES = [
+    (select(Tracking).where(Tracking.user_id == USER_ID,
+                            Tracking.date.between(MONTH, partitions.add_months(MONTH, 1))),
+     "ix_tracking_user_id_date", tracking_index("user_id_date")),
+    (select(Tracking).where(Tracking.habit_id == HABIT_ID, Tracking.date >= MONTH),
+     "ix_tracking_habit_id_date", tracking_index("habit_id_date")),
+    (select(Habit).where(Habit.user_id == USER_ID), "ix_habits_user_id", None),
+    (select(Habit).where(Habit.team_id == TEAM_ID), "ix_habits_team_id", None),
+    (select(User).where(User.team_id == TEAM_ID), "ix_users_team_id", None),
+    (select(User).where(tuple_(User.created_at, User.id) > tuple_(date(2025, 1, 1), USER_ID))
+     .order_by(User.created_at, User.id).limit(100), "ix_users_created_at_id", None),
+    (select(Team).order_by(Team.created_at, Team.id).limit(100), "ix_teams_created_at_id", None),
+]
+
+
+async def explain(conn, stmt) -> list[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "sqlite":
+        rows = await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return [row.detail for row in rows]
+    # На почти пустых таблицах Postgres всё равно выберет seq scan, поэтому запрещаем его
+    await conn.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = await conn.execute(text(f"EXPLAIN {compiled}"))
+    return [row[0] for row in rows]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stmt, index, pattern", QUERIES, ids=[index for _, index, _ in QUERIES])
+async def test_query_uses_index(db_engine, stmt, index, pattern):
+    async with db_engine.begin() as conn:
+        plan = await explain(conn, stmt)
+
+    plan_text = "\n".join(plan)
+    used = re.findall(r"(?:USING (?:COVERING )?INDEX|using) (\w+)", plan_text)
+    assert used, plan_text
+    assert all(re.fullmatch(pattern or re.escape(index), name) for name in used), plan_text
+    assert "Seq Scan" not in plan_text
+    assert not any(line.startswith("SCAN") and "USING" not in line for line in plan), plan_text
+
+
+@pytest.mark.asyncio
+async def test_tracking_plans_use_index_conditions_on_partitions(db_engine):
+    if db_engine.dialect.name != "postgresql":
+        pytest.skip("секционирование есть только в Postgres")
+    async with db_engine.begin() as conn:
+        kind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('tracking')"))
+        plan_text = "\n".join(await explain(conn, QUERIES[0][0]))
+
+    assert kind == "p"
+    # Условие по дате отсекает чужие месяцы, а поиск по пользователю идёт индексом секции
+    assert partitions.partition_name(MONTH) in plan_text, plan_text
+    assert "tracking_default" not in plan_text, plan_text
+    assert re.search(r"Index Cond: \(\(user_id = .*date >=", plan_text), plan_text
+
+
+def test_users_id_not_double_indexed():
+    assert "ix_users_id" not in {index.name for index in User.__table__.indexes}
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.config import settings
+from app.database import Base, get_db, get_read_db
+from app.main import app
+from app.services.cache import response_cache
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path, monkeypatch):
+    # Две независимые SQLite-базы: репликация не настроена, поэтому реплика «отстаёт» навсегда
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}", poolclass=NullPool)
+               for name in ("primary.db", "replica.db")]
+
+    async def create_schema():
+        for engine in engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    primary, replica = (async_sessionmaker(bind=e, class_=AsyncSession, expire_on_commit=False) for e in engines)
+    monkeypatch.setattr(database, "AsyncSessionLocal", primary)
+    monkeypatch.setattr(database, "ReadSessionLocal", replica)
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+    # Тест проверяет, какая база отвечает, — кэш ответов здесь мешает
+    monkeypatch.setattr(response_cache, "enabled", False)
+    yield
+    for engine in engines:
+        asyncio.run(engine.dispose())
+
+
+def test_reads_go_to_replica_unless_client_just_wrote(primary_and_replica, client_httpx, monkeypatch):
+    response = client_httpx.post("/users/", json={"email": "replica@example.com", "name": "Replica"})
+    assert response.status_code == 200
+    user_id = response.json()["id"]
+
+    # Сразу после записи клиент читает свою запись из основной БД
+    assert any(u["id"] == user_id for u in client_httpx.get("/users/").json())
+    response = client_httpx.post(f"/users/{user_id}/habits", json={"name": "Реплика", "description": ""})
+    assert response.status_code == 200
+
+    # Другой клиент без cookie попадает на реплику, где пользователя ещё нет
+    client_httpx.cookies.clear()
+    assert client_httpx.get("/users/").json() == []
+    # ...но запросы в разрезе пользователя, который только что писал, тоже идут в основную БД
+    assert len(client_httpx.get(f"/users/{user_id}/habits").json()) == 1
+
+    # По истечении окна read-your-writes всё чтение уходит на реплику
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    assert client_httpx.get(f"/users/{user_id}/habits").status_code == 404
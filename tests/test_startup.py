@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Бюджет на импорт app.main (cumulative из -X importtime); переопределяется для медленных машин
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 2500))
+# Тяжёлые зависимости, которые грузятся при первом использовании, а не при импорте
+LAZY_MODULES = ("jinja2", "jwt", "cryptography", "numpy", "asyncpg", "aiosqlite", "httpx")
+
+
+def import_app(tmp_path, code: str = "") -> subprocess.CompletedProcess:
+    # Чистое окружение и каталог без .env: настройки должны обойтись значениями по умолчанию
+    env = {key: value for key, value in os.environ.items() if not key.startswith("DB_") and key != "DATABASE_URL"}
+    env["PYTHONPATH"] = str(ROOT)
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", f"import app.main\n{code}"],
+                          cwd=tmp_path, env=env, capture_output=True, text=True)
+
+
+def test_import_without_env_file(tmp_path):
+    result = import_app(tmp_path, f"import sys; print([m for m in {LAZY_MODULES!r} if m in sys.modules])")
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == "[]"
+
+
+def test_unconfigured_database_fails_on_first_use(tmp_path):
+    result = import_app(tmp_path, "from app.database import get_sessionmaker; get_sessionmaker()")
+    assert result.returncode != 0
+    assert "RuntimeError: Database is not configured: set DATABASE_URL" in result.stderr
+
+
+def test_import_time_budget(tmp_path):
+    result = import_app(tmp_path)
+    assert result.returncode == 0, result.stderr[-2000:]
+    cumulative = next(int(line.split("|")[1]) for line in result.stderr.splitlines()
+                      if line.startswith("import time:") and line.rstrip().endswith("| app.main"))
+    assert cumulative / 1000 < IMPORT_BUDGET_MS, f"import app.main took {cumulative / 1000:.0f} ms"
@@ -0,0 +1,115 @@
+import asyncio
+import random
+import uuid
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.main import app
+from app.models.habit import Habit
+from app.models.habit_stats import HabitStats
+from app.models.tracking import Tracking
+from app.services.stats import _apply_completion, compute_stats, snapshot
+
+TODAY = date.today()
+
+
+def test_incremental_matches_rebuild():
+    rng = random.Random(7)
+    days = sorted(TODAY - timedelta(days=d) for d in rng.sample(range(120), 60))
+    stats = HabitStats(current_streak=0, longest_streak=0, total_completed=0, recent_days=0)
+    for day in days:
+        assert _apply_completion(stats, day)
+
+    expected = compute_stats(days)
+    assert {key: getattr(stats, key) for key in expected} == expected
+
+
+def test_backfill_requires_rebuild():
+    stats = HabitStats(**compute_stats([TODAY - timedelta(days=2), TODAY]))
+    assert _apply_completion(stats, TODAY)
+    assert not _apply_completion(stats, TODAY - timedelta(days=1))
+
+
+def test_snapshot_windows():
+    days = [TODAY - timedelta(days=d) for d in (40, 20, 6, 2, 1)]
+    stats = HabitStats(**compute_stats(days))
+    result = snapshot(stats, today=TODAY)
+    assert (result["current_streak"], result["longest_streak"]) == (2, 2)
+    assert (result["completed_7d"], result["completed_30d"]) == (3, 4)
+
+    # Через неделю без отметок стрик обнулён, а окна сдвинулись
+    later = snapshot(stats, today=TODAY + timedelta(days=7))
+    assert later["current_streak"] == 0
+    assert (later["completed_7d"], later["completed_30d"]) == (0, 4)
+
+
+def test_stats_api(client_httpx, make_user, make_habit):
+    user_id = make_user("stats@example.com")
+    habit_id = make_habit(user_id)
+
+    tracking_ids = []
+    for offset in (3, 2, 1, 0):
+        response = client_httpx.post("/trackings", json={
+            "habit_id": habit_id, "user_id": user_id, "date": str(TODAY - timedelta(days=offset)),
+        })
+        tracking_ids.append(response.json()["id"])
+
+    stats = client_httpx.get(f"/habits/{habit_id}/stats").json()
+    assert (stats["current_streak"], stats["longest_streak"], stats["completed_7d"]) == (4, 4, 4)
+
+    assert client_httpx.delete(f"/trackings/{tracking_ids[1]}").status_code == 204
+    stats = client_httpx.get(f"/habits/{habit_id}/stats").json()
+    assert (stats["current_streak"], stats["longest_streak"], stats["total_completed"]) == (2, 2, 3)
+
+    # Офлайн-бэклог задним числом закрывает дыру
+    client_httpx.post("/trackings/batch", json=[
+        {"habit_id": habit_id, "user_id": user_id, "date": str(TODAY - timedelta(days=2))},
+    ])
+    user_stats = client_httpx.get(f"/users/{user_id}/stats").json()
+    assert [s["current_streak"] for s in user_stats] == [4]
+
+    page = client_httpx.get(f"/habit/{habit_id}")
+    assert page.status_code == 200
+    assert "Лучший стрик" in page.text
+
+
+def test_concurrent_checkins_keep_stats_consistent(make_user, make_habit, db_engine):
+    user_id = make_user("stats-race@example.com")
+    habit_id = make_habit(user_id)
+    habit_uuid = uuid.UUID(habit_id)
+
+    async def scenario():
+        async def current():
+            async with AsyncSession(db_engine) as db:
+                days = sorted(await db.scalars(select(Tracking.date).where(Tracking.habit_id == habit_uuid)))
+                stats = await db.scalar(select(HabitStats).where(HabitStats.habit_id == habit_uuid))
+            return days, stats
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def check_in(offset):
+                response = await client.post("/trackings", json={
+                    "habit_id": habit_id, "user_id": user_id, "date": str(TODAY - timedelta(days=offset)),
+                })
+                assert response.status_code == 200
+
+            # Первые отметки, затем задним числом (пересчёт), затем новые дни (инкремент)
+            for offsets in ((5, 3), (4, 6), (2, 1)):
+                async with AsyncSession(db_engine) as holder:
+                    # На Postgres держим блокировку привычки, чтобы обе отметки встали в очередь
+                    # за ней и читали агрегаты уже после ожидания
+                    await holder.execute(
+                        select(Habit.id).where(Habit.id == habit_uuid).with_for_update(key_share=True)
+                    )
+                    tasks = [asyncio.create_task(check_in(offset)) for offset in offsets]
+                    await asyncio.sleep(0.2)
+                    await holder.commit()
+                await asyncio.gather(*tasks)
+                days, stats = await current()
+                expected = compute_stats(days)
+                assert {key: getattr(stats, key) for key in expected} == expected
+        return days
+
+    assert len(asyncio.run(scenario())) == 6
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+
+from app.main import app
+
+
+def test_batch_trackings(client_httpx, make_user, make_habit):
+    user_id = make_user("batch@example.com")
+    habit_id = make_habit(user_id)
+    stranger_id = make_user("stranger@example.com")
+
+    items = [
+        {"habit_id": habit_id, "user_id": user_id, "date": "2025-04-01"},
+        {"habit_id": habit_id, "user_id": user_id, "date": "2025-04-02"},
+        {"habit_id": habit_id, "user_id": user_id, "date": "2025-04-01"},
+        {"habit_id": habit_id, "user_id": stranger_id, "date": "2025-04-01"},
+        {"habit_id": str(uuid.uuid4()), "user_id": user_id, "date": "2025-04-01"},
+    ]
+    response = client_httpx.post("/trackings/batch", json=items)
+    assert response.status_code == 200
+    data = response.json()
+    assert [i["status"] for i in data["items"]] == ["created", "created", "duplicate", "rejected", "rejected"]
+    assert (data["created"], data["duplicates"], data["rejected"]) == (2, 1, 2)
+
+    # Повторная синхронизация того же бэклога ничего не создаёт
+    response = client_httpx.post("/trackings/batch", json=items[:2])
+    assert [i["status"] for i in response.json()["items"]] == ["duplicate", "duplicate"]
+
+
+def test_batch_trackings_ndjson(client_httpx, make_user, make_habit):
+    user_id = make_user("ndjson@example.com")
+    habit_id = make_habit(user_id)
+
+    body = "\n".join(
+        json.dumps({"habit_id": habit_id, "user_id": user_id, "date": f"2025-05-{day:02d}"}) for day in range(1, 11)
+    )
+    response = client_httpx.post("/trackings/batch", content=body,
+                                 headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 10
+
+    trackings = client_httpx.get(f"/habits/{habit_id}/trackings").json()
+    assert len(trackings) == 10
+
+
+def test_batch_trackings_invalid_item(client_httpx):
+    response = client_httpx.post("/trackings/batch", json=[{"habit_id": "nope"}])
+    assert response.status_code == 422
+
+
+def test_create_tracking(client_httpx, make_user, make_habit):
+    user_id = make_user("single@example.com")
+    habit_id = make_habit(user_id)
+    payload = {"habit_id": habit_id, "user_id": user_id, "date": "2025-04-08"}
+
+    response = client_httpx.post("/trackings", json=payload)
+    assert response.status_code == 200
+    assert response.json()["date"] == "2025-04-08"
+
+    assert client_httpx.post("/trackings", json=payload).status_code == 400
+    missing = dict(payload, habit_id=str(uuid.uuid4()))
+    assert client_httpx.post("/trackings", json=missing).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_trackings(client_httpx, make_user, make_habit):
+    user_id = make_user("concurrent@example.com")
+    habit_id = make_habit(user_id)
+    payload = {"habit_id": habit_id, "user_id": user_id, "date": "2025-04-09"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.post("/trackings", json=payload) for _ in range(20)))
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] + [400] * 19
+    assert len(client_httpx.get(f"/habits/{habit_id}/trackings").json()) == 1